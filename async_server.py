@@ -0,0 +1,367 @@
+import io
+import os
+import sys
+import json
+import asyncio
+import contextvars
+from http import HTTPStatus
+from urllib.parse import unquote_to_bytes, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+from data_storage import get_storage_backend, get_writer
+import shared_store
+from instrumentation import get_logger
+
+log = get_logger('async_server')
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 256 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 75
+DEFAULT_THREADS = 32
+# Responses that never carry a body (RFC 9110 6.4.1)
+BODYLESS_STATUSES = ('204', '304')
+# A conditional GET tried on the loop carries REVALIDATE_KEY in its environ.
+# The app answers 304 when the client's copy is current and otherwise a
+# response with REVALIDATE_HEADER, and the request is then served again on
+# the thread pool.
+REVALIDATE_KEY = 'hospital.revalidate_only'
+REVALIDATE_HEADER = 'X-Hospital-Revalidate'
+
+
+class BadRequest(Exception):
+    pass
+
+
+# --------------------- ASYNC HTTP SERVER ---------------------
+class AsyncServer:
+    """
+    asyncio HTTP/1.1 server for the Flask app in web_server.py, so the
+    routes and response shapes are the ones the Flask server serves.
+
+    Connections live on the event loop: idle keep-alive dashboards cost a
+    socket, not a thread. Requests run on a bounded thread pool, so a slow
+    handler never holds up the others. Only `inline_endpoints` (cheap
+    single-record reads) run directly on the loop, and conditional GETs of
+    `conditional_endpoints` are first tried there for a 304 (see
+    REVALIDATE_KEY). Both apply only while handling cannot block on I/O:
+    records held in memory and saves queued to the write-behind thread, not
+    SQLite, lazy loading, synchronous saves or multiple workers. Each
+    request keeps its own context across those steps, as Flask's request
+    context is a context variable.
+    """
+
+    def __init__(self, app, host='0.0.0.0', port=5000, threads=None, inline_endpoints=(),
+                 conditional_endpoints=()):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.inline_endpoints = frozenset(inline_endpoints)
+        self.conditional_endpoints = frozenset(conditional_endpoints)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or int(os.environ.get('HOSPITAL_ASYNC_THREADS', DEFAULT_THREADS)),
+            thread_name_prefix='async-server')
+        self.server = None
+        self.connections = set()
+        self.streams = {}
+
+    def add_stream(self, path, handler):
+        """
+        Serve GET `path` on the loop itself rather than through the WSGI app,
+        for long-lived streams that would otherwise hold a pool thread each.
+        handler(environ) returns (headers, async iterator of str) or raises
+        ValueError for a 400 response.
+        """
+        self.streams[path] = handler
+
+    @staticmethod
+    def runs_inline():
+        """True when handlers only touch memory, so running cheap ones on the loop never blocks it."""
+        backend = get_storage_backend()
+        return (backend.eager_load and not backend.lazy and get_writer() is not None
+                and shared_store.worker_count() == 1)
+
+    def placement(self, environ):
+        """'inline', 'revalidate' (tried inline for a 304) or 'pool' for a request."""
+        if not (self.inline_endpoints or self.conditional_endpoints) or not self.runs_inline():
+            return 'pool'
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return 'pool'
+        if endpoint in self.inline_endpoints:
+            return 'inline'
+        if (endpoint in self.conditional_endpoints and environ['REQUEST_METHOD'] in ('GET', 'HEAD')
+                and 'HTTP_IF_NONE_MATCH' in environ):
+            return 'revalidate'
+        return 'pool'
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def shutdown(self):
+        """Stop accepting, drop open connections and wait for the listener to close."""
+        if self.server is not None:
+            self.server.close()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+    # ---- connections ----
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername') or ('', 0)
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except BadRequest as e:
+                    await self.write_error(writer, HTTPStatus.BAD_REQUEST, str(e))
+                    break
+                if request is None:
+                    break
+                if not await self.respond(request, peer, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            log.exception("Async server error: %s", e)
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def read_request(self, reader):
+        """Returns (method, target, version, headers, body), or None when the client is done."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise BadRequest("Request headers too large")
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise BadRequest("Malformed request line")
+        headers = []
+        for line in lines[1:]:
+            if line:
+                name, sep, value = line.partition(':')
+                if not sep:
+                    raise BadRequest("Malformed header")
+                headers.append((name.strip().lower(), value.strip()))
+        fields = dict(headers)
+        if 'chunked' in fields.get('transfer-encoding', '').lower():
+            body = await self.read_chunked(reader)
+        else:
+            try:
+                length = int(fields.get('content-length') or 0)
+            except ValueError:
+                raise BadRequest("Invalid Content-Length")
+            if length > MAX_BODY_BYTES:
+                raise BadRequest("Request body too large")
+            body = await reader.readexactly(length) if length else b''
+        return method, target, version, headers, body
+
+    async def read_chunked(self, reader):
+        body = bytearray()
+        while True:
+            size_line = await reader.readuntil(b'\r\n')
+            try:
+                size = int(size_line.split(b';')[0], 16)
+            except ValueError:
+                raise BadRequest("Invalid chunk size")
+            if size == 0:
+                # Skip trailers up to the blank line
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return bytes(body)
+            if len(body) + size > MAX_BODY_BYTES:
+                raise BadRequest("Request body too large")
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+
+    def environ(self, request, peer):
+        method, target, version, headers, body = request
+        path, _, query = target.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': str(self.port),
+            'SERVER_PROTOCOL': version,
+            'REMOTE_ADDR': peer[0],
+            'REMOTE_PORT': str(peer[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': shared_store.worker_count() > 1,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            if name == 'content-length' or name == 'transfer-encoding':
+                continue
+            key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    # ---- responses ----
+    def call_app(self, environ):
+        """Run the WSGI app; returns (status, headers, body bytes or None, iterable)."""
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        iterable = self.app(environ, start_response)
+        status, headers = started
+        if status[:3] in BODYLESS_STATUSES or any(name.lower() == 'content-length' for name, _ in headers):
+            try:
+                return status, headers, b''.join(iterable), None
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        return status, headers, None, iterable
+
+    async def run(self, context, inline, func, *args):
+        if inline:
+            return context.run(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, func, *args)
+
+    async def respond(self, request, peer, writer):
+        """Serve one request; returns whether the connection stays open."""
+        method, target, version, headers, body = request
+        connection = dict(headers).get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+        environ = self.environ(request, peer)
+        stream = self.streams.get(environ['PATH_INFO']) if method == 'GET' else None
+        if stream is not None:
+            return await self.respond_stream(stream, environ, version, writer)
+        placement = self.placement(environ)
+        context = contextvars.copy_context()
+        response = None
+        if placement == 'revalidate':
+            response = context.run(self.call_app, dict(environ, **{REVALIDATE_KEY: True}))
+            if any(name.lower() == REVALIDATE_HEADER.lower() for name, _ in response[1]):
+                # The client's copy is stale: build the full response on the pool
+                response, context = None, contextvars.copy_context()
+        inline = response is not None or placement == 'inline'
+        if response is None:
+            response = await self.run(context, inline, self.call_app, environ)
+        status, response_headers, payload, iterable = response
+        streamed = payload is None
+        chunked = streamed and version == 'HTTP/1.1'
+        keep_alive = keep_alive and (chunked or not streamed)
+        head = [f"HTTP/1.1 {status}"] + [f"{name}: {value}" for name, value in response_headers]
+        if chunked:
+            head.append("Transfer-Encoding: chunked")
+        head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+        if not streamed:
+            if method != 'HEAD':
+                writer.write(payload)
+            await writer.drain()
+            return keep_alive
+        # Streamed bodies (exports) are produced chunk by chunk in the request's context
+        iterator = iter(iterable)
+        try:
+            while True:
+                chunk = await self.run(context, inline, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk and method != 'HEAD':
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk) if chunked else chunk)
+                    await writer.drain()
+            if chunked and method != 'HEAD':
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        finally:
+            if hasattr(iterable, 'close'):
+                await self.run(context, inline, iterable.close)
+        return keep_alive
+
+    async def respond_stream(self, handler, environ, version, writer):
+        try:
+            headers, chunks = handler(environ)
+        except ValueError as e:
+            body = json.dumps({'success': False, 'error': str(e)}).encode('utf-8')
+            writer.write((f"HTTP/1.1 400 BAD REQUEST\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+            return True
+        chunked = version == 'HTTP/1.1'
+        head = ["HTTP/1.1 200 OK"] + [f"{name}: {value}" for name, value in headers.items()]
+        head.append("Transfer-Encoding: chunked" if chunked else "Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+        try:
+            async for chunk in chunks:
+                data = chunk.encode('utf-8')
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+                await writer.drain()
+        finally:
+            await chunks.aclose()
+        return False
+
+    async def write_error(self, writer, status, message):
+        body = message.encode('utf-8')
+        writer.write((f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the hospital API on an asyncio event loop.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('HOSPITAL_PORT', 5000)))
+    parser.add_argument('--threads', type=int, help=f"thread pool for blocking requests (default {DEFAULT_THREADS})")
+    args = parser.parse_args()
+
+    from web_server import app, INLINE_ENDPOINTS, CONDITIONAL_ENDPOINTS
+    from live_updates import live_updates, parse_cursor, STREAM_HEADERS
+    server = AsyncServer(app, args.host, args.port, args.threads, INLINE_ENDPOINTS, CONDITIONAL_ENDPOINTS)
+
+    def events(environ):
+        since = parse_qs(environ['QUERY_STRING']).get('since', [None])[0]
+        cursor = parse_cursor(environ.get('HTTP_LAST_EVENT_ID'), since)
+        chunks = live_updates.astream(cursor, poll=app.extensions.get('shared_store'),
+                                      offload=not server.runs_inline())
+        return dict(STREAM_HEADERS, **{'Content-Type': 'text/event-stream; charset=utf-8'}), chunks
+
+    # Dashboards keep this stream open: serve it on the loop, not a pool thread
+    server.add_stream('/api/events', events)
+    print("Starting Patient Tracking System async server...")
+    print(f"Access the application at: http://localhost:{args.port}")
+    print("Handlers run on the thread pool" + (", single-record reads and revalidations on the event loop"
+                                               if server.runs_inline() else ""))
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Dashboard load: p50/p99 latency of the threaded Flask server vs the asyncio server under concurrent connections."""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'General Medicine', 'Pulmonology', 'General Surgery']
+SYMPTOMS = ['chest pain', 'cough', 'fever', 'headache', 'stroke', 'fracture']
+
+SERVERS = {
+    # The Flask development server as web_server.py runs it, without the debugger/reloader
+    'flask': [sys.executable, '-c',
+              "import os, web_server; from werkzeug.serving import make_server; "
+              "make_server('127.0.0.1', int(os.environ['HOSPITAL_PORT']), web_server.app, threaded=True)"
+              ".serve_forever()"],
+    'async': [sys.executable, os.path.join(ROOT, 'async_server.py'), '--host', '127.0.0.1'],
+}
+
+# One dashboard page view (static/js/app.js loadDashboard/loadPatients/loadDoctors)
+PAGE_VIEW = ['/api/statistics', '/api/patients?limit=50', '/api/doctors']
+
+
+def seed(workdir, n_patients, n_doctors):
+    rng = random.Random(7)
+    staff = {f"DOC-{i:05d}": {'id': f"DOC-{i:05d}", 'name': f"Dr. {i}", 'patients': [], 'notes': {},
+                              'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)]}
+             for i in range(n_doctors)}
+    records = {}
+    for i in range(n_patients):
+        doctor = staff[rng.choice(list(staff))]
+        pid = f"PAT-{i:07d}"
+        doctor['patients'].append(pid)
+        records[pid] = {'id': pid, 'name': f"P{i}", 'age': 20 + i % 60, 'gender': 'Female',
+                        'symptoms': [rng.choice(SYMPTOMS)], 'assigned_doctor': doctor['name'],
+                        'assigned_doctor_id': doctor['id'], 'status': 'inpatient',
+                        'admission': '2025-01-01', 'discharge_date': None,
+                        'history': [{'date': '2025-01-02', 'notes': 'ECG', 'cost': 500.0}],
+                        'treatment_total_cost': 500.0, 'bill_amount': 0}
+    for name, data in (('patients.json', records), ('doctors.json', staff)):
+        with open(os.path.join(workdir, name), 'w') as f:
+            json.dump(data, f, indent=4)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, workdir, port):
+    env = dict(os.environ, HOSPITAL_PORT=str(port), PYTHONPATH=ROOT)
+    command = SERVERS[kind] + (['--port', str(port)] if kind == 'async' else [])
+    server = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+async def fetch(reader, writer, method, path, body=None):
+    """Send one request; returns (status, keep_alive)."""
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(payload)}\r\n\r\n").encode() + payload)
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length, keep_alive = 0, True
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection':
+            keep_alive = value.strip().lower() != b'close'
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def station(port, deadline, write_ratio, rng, latencies, errors):
+    """
+    One nurse station loading dashboard pages back to back over keep-alive
+    (reconnecting whenever the server closes the connection, as Werkzeug does).
+    """
+    reader = writer = None
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < write_ratio:
+                requests = [('POST', '/api/patients', {'name': 'Load', 'age': 30, 'gender': 'Male',
+                                                       'symptoms': [rng.choice(SYMPTOMS)]})]
+            else:
+                requests = [('GET', path, None) for path in PAGE_VIEW]
+            for method, path, body in requests:
+                start = time.perf_counter()
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                status, keep_alive = await asyncio.wait_for(fetch(reader, writer, method, path, body), 30)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(status)
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        errors.append('connection')
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def load(port, connections, duration, write_ratio):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(station(port, deadline, write_ratio, random.Random(i), latencies, errors)
+                           for i in range(connections)))
+    return sorted(latencies), errors
+
+
+def run(kind, args):
+    workdir = tempfile.mkdtemp()
+    seed(workdir, args.patients, args.doctors)
+    port = free_port()
+    server = start_server(kind, workdir, port)
+    try:
+        latencies, errors = asyncio.run(load(port, args.connections, args.duration, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait(10)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {'server': kind, 'requests': len(latencies), 'errors': len(errors),
+            'rps': len(latencies) / args.duration, 'p50_ms': pick(0.5), 'p99_ms': pick(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--servers', default='flask,async', help="comma-separated: flask, async")
+    parser.add_argument('--connections', type=int, default=200, help="concurrent keep-alive clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per server")
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="share of page views that register a patient")
+    args = parser.parse_args()
+
+    print(f"{args.connections} connections, {args.duration:.0f}s per server, {args.patients} patients")
+    print(f"{'server':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for kind in args.servers.split(','):
+        result = run(kind, args)
+        print(f"{result['server']:>8} {result['requests']:>9} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
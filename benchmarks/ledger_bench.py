@@ -0,0 +1,73 @@
+"""Revenue analytics: columnar BillingLedger vs a loop over every patient's history."""
+import argparse
+import random
+import time
+
+from data_storage import patients, doctors
+from doctor import Doctor
+from patient import Patient
+from ledger import ledger
+
+
+def legacy_report():
+    """The per-object loop the ledger replaces."""
+    by_day, by_doctor, by_specialization = {}, {}, {}
+    total = 0.0
+    for patient in patients.values():
+        doctor = doctors.get(patient.assigned_doctor_id)
+        spec = doctor.specialization if doctor else 'unassigned'
+        for entry in patient.history:
+            cost = entry.get('cost', 0)
+            total += cost
+            by_day[entry['date']] = by_day.get(entry['date'], 0.0) + cost
+            by_doctor[patient.assigned_doctor_id] = by_doctor.get(patient.assigned_doctor_id, 0.0) + cost
+            by_specialization[spec] = by_specialization.get(spec, 0.0) + cost
+    return total, by_day, by_doctor, by_specialization
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--patients', type=int, default=50000)
+    parser.add_argument('--history', type=int, default=20, help="charges per patient")
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    specs = ['Cardiology', 'Neurology', 'General Medicine', 'Pulmonology', 'General Surgery']
+    staff = [Doctor(f"Dr. {i}", specs[i % len(specs)]) for i in range(args.doctors)]
+    for doctor in staff:
+        doctors[doctor.id] = doctor
+    for i in range(args.patients):
+        doctor = rng.choice(staff)
+        patients[f"PAT-{i:07d}"] = Patient.from_dict({
+            "name": f"P{i}", "age": 40, "gender": "Female", "symptoms": [], "status": "inpatient",
+            "assigned_doctor": doctor.name, "assigned_doctor_id": doctor.id,
+            "history": [{"date": f"2025-{1 + rng.randrange(12):02d}-{1 + rng.randrange(28):02d}",
+                         "notes": "", "cost": float(rng.randint(100, 5000))} for _ in range(args.history)],
+        }, f"PAT-{i:07d}")
+
+    start = time.perf_counter()
+    ledger.build()
+    build = time.perf_counter() - start
+    rows = len(ledger.amounts)
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    t_legacy = best(legacy_report)
+    t_ledger = best(ledger.report)
+    assert abs(legacy_report()[0] - ledger.total()) < 1e-6 * max(1.0, ledger.total())
+    print(f"{rows} charge rows ({args.patients} patients), engine: {ledger.report()['engine']}")
+    print(f"ledger build (once)   {build * 1e3:9.1f} ms")
+    print(f"per-object loop       {t_legacy * 1e3:9.1f} ms")
+    print(f"ledger report         {t_ledger * 1e3:9.1f} ms   speedup {t_legacy / t_ledger:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
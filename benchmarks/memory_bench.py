@@ -0,0 +1,95 @@
+"""Memory benchmark: bytes per loaded patient, dict-based records vs slotted compact records."""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from patient import Patient
+
+STATUSES = ['inpatient', 'outpatient', 'discharged', 'registered']
+DOCTORS = [f"Dr. {name}" for name in ('Alice Smith', 'Bob Fischer', 'Carol Jones', 'Dan Brown', 'Eve Green')]
+TREATMENTS = ['MRI', 'CT scan', 'ECG', 'Blood test', 'X-ray']
+
+
+class LegacyPatient:
+    """The original representation: a __dict__ per patient, dict history entries, string dates."""
+
+    def __init__(self, name, age, gender, symptoms):
+        self.id = None
+        self.name = name
+        self.age = age
+        self.gender = gender
+        self.symptoms = [s.strip() for s in symptoms]
+        self.assigned_doctor = None
+        self.assigned_doctor_id = None
+        self.status = 'registered'
+        self.history = []
+        self.admission = None
+        self.discharge_date = None
+        self.bill_amount = 0
+
+    @classmethod
+    def from_dict(cls, data, patient_id=None):
+        patient = cls(data['name'], data['age'], data['gender'], data['symptoms'])
+        patient.id = patient_id or data['id']
+        patient.assigned_doctor = data.get('assigned_doctor')
+        patient.assigned_doctor_id = data.get('assigned_doctor_id')
+        patient.status = data.get('status')
+        patient.history = data.get('history', [])
+        patient.admission = data.get('admission')
+        patient.discharge_date = data.get('discharge_date')
+        if 'treatment_total_cost' in data:
+            patient.treatment_total_cost = data['treatment_total_cost']
+        patient.bill_amount = data.get('bill_amount', 0)
+        return patient
+
+
+def generate(count, history, rng):
+    data = {}
+    for i in range(count):
+        pid = f"PAT-{i:07d}"
+        entries = [{"date": f"2025-{1 + day % 12:02d}-{1 + day % 28:02d}",
+                    "notes": f"Stable, Treatment: {rng.choice(TREATMENTS)}",
+                    "cost": float(rng.randint(100, 5000))} for day in range(history)]
+        data[pid] = {
+            "id": pid, "name": f"Patient {i}", "age": rng.randint(1, 90), "gender": rng.choice(["Male", "Female"]),
+            "symptoms": ["cough", "fever"], "assigned_doctor": rng.choice(DOCTORS), "assigned_doctor_id": "DOC-00001",
+            "status": rng.choice(STATUSES), "history": entries, "admission": "2025-07-01", "discharge_date": None,
+            "treatment_total_cost": sum(e["cost"] for e in entries), "bill_amount": 0.0,
+        }
+    # Parse back so every record owns fresh strings, as after json.load of patients.json
+    return json.dumps(data)
+
+
+def retained_bytes(text, cls):
+    """Bytes still allocated after parsing `text` and building one `cls` per record."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    records = json.loads(text)
+    built = [cls.from_dict(record, pid) for pid, record in records.items()]
+    del records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del built
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--history', type=int, default=10, help="history entries per patient")
+    args = parser.parse_args()
+
+    text = generate(args.patients, args.history, random.Random(42))
+    legacy = retained_bytes(text, LegacyPatient)
+    compact = retained_bytes(text, Patient)
+    print(f"{args.patients} patients x {args.history} history entries")
+    print(f"legacy  {legacy / args.patients:9.0f} bytes/patient")
+    print(f"compact {compact / args.patients:9.0f} bytes/patient   ({legacy / compact:.2f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Load test: requests per second of the web server with 1..N worker processes over one SQLite store."""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import signal
+import argparse
+import tempfile
+import subprocess
+import http.client
+import multiprocessing
+
+from sqlite_storage import SqliteStore
+
+# Working directory of the server processes is a temp dir, so they import from here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'General Medicine', 'Pulmonology', 'General Surgery']
+SYMPTOMS = ['chest pain', 'cough', 'fever', 'headache', 'stroke', 'fracture']
+
+# Runs the app under the pre-fork server; workers=1 is the single-process baseline
+SERVER = (
+    "import os, shared_store, web_server; "
+    "shared_store.serve(web_server.app, '127.0.0.1', int(os.environ['HOSPITAL_PORT']), "
+    "shared_store.worker_count())"
+)
+
+
+def seed(db_path, n_patients, n_doctors):
+    rng = random.Random(7)
+    store = SqliteStore(db_path)
+    staff = [{'id': f"DOC-{i:05d}", 'name': f"Dr. {i}", 'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+              'patients': [], 'notes': {}} for i in range(n_doctors)]
+    records = []
+    for i in range(n_patients):
+        doctor = rng.choice(staff)
+        pid = f"PAT-{i:07d}"
+        doctor['patients'].append(pid)
+        records.append({'id': pid, 'name': f"P{i}", 'age': 20 + i % 60, 'gender': 'Female',
+                        'symptoms': [rng.choice(SYMPTOMS)], 'assigned_doctor': doctor['name'],
+                        'assigned_doctor_id': doctor['id'], 'status': 'inpatient',
+                        'admission': '2025-01-01', 'discharge_date': None,
+                        'history': [{'date': '2025-01-02', 'notes': 'ECG', 'cost': 500}],
+                        'treatment_total_cost': 500, 'bill_amount': 0})
+    store.upsert_doctors(staff)
+    store.upsert_patients(records)
+    store.close()
+    return [rec['id'] for rec in records]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, db_path, port, workers):
+    env = dict(os.environ, HOSPITAL_STORAGE='sqlite', HOSPITAL_DB=db_path, HOSPITAL_PORT=str(port),
+               HOSPITAL_WORKERS=str(workers), HOSPITAL_WRITE_BEHIND='0', PYTHONPATH=ROOT)
+    server = subprocess.Popen([sys.executable, '-c', SERVER], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/statistics')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def client(port, patient_ids, duration, write_ratio, seed_value):
+    """One load-generating process: returns (latencies, errors)."""
+    rng = random.Random(seed_value)
+    latencies, errors = [], 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if roll < write_ratio:
+            body = json.dumps({'name': 'Load', 'age': 30, 'gender': 'Male', 'symptoms': [rng.choice(SYMPTOMS)]})
+            method, path, headers = 'POST', '/api/patients', {'Content-Type': 'application/json'}
+        elif roll < 0.8:
+            body, method, path, headers = None, 'GET', f"/api/patients/{rng.choice(patient_ids)}", {}
+        else:
+            body, method, path, headers = None, 'GET', '/api/statistics', {}
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+def run(workers, args, patient_ids, workdir, db_path):
+    port = free_port()
+    server = start_server(workdir, db_path, port, workers)
+    try:
+        with multiprocessing.get_context('spawn').Pool(args.clients) as pool:
+            results = pool.starmap(client, [(port, patient_ids, args.duration, args.write_ratio, i)
+                                            for i in range(args.clients)])
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(10)
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    errors = sum(err for _, err in results)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {'workers': workers, 'requests': len(latencies), 'errors': errors,
+            'rps': len(latencies) / args.duration, 'p50_ms': pick(0.5), 'p99_ms': pick(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated worker counts")
+    parser.add_argument('--clients', type=int, default=8, help="load-generating processes")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per run")
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="share of POST /api/patients requests")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'bench.db')
+    patient_ids = seed(db_path, args.patients, args.doctors)
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes, {args.duration:.0f}s per run, "
+          f"{args.write_ratio:.0%} writes")
+    print(f"{'workers':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        result = run(workers, args, patient_ids, workdir, db_path)
+        baseline = baseline or result['rps']
+        print(f"{result['workers']:>8} {result['requests']:>9} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7} {result['rps'] / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Startup benchmark: eager vs lazy loading of patients.json/doctors.json."""
+import argparse
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from data_storage import configure_storage, patients, doctors
+from main import load_patients, load_doctors
+
+
+def generate(count, history, doctor_count, rng):
+    doctor_ids = [f"DOC-{i:05d}" for i in range(doctor_count)]
+    patient_data = {}
+    doctor_data = {
+        did: {"id": did, "name": f"Dr. {i}", "specialization": "General Medicine", "patients": [], "notes": {}}
+        for i, did in enumerate(doctor_ids)
+    }
+    for i in range(count):
+        pid = f"PAT-{i:07d}"
+        did = rng.choice(doctor_ids)
+        entries = [{"date": f"2025-07-{1 + day % 28:02d}", "notes": f"Day {day}: Stable, Treatment: MRI",
+                    "cost": float(rng.randint(100, 5000))} for day in range(history)]
+        patient_data[pid] = {
+            "id": pid, "name": f"Patient {i}", "age": rng.randint(1, 90), "gender": rng.choice(["Male", "Female"]),
+            "symptoms": ["cough", "fever"], "assigned_doctor": doctor_data[did]["name"], "assigned_doctor_id": did,
+            "status": "inpatient", "history": entries, "admission": "2025-07-01", "discharge_date": None,
+            "bill_amount": 0.0,
+        }
+        doctor_data[did]["patients"].append(pid)
+        doctor_data[did]["notes"][pid] = [{"date": e["date"], "note": "Stable", "treatment": "MRI", "cost": e["cost"]}
+                                          for e in entries]
+    return patient_data, doctor_data
+
+
+def timed_load(lazy):
+    configure_storage('json', lazy=lazy)
+    patients.clear()
+    doctors.clear()
+    gc.collect()
+    start = time.perf_counter()
+    load_doctors()
+    load_patients()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help="patient counts to generate (e.g. 10000 100000 1000000)")
+    parser.add_argument('--history', type=int, default=10, help="history entries per patient")
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=100, help="first history accesses to time")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    orig_cwd = os.getcwd()
+    print(f"{'patients':>10} {'file MB':>9} {'eager s':>9} {'lazy s':>9} {'speedup':>8} {'first history':>14}")
+    for size in args.sizes:
+        tmpdir = tempfile.mkdtemp()
+        os.chdir(tmpdir)
+        try:
+            patient_data, doctor_data = generate(size, args.history, args.doctors, rng)
+            writer = configure_storage('json', lazy=True)
+            writer.write_records('patients.json', patient_data)
+            writer.write_records('doctors.json', doctor_data)
+            del patient_data, doctor_data
+            megabytes = (os.path.getsize('patients.json') + os.path.getsize('doctors.json')) / 1e6
+
+            eager = timed_load(lazy=False)
+            lazy = timed_load(lazy=True)
+            sample = rng.sample(list(patients.values()), min(args.samples, len(patients)))
+            start = time.perf_counter()
+            for patient in sample:
+                assert len(patient.history) == args.history
+            first_access = (time.perf_counter() - start) / len(sample)
+            print(f"{size:>10} {megabytes:>9.1f} {eager:>9.3f} {lazy:>9.3f} {eager / lazy:>7.1f}x "
+                  f"{first_access * 1e6:>11.0f} us")
+        finally:
+            patients.clear()
+            doctors.clear()
+            configure_storage('json')
+            os.chdir(orig_cwd)
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""End-to-end benchmark suite: a generated hospital workload replayed through the Flask API and the module APIs.
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --output current.json --compare baseline.json
+
+Results (throughput, latency percentiles per operation, load time, memory)
+are saved as JSON; --compare flags regressions against an earlier run and
+exits with status 1 when there are any.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+from data_storage import (configure_storage, patients, doctors, save_patient_to_json, save_doctor_to_json,
+                          save_many_to_json, flush_storage, get_writer, JsonFileBackend)
+from repository import get_repository
+from utilities import register_new_patient, apply_treatment, mark_doctor_on_leave
+from write_behind import stop_write_behind
+from main import load_patients, load_doctors
+from benchmarks.workload import (WorkloadConfig, generate_dataset, operation_stream, parse_weights,
+                                 SPECIALIZATIONS, SYMPTOMS, OPERATIONS, TREATMENTS, GENDERS)
+
+TARGETS = ('module', 'api')
+# Metrics compared by --compare, and whether a higher value is better
+COMPARED = {'ops_per_second': True, 'p50_ms': False, 'p95_ms': False, 'load_seconds': False, 'load_mb': False}
+# Operations timed fewer times than this are too noisy to compare percentiles
+MIN_SAMPLES = 20
+
+
+# --------------------- TARGETS ---------------------
+class ModuleTarget:
+    """The operations as the CLI performs them: module calls with synchronous saves."""
+
+    name = 'module'
+
+    def register(self, fields):
+        register_new_patient(*fields)
+        return True
+
+    def treat(self, patient, treatment, cost, discharge):
+        doctor = get_repository().doctor_for_patient(patient)
+        apply_treatment(patient, doctor, "Stable", treatment, cost, discharge)
+        save_patient_to_json(patient)
+        save_doctor_to_json(doctor)
+        return True
+
+    def leave(self, doctor):
+        mark_doctor_on_leave(doctor)
+        return True
+
+
+class ApiTarget:
+    """The operations as HTTP requests through the Flask test client (saves as web_server configures them)."""
+
+    name = 'api'
+
+    def __init__(self):
+        import web_server
+        self.client = web_server.app.test_client()
+
+    def register(self, fields):
+        name, age, gender, symptoms, condition = fields
+        response = self.client.post('/api/patients', json={'name': name, 'age': age, 'gender': gender,
+                                                           'symptoms': symptoms, 'condition': condition})
+        return response.status_code == 200
+
+    def treat(self, patient, treatment, cost, discharge):
+        response = self.client.post('/api/treatment', json={'patient_id': patient.id, 'note': "Stable",
+                                                            'treatment': treatment, 'cost': cost,
+                                                            'discharge': discharge})
+        return response.status_code == 200
+
+    def leave(self, doctor):
+        response = self.client.post(f'/api/doctors/{doctor.id}/leave', json={})
+        return response.status_code == 200
+
+
+# --------------------- MEASUREMENT ---------------------
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summarize(latencies, errors=0, skipped=0):
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'skipped': skipped,
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'max_ms': ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def rss_mb():
+    """Current resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6, 1)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1)
+
+
+def seed(storage, patient_data, doctor_data):
+    """Write the dataset into the current directory for the given storage backend."""
+    writer = JsonFileBackend(lazy=False)
+    writer.write_records('patients.json', patient_data)
+    writer.write_records('doctors.json', doctor_data)
+    if storage != 'json':
+        configure_storage('json')
+        load_doctors()
+        load_patients()
+        configure_storage(storage)
+        save_many_to_json('patients.json', list(patients.values()))
+        save_many_to_json('doctors.json', list(doctors.values()))
+        flush_storage()
+    patients.clear()
+    doctors.clear()
+
+
+def load():
+    """Load the registries; returns (seconds, MB allocated by the load)."""
+    patients.clear()
+    doctors.clear()
+    tracemalloc.start()
+    load_doctors()
+    load_patients()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Timed separately: tracing slows allocation down several times
+    patients.clear()
+    doctors.clear()
+    start = time.perf_counter()
+    load_doctors()
+    load_patients()
+    return time.perf_counter() - start, allocated / 1e6
+
+
+def registration(rng, config):
+    symptoms = list(dict.fromkeys(rng.choices(list(config.symptoms), weights=list(config.symptoms.values()),
+                                              k=rng.choice((1, 1, 2)))))
+    condition = 'critical' if rng.random() < 0.15 else 'stable'
+    return f"Bench {rng.randrange(10 ** 6)}", rng.randint(1, 95), rng.choice(GENDERS), symptoms, condition
+
+
+def replay(target, config, rng):
+    """Run the operation stream; returns ({kind: summary}, elapsed seconds)."""
+    repo = get_repository()
+    latencies = {kind: [] for kind in config.mix}
+    errors = dict.fromkeys(config.mix, 0)
+    skipped = dict.fromkeys(config.mix, 0)
+    started = time.perf_counter()
+    for kind in operation_stream(config):
+        # Subjects are drawn from live state, outside the timed call
+        if kind == 'register':
+            call, args = target.register, (registration(rng, config),)
+        elif kind in ('treat', 'discharge'):
+            # Re-checked on the live object: SQLite may not have the latest queued save yet
+            ward = [p for p in repo.patients_by_status('inpatient') if p.assigned_doctor and p.status == 'inpatient']
+            if not ward:
+                skipped[kind] += 1
+                continue
+            call = target.treat
+            # Listings return detached copies on SQLite; the change goes to the registered record
+            args = (repo.get_patient(rng.choice(ward).id), rng.choice(TREATMENTS), float(rng.choice((0, 150, 500, 2000))),
+                    kind == 'discharge')
+        elif kind == 'leave':
+            staff = [d for d in repo.all_doctors() if d.patients and not d.on_leave]
+            if len(staff) < 2:
+                skipped[kind] += 1
+                continue
+            call, args = target.leave, (repo.get_doctor(rng.choice(staff).id),)
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+        start = time.perf_counter()
+        ok = call(*args)
+        latencies[kind].append(time.perf_counter() - start)
+        if not ok:
+            errors[kind] += 1
+        if kind == 'leave':
+            # Back from leave, so the staff does not run out over a long run
+            args[0].on_leave = False
+            save_doctor_to_json(args[0])
+    # Saves queued to the write-behind thread count towards the run
+    flush_storage()
+    elapsed = time.perf_counter() - started
+    operations = {kind: summarize(latencies[kind], errors[kind], skipped[kind]) for kind in config.mix}
+    operations['all'] = summarize([value for values in latencies.values() for value in values],
+                                  sum(errors.values()), sum(skipped.values()))
+    return operations, elapsed
+
+
+def run_target(name, config, storage, patient_data, doctor_data):
+    orig_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+            seed(storage, patient_data, doctor_data)
+            configure_storage(storage)
+            target = ApiTarget() if name == 'api' else ModuleTarget()
+            saves = 'write-behind' if get_writer() is not None else 'synchronous'
+            load_seconds, load_mb = load()
+            operations, elapsed = replay(target, config, random.Random(config.seed + 2))
+        files = [path for path in os.listdir(workdir) if os.path.isfile(path)]
+        return {
+            'saves': saves,
+            'operations': operations,
+            'elapsed_seconds': round(elapsed, 4),
+            'ops_per_second': round(operations['all']['count'] / elapsed, 1) if elapsed else 0.0,
+            'load_seconds': round(load_seconds, 4),
+            'load_mb': round(load_mb, 2),
+            'rss_mb': rss_mb(),
+            'data_mb': round(sum(os.path.getsize(path) for path in files) / 1e6, 2),
+        }
+    finally:
+        stop_write_behind()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+        os.chdir(orig_cwd)
+        shutil.rmtree(workdir)
+
+
+# --------------------- REPORTING ---------------------
+def print_results(results):
+    for name, result in results['targets'].items():
+        print(f"\n{name} ({result['saves']} saves): {result['ops_per_second']} ops/s, "
+              f"load {result['load_seconds']}s / {result['load_mb']} MB, rss {result['rss_mb']} MB, "
+              f"data {result['data_mb']} MB")
+        print(f"{'operation':>10} {'count':>6} {'errors':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8}")
+        for kind, op in result['operations'].items():
+            print(f"{kind:>10} {op['count']:>6} {op['errors']:>6} {op['mean_ms']:>8.2f} {op['p50_ms']:>8.2f} "
+                  f"{op['p95_ms']:>8.2f} {op['p99_ms']:>8.2f} {op['max_ms']:>8.2f}")
+
+
+def compare(current, baseline, threshold):
+    """Print the change of each compared metric; returns the regressions beyond `threshold` (a fraction)."""
+    if current['config'] != baseline['config']:
+        print("\nWarning: the runs used different workload settings; differences may not be regressions")
+    regressions = []
+    print(f"\n{'target':>7} {'metric':>22} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current['targets'].items():
+        base = baseline['targets'].get(name)
+        if base is None:
+            continue
+        rows = [(metric, base.get(metric), result.get(metric), COMPARED[metric])
+                for metric in ('ops_per_second', 'load_seconds', 'load_mb')]
+        for kind, op in result['operations'].items():
+            base_op = base['operations'].get(kind, {})
+            if min(op['count'], base_op.get('count', 0)) < MIN_SAMPLES:
+                continue
+            rows += [(f"{kind}.{metric}", base_op.get(metric), op[metric], COMPARED[metric])
+                     for metric in ('p50_ms', 'p95_ms')]
+        for metric, old, new, higher_is_better in rows:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = " REGRESSION" if worse > threshold else ""
+            if flag:
+                regressions.append((name, metric, old, new))
+            print(f"{name:>7} {metric:>22} {old:>10.2f} {new:>10.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--doctors', type=int, default=40)
+    parser.add_argument('--specializations', type=parse_weights,
+                        help="doctor mix as name:weight,... (default %s)" % ','.join(f"{k}:{v}" for k, v in SPECIALIZATIONS.items()))
+    parser.add_argument('--symptoms', type=parse_weights,
+                        help="symptom distribution as name:weight,... (default %s)" % ','.join(f"{k}:{v}" for k, v in SYMPTOMS.items()))
+    parser.add_argument('--history-mean', type=float, default=5.0, help="mean treatment-history length")
+    parser.add_argument('--operations', type=int, default=2000, help="operations replayed per target")
+    parser.add_argument('--mix', type=parse_weights,
+                        help="operation mix (default %s)" % ','.join(f"{k}:{v}" for k, v in OPERATIONS.items()))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--targets', default=','.join(TARGETS), help="comma-separated: module, api")
+    parser.add_argument('--storage', default='json', help="storage backend: json, journal, sqlite, snapshot")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="results JSON of an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    targets = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+    if args.mix and set(args.mix) - set(OPERATIONS):
+        parser.error(f"operations must be among: {', '.join(OPERATIONS)}")
+    config = WorkloadConfig(args.patients, args.doctors, args.specializations, args.symptoms, args.history_mean,
+                            args.operations, args.mix, args.seed)
+
+    print(f"Generating {config.patients} patients, {config.doctors} doctors...")
+    patient_data, doctor_data = generate_dataset(config)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'storage': args.storage},
+        'config': config.to_dict(),
+        'targets': {},
+    }
+    for name in targets:
+        print(f"Replaying {config.operations} operations through the {name} target...")
+        results['targets'][name] = run_target(name, config, args.storage, patient_data, doctor_data)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
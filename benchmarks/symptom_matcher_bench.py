@@ -0,0 +1,92 @@
+"""Micro-benchmark: compiled SymptomMatcher vs the original nested substring scans."""
+import argparse
+import random
+import time
+
+from symptom_matcher import SymptomMatcher, DEFAULT_RULES_PATH
+
+LEGACY_CRITICAL = [
+    'abdominal pain', 'severe abdominal pain', 'abdominal bleeding', 'chest pain',
+    'difficulty breathing', 'unconscious', 'severe bleeding', 'heart attack', 'stroke',
+    'severe allergic reaction', 'severe burns',
+]
+LEGACY_SPECIALIZATIONS = {
+    'chest pain': 'Cardiology', 'heart attack': 'Cardiology', 'stroke': 'Neurology',
+    'unconscious': 'Neurology', 'abdominal pain': 'General Medicine',
+    'severe abdominal pain': 'General Surgery', 'abdominal bleeding': 'General Surgery',
+    'difficulty breathing': 'Pulmonology', 'severe bleeding': 'Emergency Response',
+    'severe allergic reaction': 'General Medicine', 'severe burns': 'Emergency Response',
+}
+FILLER = ['fever', 'cough', 'headache', 'nausea', 'fatigue', 'dizziness', 'rash', 'back ache',
+          'sore throat', 'joint stiffness', 'blurred vision', 'mild swelling of left ankle']
+
+
+def legacy_should_admit(symptoms):
+    for symptom in symptoms:
+        s_clean = symptom.strip().lower()
+        for crit in LEGACY_CRITICAL:
+            if crit in s_clean or s_clean in crit:
+                return True
+    return False
+
+
+def legacy_specializations(symptoms):
+    matched = []
+    for symptom in symptoms:
+        s_clean = symptom.strip().lower()
+        for key, spec in LEGACY_SPECIALIZATIONS.items():
+            if key in s_clean or s_clean in key:
+                matched.append(spec)
+    return matched[0] if matched else None
+
+
+def generate_symptoms(count, critical_ratio, rng):
+    symptoms = []
+    for _ in range(count):
+        if rng.random() < critical_ratio:
+            symptoms.append(f"patient reports {rng.choice(LEGACY_CRITICAL)} since morning")
+        else:
+            symptoms.append(f"{rng.choice(FILLER)} for {rng.randint(1, 30)} days")
+    return symptoms
+
+
+def timed(fn, lists, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for symptoms in lists:
+            fn(symptoms)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--symptoms', type=int, default=50, help="symptoms per patient")
+    parser.add_argument('--critical-ratio', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lists = [generate_symptoms(args.symptoms, args.critical_ratio, rng) for _ in range(args.patients)]
+    matcher = SymptomMatcher.from_file(DEFAULT_RULES_PATH)
+    compiled_spec = lambda s: matcher.match(s).specialization
+
+    for symptoms in lists:
+        assert legacy_should_admit(symptoms) == matcher.should_admit(symptoms)
+        assert legacy_specializations(symptoms) == compiled_spec(symptoms)
+
+    total = args.patients * args.symptoms
+    print(f"{args.patients} patients x {args.symptoms} symptoms ({total} strings), best of {args.repeat}")
+    for label, legacy, compiled in (
+            ("should_admit", legacy_should_admit, matcher.should_admit),
+            ("specialization", legacy_specializations, compiled_spec)):
+        t_legacy = timed(legacy, lists, args.repeat)
+        t_compiled = timed(compiled, lists, args.repeat)
+        print(f"{label:15s} legacy {t_legacy * 1e3:9.1f} ms   compiled {t_compiled * 1e3:9.1f} ms   "
+              f"speedup {t_legacy / t_compiled:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
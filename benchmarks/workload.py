@@ -0,0 +1,126 @@
+"""Synthetic hospital datasets and operation mixes for the benchmark suite."""
+import json
+import os
+import random
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weights; override with "name:weight,name:weight" on the command line
+SPECIALIZATIONS = {'General Medicine': 5, 'Cardiology': 3, 'Neurology': 2, 'Pulmonology': 2,
+                   'General Surgery': 2, 'Emergency Response': 1}
+SYMPTOMS = {'fever': 20, 'cough': 20, 'headache': 15, 'abdominal pain': 10, 'chest pain': 10,
+            'difficulty breathing': 8, 'fracture': 7, 'rash': 5, 'stroke': 3, 'severe bleeding': 2}
+STATUSES = {'inpatient': 3, 'outpatient': 4, 'discharged': 3}
+OPERATIONS = {'register': 40, 'treat': 45, 'discharge': 12, 'leave': 3}
+TREATMENTS = ['MRI', 'CT scan', 'ECG', 'Blood test', 'X-ray', 'IV fluids', 'Physiotherapy']
+GENDERS = ['Female', 'Male']
+
+
+def parse_weights(text):
+    """{'name': weight} from 'name:weight,name:weight' (a bare name weighs 1)."""
+    weights = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(':')
+        weights[name.strip()] = float(weight or 1)
+    if not weights or any(w < 0 for w in weights.values()) or not sum(weights.values()):
+        raise ValueError(f"Invalid weights: {text!r}")
+    return weights
+
+
+def symptom_specializations(path=None):
+    """Symptom -> specialization from symptom_rules.json, to route generated patients like the matcher."""
+    with open(path or os.path.join(ROOT, 'symptom_rules.json')) as f:
+        return {rule['symptom']: rule['specialization'] for rule in json.load(f)['rules']}
+
+
+class WorkloadConfig:
+    """Shape of a generated dataset and of the operation stream replayed against it."""
+
+    def __init__(self, patients=2000, doctors=40, specializations=None, symptoms=None,
+                 history_mean=5.0, operations=2000, mix=None, seed=42):
+        self.patients = patients
+        self.doctors = doctors
+        self.specializations = specializations or dict(SPECIALIZATIONS)
+        self.symptoms = symptoms or dict(SYMPTOMS)
+        self.history_mean = history_mean
+        self.operations = operations
+        self.mix = mix or dict(OPERATIONS)
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def generate_dataset(config):
+    """
+    Returns ({id: patient_dict}, {id: doctor_dict}) in the persisted format.
+    Doctors are split across specializations by weight; patients get 1-3
+    symptoms by weight, a doctor matching their first symptom where one
+    exists, and a treatment history whose length is exponentially
+    distributed around config.history_mean (outpatients get one visit).
+    """
+    rng = random.Random(config.seed)
+    routes = symptom_specializations()
+    doctors, by_specialization = {}, {}
+    names = list(config.specializations)
+    for i in range(config.doctors):
+        # Deterministic spread by weight, so small staffs still cover the heavy specializations
+        specialization = names[i % len(names)] if i < len(names) else _pick(rng, config.specializations)
+        did = f"DOC-{i:05d}"
+        doctors[did] = {'id': did, 'name': f"Dr. Bench {i}", 'specialization': specialization,
+                        'patients': [], 'notes': {}}
+        by_specialization.setdefault(specialization, []).append(did)
+    staff = list(doctors)
+
+    today = date.today()
+    patients = {}
+    for i in range(config.patients):
+        pid = f"PAT-{i:07d}"
+        symptoms = []
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            symptom = _pick(rng, config.symptoms)
+            if symptom not in symptoms:
+                symptoms.append(symptom)
+        candidates = by_specialization.get(routes.get(symptoms[0])) or staff
+        doctor = doctors[rng.choice(candidates)] if staff else None
+        status = _pick(rng, STATUSES)
+        admission = today - timedelta(days=rng.randint(1, 365))
+        if status == 'outpatient':
+            visits = 1
+        else:
+            visits = int(rng.expovariate(1 / config.history_mean)) if config.history_mean > 0 else 0
+        history, notes = [], []
+        for day in range(visits):
+            treatment = rng.choice(TREATMENTS)
+            when = (admission + timedelta(days=day)).isoformat()
+            cost = float(rng.choice((0, 150, 500, 2000)))
+            history.append({'date': when, 'notes': f"Stable, Treatment: {treatment}", 'cost': cost})
+            notes.append({'date': when, 'note': "Stable", 'treatment': treatment, 'cost': cost})
+        total = sum(entry['cost'] for entry in history)
+        patients[pid] = {
+            'id': pid, 'name': f"Patient {i}", 'age': rng.randint(1, 95), 'gender': rng.choice(GENDERS),
+            'symptoms': symptoms, 'assigned_doctor': doctor['name'] if doctor else None,
+            'assigned_doctor_id': doctor['id'] if doctor else None, 'status': status,
+            'history': history, 'admission': admission.isoformat() if status != 'outpatient' else None,
+            'discharge_date': (admission + timedelta(days=visits)).isoformat() if status == 'discharged' else None,
+            'treatment_total_cost': total,
+            'bill_amount': 500.0 if status == 'outpatient' else total,
+        }
+        if doctor is not None:
+            if status != 'discharged':
+                doctor['patients'].append(pid)
+            doctor['notes'][pid] = notes
+    return patients, doctors
+
+
+def operation_stream(config):
+    """The operation kinds to replay, in order (targets draw their subjects from live state)."""
+    rng = random.Random(config.seed + 1)
+    return [_pick(rng, config.mix) for _ in range(config.operations)]
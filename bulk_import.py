@@ -0,0 +1,146 @@
+import io
+import csv
+import json
+import time
+from data_storage import save_many_to_json
+from utilities import register_new_patient
+
+FORMATS = ('ndjson', 'csv')
+MAX_REPORTED_ERRORS = 1000
+
+
+# --------------------- BULK PATIENT IMPORT ---------------------
+def iter_rows(stream, fmt='ndjson'):
+    """
+    Yield (row_number, row_dict) from a text stream of NDJSON lines or CSV
+    with a header row. Rows that cannot be parsed yield the exception instead.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        row_number = 0
+        while True:
+            # The reader consumes the offending line before raising, so a
+            # malformed row is reported and the import carries on after it
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                row = ValueError(f"Invalid CSV: {e}")
+            row_number += 1
+            yield row_number, row
+    elif fmt == 'ndjson':
+        row_number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def parse_row(row):
+    """Validate one input row; returns (name, age, gender, symptoms, condition)."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    name = str(row.get('name') or '').strip()
+    age = row.get('age', '')
+    gender = str(row.get('gender') or '').strip()
+    symptoms = row.get('symptoms') or []
+    if isinstance(symptoms, str):
+        # CSV cells hold symptoms separated by ';' (commas delimit columns)
+        symptoms = [s for s in symptoms.replace(';', ',').split(',') if s.strip()]
+    condition = str(row.get('condition') or '').lower()
+    if not name or not age or not gender or not symptoms:
+        raise ValueError("All fields are required")
+    return name, age, gender, symptoms, condition
+
+
+def import_patients(stream, fmt='ndjson', chunk_size=1000):
+    """
+    Register every patient in the stream with the same routing and admission
+    rules as POST /api/patients. Changes are applied in memory and persisted
+    with one batched write of patients and touched doctors per chunk.
+    """
+    started = time.perf_counter()
+    result = {
+        'imported': 0,
+        'failed': 0,
+        'admitted': 0,
+        'outpatients': 0,
+        'chunks': 0,
+        'errors': [],
+    }
+    chunk_patients = []
+    chunk_doctors = {}
+
+    def flush_chunk():
+        if not chunk_patients:
+            return
+        save_many_to_json('patients.json', chunk_patients)
+        save_many_to_json('doctors.json', chunk_doctors.values())
+        result['chunks'] += 1
+        chunk_patients.clear()
+        chunk_doctors.clear()
+
+    for row_number, row in iter_rows(stream, fmt):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            fields = parse_row(row)
+            patient, doctor, _ = register_new_patient(*fields, persist=False)
+        except Exception as e:
+            result['failed'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'row': row_number, 'error': str(e)})
+            continue
+        result['imported'] += 1
+        if patient.status == 'inpatient':
+            result['admitted'] += 1
+        elif patient.status == 'outpatient':
+            result['outpatients'] += 1
+        chunk_patients.append(patient)
+        if doctor is not None:
+            chunk_doctors[doctor.id] = doctor
+        if len(chunk_patients) >= chunk_size:
+            flush_chunk()
+    flush_chunk()
+
+    elapsed = time.perf_counter() - started
+    result['elapsed_seconds'] = round(elapsed, 4)
+    result['rows_per_second'] = round((result['imported'] + result['failed']) / elapsed, 1) if elapsed else None
+    return result
+
+
+def detect_format(filename=None, content_type=None):
+    if content_type and 'csv' in content_type:
+        return 'csv'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+if __name__ == '__main__':
+    import argparse
+    from main import load_patients, load_doctors
+
+    parser = argparse.ArgumentParser(description="Bulk import patients from CSV or NDJSON.")
+    parser.add_argument('path', help="input file ('-' for stdin)")
+    parser.add_argument('--format', choices=FORMATS, help="defaults to csv for *.csv, else ndjson")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    load_doctors()
+    load_patients()
+    fmt = args.format or detect_format(args.path)
+    if args.path == '-':
+        import sys
+        summary = import_patients(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), fmt, args.chunk_size)
+    else:
+        with open(args.path, 'r', newline='', encoding='utf-8') as f:
+            summary = import_patients(f, fmt, args.chunk_size)
+    print(json.dumps(summary, indent=4))
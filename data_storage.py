@@ -1,35 +1,415 @@
 import os
 import json
+import atexit
+import importlib
+import threading
+from events import emit
+from instrumentation import get_logger, STORAGE_SAVE_SECONDS, STORAGE_SAVED_RECORDS, STORAGE_SAVE_ERRORS
 
-patients = {}
-doctors = {}
+log = get_logger('storage')
 
-def save_to_json(file_path, obj):
-    backup_path = file_path.replace('.json', '_backup.json')
-    
-    # Backup current file
-    if os.path.exists(file_path):
-        try:
-            os.replace(file_path, backup_path)
-            print(f"Backup created: {backup_path}")
-        except Exception as e:
-            print(f"Failed to backup: {e}")
-    
-    # Load backup data if it exists
+
+class Registry(dict):
+    """
+    The live {id: record} registry. Behaves like a dict, but announces
+    additions and removals ('<kind>.added' / '<kind>.removed' events).
+    """
+
+    def __init__(self, kind):
+        super().__init__()
+        self.kind = kind
+
+    def __setitem__(self, key, value):
+        old = self.get(key)
+        super().__setitem__(key, value)
+        if old is not value:
+            if old is not None:
+                emit(f'{self.kind}.removed', old)
+            emit(f'{self.kind}.added', value)
+
+    def __delitem__(self, key):
+        old = self[key]
+        super().__delitem__(key)
+        emit(f'{self.kind}.removed', old)
+
+    _missing = object()
+
+    def pop(self, key, default=_missing):
+        if key in self:
+            value = super().pop(key)
+            emit(f'{self.kind}.removed', value)
+            return value
+        if default is self._missing:
+            raise KeyError(key)
+        return default
+
+    def popitem(self):
+        key, value = super().popitem()
+        emit(f'{self.kind}.removed', value)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        super().clear()
+        emit(f'{self.kind}.cleared', self)
+
+
+patients = Registry('patient')
+doctors = Registry('doctor')
+
+
+def backup_path_for(file_path):
+    return file_path.replace('.json', '_backup.json')
+
+
+def index_path_for(file_path):
+    return file_path + '.idx'
+
+
+def load_json_with_backup(primary_path, backup_path):
+    """
+    Try to load JSON data from primary file.
+    If it fails, try to load from backup file.
+    """
     data = {}
+    if os.path.exists(primary_path):
+        with open(primary_path, 'r') as f:
+            try:
+                txt = f.read().strip()
+                if txt:
+                    data = json.loads(txt)
+                else:
+                    return load_backup(backup_path)
+            except Exception:
+                return load_backup(backup_path)
+        return data
+    else:
+        return load_backup(backup_path)
+
+
+def load_backup(backup_path):
     if os.path.exists(backup_path):
         with open(backup_path, 'r') as f:
             try:
-                data = json.load(f)
+                txt = f.read().strip()
+                if txt:
+                    log.warning("Loaded data from backup: %s", backup_path)
+                    return json.loads(txt)
             except json.JSONDecodeError as e:
-                print(f"Failed to load backup JSON: {e}")
-
-    data[obj.id] = obj.to_dict()
-    
-    # Save new data
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
-    print(f"Saved to {file_path}")
+                log.error("Failed to load backup %s: %s", backup_path, e)
+    return {}
+
+
+# --------------------- STORAGE BACKENDS ---------------------
+# Bulky per-record fields that lazy loading leaves on disk until first access
+LAZY_FIELDS = ('history', 'notes')
+
+class StorageBackend:
+    """Persistence strategy used by save_to_json and load_records."""
+
+    name = None
+    # Whether load_patients/load_doctors should read every record at startup
+    eager_load = True
+    # Whether load_summaries may leave LAZY_FIELDS out of the records
+    lazy = False
+
+    def save(self, file_path, obj):
+        self.save_many(file_path, [obj])
+
+    def save_many(self, file_path, objs):
+        raise NotImplementedError
+
+    def load(self, file_path):
+        raise NotImplementedError
+
+    def load_summaries(self, file_path):
+        """Like load(), but LAZY_FIELDS may be omitted and fetched later with load_field."""
+        return self.load(file_path)
+
+    def load_field(self, file_path, record_id, field):
+        return self.load(file_path).get(record_id, {}).get(field)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JsonFileBackend(StorageBackend):
+    """
+    Rewrites the whole JSON file on every save (the original behaviour).
+
+    In lazy mode (HOSPITAL_LAZY_LOAD=1) each save also writes a sidecar
+    index (<file>.idx) holding every record's summary fields and byte range.
+    Startup then reads only the index, and a record's history/notes are
+    decoded from its slice of the data file on first access.
+    """
+
+    name = 'json'
+
+    def __init__(self, lazy=None):
+        if lazy is None:
+            lazy = os.environ.get('HOSPITAL_LAZY_LOAD') == '1'
+        self.lazy = lazy
+        # file_path -> ((size, mtime_ns), {id: (start, end)}) of the last index written or read
+        self._offsets = {}
+
+    def save_many(self, file_path, objs):
+        # Serialize first: lazily loaded fields are read from the current file
+        records = [(obj.id, obj.to_dict()) for obj in objs]
+
+        # Current data (falls back to the backup if the file is missing or corrupt)
+        data = self.load(file_path)
+
+        for record_id, record in records:
+            data[record_id] = record
+
+        # Save new data
+        self.write_records(file_path, data, backup_path_for(file_path))
+        log.debug("Saved to %s", file_path)
+
+    def load(self, file_path):
+        return load_json_with_backup(file_path, backup_path_for(file_path))
+
+    def write_records(self, file_path, data, backup_path=None):
+        """
+        Write `data` as json.dump(data, f, indent=4) would, plus the index in
+        lazy mode. The new file is written beside the old one and swapped in,
+        so readers never see a half-written file; the old file becomes the
+        backup when `backup_path` is given.
+        """
+        offsets = {}
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for chunk in self._encode(data, offsets):
+                f.write(chunk)
+        if backup_path and os.path.exists(file_path):
+            try:
+                os.replace(file_path, backup_path)
+                log.debug("Backup created: %s", backup_path)
+            except Exception as e:
+                log.warning("Failed to backup: %s", e)
+        os.replace(tmp_path, file_path)
+        if self.lazy:
+            self._write_index(file_path, data, offsets)
+
+    @staticmethod
+    def _encode(data, offsets):
+        # Records are encoded one at a time so each one's byte range is known
+        if not data:
+            yield b'{}'
+            return
+        position = 0
+        for number, (record_id, record) in enumerate(data.items()):
+            prefix = ('{\n    ' if number == 0 else ',\n    ') + json.dumps(record_id) + ': '
+            body = json.dumps(record, indent=4).replace('\n', '\n    ')
+            position += len(prefix)
+            offsets[record_id] = (position, position + len(body))
+            position += len(body)
+            # json.dumps escapes non-ASCII, so character and byte offsets agree
+            yield (prefix + body).encode('ascii')
+        yield b'\n}'
+
+    def _signature(self, file_path):
+        stat = os.stat(file_path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _write_index(self, file_path, data, offsets):
+        signature = self._signature(file_path)
+        index = {
+            'size': signature[0],
+            'mtime_ns': signature[1],
+            'records': {
+                record_id: [start, end, {k: v for k, v in data[record_id].items() if k not in LAZY_FIELDS}]
+                for record_id, (start, end) in offsets.items()
+            },
+        }
+        index_path = index_path_for(file_path)
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(index_path + '.tmp', index_path)
+        self._offsets[file_path] = (signature, offsets)
+
+    def _canonical_offsets(self, file_path, data):
+        """Record byte ranges if the file is exactly what write_records would produce, else None."""
+        offsets = {}
+        with open(file_path, 'rb') as f:
+            for chunk in self._encode(data, offsets):
+                if f.read(len(chunk)) != chunk:
+                    return None
+            if f.read(1):
+                return None
+        return offsets
+
+    def load_summaries(self, file_path):
+        if not self.lazy:
+            return self.load(file_path)
+        try:
+            with open(index_path_for(file_path), 'r') as f:
+                index = json.load(f)
+            signature = self._signature(file_path)
+            if signature == (index['size'], index['mtime_ns']):
+                records = index['records']
+                self._offsets[file_path] = (signature, {rid: (start, end) for rid, (start, end, _) in records.items()})
+                return {rid: summary for rid, (_, _, summary) in records.items()}
+        except (OSError, ValueError, KeyError):
+            pass
+        # Missing or stale index: load everything, and index the file if it is in canonical form
+        data = self.load(file_path)
+        if data and os.path.exists(file_path):
+            offsets = self._canonical_offsets(file_path, data)
+            if offsets is not None:
+                self._write_index(file_path, data, offsets)
+        return data
+
+    def load_field(self, file_path, record_id, field):
+        signature, offsets = self._offsets.get(file_path, (None, {}))
+        if record_id in offsets:
+            try:
+                if self._signature(file_path) == signature:
+                    start, end = offsets[record_id]
+                    with open(file_path, 'rb') as f:
+                        f.seek(start)
+                        record = json.loads(f.read(end - start))
+                    if record.get('id', record_id) == record_id:
+                        return record.get(field)
+            except (OSError, ValueError):
+                pass
+        return super().load_field(file_path, record_id, field)
+
+
+BACKENDS = {
+    JsonFileBackend.name: JsonFileBackend,
+}
+
+# Backends living in their own modules register themselves on import
+OPTIONAL_BACKENDS = {
+    'journal': 'journal_storage',
+    'sqlite': 'sqlite_storage',
+    'snapshot': 'snapshot_storage',
+}
+
+_backend = None
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+
+def configure_storage(name=None, **options):
+    """
+    Select the storage backend used by save_to_json/load_records.
+    Defaults to the HOSPITAL_STORAGE environment variable, then 'json'.
+    """
+    global _backend
+    name = name or os.environ.get('HOSPITAL_STORAGE', JsonFileBackend.name)
+    if name not in BACKENDS and name in OPTIONAL_BACKENDS:
+        importlib.import_module(OPTIONAL_BACKENDS[name])
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    if _writer is not None:
+        _writer.flush()
+    if _backend is not None:
+        _backend.close()
+    _backend = BACKENDS[name](**options)
+    return _backend
+
+
+def get_storage_backend():
+    if _backend is None:
+        configure_storage()
+    return _backend
+
+
+def load_records(file_path):
+    """Return the {id: record_dict} mapping persisted at file_path."""
+    return get_storage_backend().load(file_path)
+
+
+def load_summaries(file_path):
+    """Like load_records, but LAZY_FIELDS are left out when the backend is in lazy mode."""
+    return get_storage_backend().load_summaries(file_path)
+
+
+def load_field(file_path, record_id, field):
+    """Fetch one field of a record that was loaded without it."""
+    return get_storage_backend().load_field(file_path, record_id, field)
+
+
+def flush_storage():
+    """
+    Barrier: write everything queued for the write-behind worker, then flush
+    the backend. Returns False if queued saves could not be written.
+    """
+    written = _writer.flush() if _writer is not None else True
+    if _backend is not None:
+        _backend.flush()
+    return written
+
+
+def close_storage():
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+    if _backend is not None:
+        _backend.close()
+
+
+atexit.register(close_storage)
+
+
+# --------------------- SAVING ---------------------
+# Optional write_behind.PersistenceWorker; without one, saves are written
+# synchronously under a lock so concurrent requests cannot interleave
+_writer = None
+_save_lock = threading.Lock()
+
+
+def set_writer(writer):
+    global _writer
+    _writer = writer
+
+
+def get_writer():
+    return _writer
+
+
+def save_to_json(file_path, obj):
+    save_many_to_json(file_path, [obj])
+
+
+def save_many_to_json(file_path, objs):
+    objs = list(objs)
+    if not objs:
+        return
+    if _writer is not None:
+        _writer.submit(file_path, objs)
+        return
+    with _save_lock:
+        write_to_backend(get_storage_backend(), file_path, objs)
+
+
+def write_to_backend(backend, file_path, objs):
+    """backend.save_many, timed and counted for /metrics (also used by the write-behind worker)."""
+    labels = {'file': file_path, 'backend': backend.name}
+    try:
+        with STORAGE_SAVE_SECONDS.time(**labels):
+            backend.save_many(file_path, objs)
+    except Exception:
+        STORAGE_SAVE_ERRORS.inc(**labels)
+        raise
+    STORAGE_SAVED_RECORDS.inc(len(objs), **labels)
+
 
 def save_patient_to_json(patient):
     save_to_json('patients.json', patient)
@@ -2,35 +2,103 @@ import json
 import os
 import uuid
 from datetime import datetime
+from events import emit
+from data_storage import load_field
+from records import NoteEntry, NoteLog, intern_text
+from versions import next_version, VersionedField
+from instrumentation import get_logger
+
+log = get_logger('doctors')
 
 
 # --------------------- DOCTOR CLASS ---------------------
 class Doctor:
+    __slots__ = ('id', '_name', '_specialization', 'patients', '_notes', '_on_leave', 'version')
+
     def __init__(self, name, specialization):
-        self.id = "DOC-" + str(uuid.uuid4())[:5]
-        self.name = name
-        self.specialization = specialization
+        self.id = intern_text("DOC-" + str(uuid.uuid4())[:5])
+        self._name = intern_text(name)
+        self._specialization = intern_text(specialization)
         self.patients = []
-        self.notes = {}
+        self._notes = {}
+        self._on_leave = False
+        # Bumped by every change, for the API's ETags
+        self.version = next_version()
+
+    def _touch(self):
+        self.version = next_version('doctor')
+
+    name = VersionedField()
+    specialization = VersionedField()
+
+    @property
+    def notes(self):
+        if self._notes is None:
+            # Left on disk by a lazy load until first needed
+            self.notes = load_field('doctors.json', self.id, 'notes') or {}
+        return self._notes
+
+    @notes.setter
+    def notes(self, value):
+        if value is not None:
+            value = {intern_text(pid): NoteLog(entries)
+                     for pid, entries in value.items()}
+        self._notes = value
+
+    @property
+    def on_leave(self):
+        return self._on_leave
+
+    @on_leave.setter
+    def on_leave(self, value):
+        old = self._on_leave
+        self._on_leave = value
+        if old != value:
+            self._touch()
+            emit('doctor.leave', self, old=old, new=value)
 
     def assign_patient(self, patient):
         if patient.id not in self.patients:
             self.patients.append(patient.id)
             patient.assigned_doctor = self.name
-            print(f"Patient {patient.name} assigned to {self.name}")
+            patient.assigned_doctor_id = self.id
+            self._touch()
+            emit('doctor.patients', self, added=patient.id)
+            log.info("Patient %s assigned to %s", patient.name, self.name)
+
+    def release_patient(self, patient_id):
+        """Drop a patient from this doctor's list (discharge or reassignment)."""
+        if patient_id in self.patients:
+            self.patients.remove(patient_id)
+            self._touch()
+            emit('doctor.patients', self, removed=patient_id)
 
     def log_condition(self, patient_id, note, treatment=None, cost=0):
         today = datetime.now().strftime("%Y-%m-%d")
         if patient_id not in self.notes:
-            self.notes[patient_id] = []
-        self.notes[patient_id].append({'date': today, 'note': note, 'treatment': treatment, 'cost': cost})
+            self.notes[patient_id] = NoteLog()
+        self.notes[patient_id].append(NoteEntry(today, note, treatment, cost))
+        self._touch()
 
     def discharge_patient(self, patient, bill):
         patient.discharge(bill)
         # Remove patient from doctor's patient list
-        if patient.id in self.patients:
-            self.patients.remove(patient.id)
-        print(f"Dr. {self.name} discharged {patient.name} with bill ₹{bill}")
+        self.release_patient(patient.id)
+        log.info("Dr. %s discharged %s with bill ₹%s", self.name, patient.name, bill)
+
+    @classmethod
+    def from_dict(cls, data, doctor_id=None, lazy=False):
+        doctor = cls(data['name'], data['specialization'])
+        doctor.id = intern_text(doctor_id or data['id'])
+        doctor.patients = [intern_text(pid) for pid in data.get('patients', [])]
+        if lazy and 'notes' not in data:
+            doctor.notes = None
+        else:
+            doctor.notes = data.get('notes', {})
+        if data.get('on_leave'):
+            # Not registered yet: set without a change event
+            doctor._on_leave = True
+        return doctor
 
     def to_dict(self):
         return {
@@ -38,5 +106,6 @@ class Doctor:
             "name": self.name,
             "specialization": self.specialization,
             "patients": self.patients,
-            "notes": self.notes
+            "notes": {pid: [entry.to_dict() for entry in entries] for pid, entries in self.notes.items()},
+            "on_leave": self.on_leave
         }
\ No newline at end of file
@@ -0,0 +1,88 @@
+from events import subscribe
+from data_storage import doctors
+
+
+# --------------------- DOCTOR INDEX ---------------------
+class DoctorIndex:
+    """
+    Hash indexes over the `doctors` registry: by name and by lower-cased
+    specialization, the latter split into all doctors and those available
+    (not on leave). Kept current from registry and leave events, so routing
+    lookups never scan every doctor.
+
+    Names are not unique; lookups by name return the first doctor registered
+    under that name, matching the order a scan of the registry would give.
+    """
+
+    def __init__(self):
+        self.rebuild()
+
+    def rebuild(self):
+        self.by_name = {}
+        self.by_specialization = {}
+        self.available = {}
+        for doctor in doctors.values():
+            self._add(doctor)
+
+    @staticmethod
+    def _key(specialization):
+        return (specialization or '').lower()
+
+    def _add(self, doctor):
+        self.by_name.setdefault(doctor.name, {})[doctor.id] = doctor
+        key = self._key(doctor.specialization)
+        self.by_specialization.setdefault(key, {})[doctor.id] = doctor
+        if not doctor.on_leave:
+            self.available.setdefault(key, {})[doctor.id] = doctor
+
+    def _discard(self, table, key, doctor):
+        bucket = table.get(key)
+        if bucket and bucket.get(doctor.id) is doctor:
+            del bucket[doctor.id]
+            if not bucket:
+                del table[key]
+
+    def _remove(self, doctor):
+        key = self._key(doctor.specialization)
+        self._discard(self.by_name, doctor.name, doctor)
+        self._discard(self.by_specialization, key, doctor)
+        self._discard(self.available, key, doctor)
+
+    def on_event(self, event, record, details):
+        if event == 'doctor.added':
+            self._add(record)
+        elif event == 'doctor.removed':
+            self._remove(record)
+        elif event == 'doctor.cleared':
+            self.rebuild()
+        elif event == 'doctor.leave' and doctors.get(record.id) is record:
+            key = self._key(record.specialization)
+            if record.on_leave:
+                self._discard(self.available, key, record)
+            else:
+                self.available.setdefault(key, {})[record.id] = record
+
+    # ---- lookups ----
+    def find_by_name(self, name):
+        bucket = self.by_name.get(name)
+        return next(iter(bucket.values())) if bucket else None
+
+    def with_specialization(self, specialization, include_on_leave=True):
+        table = self.by_specialization if include_on_leave else self.available
+        return list(table.get(self._key(specialization), {}).values())
+
+    def all_available(self):
+        return [doctor for bucket in self.available.values() for doctor in bucket.values()]
+
+    def for_patient(self, patient):
+        """Resolve a patient's doctor by id reference, falling back to the stored name."""
+        doctor = doctors.get(patient.assigned_doctor_id) if patient.assigned_doctor_id else None
+        if doctor is None and patient.assigned_doctor:
+            doctor = self.find_by_name(patient.assigned_doctor)
+            if doctor is not None:
+                patient.assigned_doctor_id = doctor.id
+        return doctor
+
+
+doctor_index = DoctorIndex()
+subscribe(doctor_index.on_event)
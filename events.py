@@ -0,0 +1,25 @@
+"""Change notifications for patient and doctor records.
+
+Mutating methods on Patient/Doctor and the registries in data_storage call
+emit(); derived structures (statistics, indexes, ...) subscribe to keep
+themselves up to date instead of rescanning every record.
+"""
+
+_listeners = []
+
+
+def subscribe(listener):
+    """Register listener(event, record, details); returns the listener."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def emit(event, record, **details):
+    for listener in _listeners:
+        listener(event, record, details)
@@ -0,0 +1,76 @@
+import json
+import zlib
+from repository import get_repository
+
+EXPORT_KINDS = ('patients', 'doctors')
+FORMATS = ('ndjson', 'json')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+BATCH_SIZE = 500
+
+
+# --------------------- STREAMING EXPORT ---------------------
+def iter_export(kind, fmt='ndjson', cursor=None, repo=None, batch_size=BATCH_SIZE):
+    """
+    Yield text chunks of a full export ordered by record id, starting after
+    `cursor`. 'ndjson' writes one record per line; 'json' writes the same
+    {"success": true, "data": {id: record}} document as GET /api/<kind>.
+    Each chunk holds at most `batch_size` records.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    repo = repo or get_repository()
+    records = repo.export_records(kind, cursor, batch_size)
+    if fmt == 'json':
+        yield '{"success": true, "data": {'
+    batch = []
+    first = True
+    for record in records:
+        if fmt == 'ndjson':
+            batch.append(json.dumps(record) + '\n')
+        else:
+            batch.append(('' if first else ',') + '\n' + json.dumps(record['id']) + ': ' + json.dumps(record))
+            first = False
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch.clear()
+    if batch:
+        yield ''.join(batch)
+    if fmt == 'json':
+        yield '\n}}\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of text chunks into gzip bytes without buffering the whole body."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from main import load_patients, load_doctors
+
+    parser = argparse.ArgumentParser(description="Stream a full export of patients or doctors.")
+    parser.add_argument('kind', choices=EXPORT_KINDS)
+    parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    parser.add_argument('--cursor', help="resume after this record id")
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--output', help="output file (default stdout)")
+    args = parser.parse_args()
+
+    load_doctors()
+    load_patients()
+    chunks = iter_export(args.kind, args.format, args.cursor)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for data in (gzip_chunks(chunks) if args.gzip else (c.encode('utf-8') for c in chunks)):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
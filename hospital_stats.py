@@ -0,0 +1,113 @@
+import os
+import math
+from events import subscribe
+from data_storage import patients, doctors
+
+
+# --------------------- LIVE STATISTICS ---------------------
+class HospitalStats:
+    """
+    Incrementally maintained dashboard aggregates: patient counts per status,
+    total revenue and per-doctor load (non-discharged patients per doctor name).
+
+    Only patients present in the `patients` registry are counted. With
+    verify=True every snapshot() is checked against a full recompute.
+    """
+
+    def __init__(self, verify=False):
+        self.verify_on_read = verify
+        self.rebuild()
+
+    @staticmethod
+    def _compute():
+        status_counts = {}
+        doctor_load = {}
+        revenue = 0
+        for p in patients.values():
+            status_counts[p.status] = status_counts.get(p.status, 0) + 1
+            revenue += p.bill_amount
+            if p.assigned_doctor and p.status != 'discharged':
+                doctor_load[p.assigned_doctor] = doctor_load.get(p.assigned_doctor, 0) + 1
+        return status_counts, revenue, doctor_load
+
+    def rebuild(self):
+        """Recompute every aggregate from scratch (O(patients))."""
+        self.status_counts, self.revenue, self.doctor_load = self._compute()
+
+    # ---- incremental updates ----
+    @staticmethod
+    def _bump(counter, key, delta):
+        count = counter.get(key, 0) + delta
+        if count:
+            counter[key] = count
+        else:
+            counter.pop(key, None)
+
+    def _load_key(self, doctor_name, status):
+        return doctor_name if doctor_name and status != 'discharged' else None
+
+    def _apply(self, patient, sign):
+        self._bump(self.status_counts, patient.status, sign)
+        self.revenue += sign * patient.bill_amount
+        key = self._load_key(patient.assigned_doctor, patient.status)
+        if key:
+            self._bump(self.doctor_load, key, sign)
+
+    def on_event(self, event, record, details):
+        if event == 'patient.added':
+            self._apply(record, 1)
+        elif event == 'patient.removed':
+            self._apply(record, -1)
+        elif event == 'patient.cleared':
+            self.rebuild()
+        elif event in ('patient.status', 'patient.bill', 'patient.doctor'):
+            if patients.get(record.id) is not record:
+                return
+            old, new = details['old'], details['new']
+            if event == 'patient.bill':
+                self.revenue += (new or 0) - (old or 0)
+                return
+            if event == 'patient.status':
+                self._bump(self.status_counts, old, -1)
+                self._bump(self.status_counts, new, 1)
+                old_key = self._load_key(record.assigned_doctor, old)
+                new_key = self._load_key(record.assigned_doctor, new)
+            else:
+                old_key = self._load_key(old, record.status)
+                new_key = self._load_key(new, record.status)
+            if old_key != new_key:
+                if old_key:
+                    self._bump(self.doctor_load, old_key, -1)
+                if new_key:
+                    self._bump(self.doctor_load, new_key, 1)
+
+    # ---- reads ----
+    def verify(self):
+        """Return a list of mismatches between the live aggregates and a full recompute."""
+        status_counts, revenue, doctor_load = self._compute()
+        problems = []
+        if status_counts != self.status_counts:
+            problems.append(f"status counts {self.status_counts} != {status_counts}")
+        if not math.isclose(revenue, self.revenue, rel_tol=1e-9, abs_tol=1e-6):
+            problems.append(f"revenue {self.revenue} != {revenue}")
+        if doctor_load != self.doctor_load:
+            problems.append(f"doctor load {self.doctor_load} != {doctor_load}")
+        return problems
+
+    def snapshot(self):
+        if self.verify_on_read:
+            problems = self.verify()
+            if problems:
+                raise AssertionError("Statistics out of sync: " + "; ".join(problems))
+        return {
+            'total_patients': len(patients),
+            'inpatients': self.status_counts.get('inpatient', 0),
+            'outpatients': self.status_counts.get('outpatient', 0),
+            'discharged': self.status_counts.get('discharged', 0),
+            'total_revenue': self.revenue,
+            'total_doctors': len(doctors),
+        }
+
+
+stats = HospitalStats(verify=os.environ.get('HOSPITAL_STATS_VERIFY') == '1')
+subscribe(stats.on_event)
@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+
+# Seconds; the Prometheus client's defaults stretched down to sub-millisecond hot paths
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+# HOSPITAL_METRICS=0 turns every timer and counter into a no-op
+enabled = os.environ.get('HOSPITAL_METRICS', '1') != '0'
+
+
+# --------------------- LOGGING ---------------------
+def get_logger(name):
+    """A logger under the 'hospital' hierarchy, e.g. get_logger('storage')."""
+    return logging.getLogger(f'hospital.{name}')
+
+
+def configure_logging(default='WARNING', stream=None):
+    """
+    Send the 'hospital.*' loggers to stderr at the HOSPITAL_LOG_LEVEL level
+    (DEBUG, INFO, WARNING, ERROR), falling back to `default`. Until this is
+    called only warnings and errors are shown, and disabled levels cost one
+    isEnabledFor() check per call.
+    """
+    level = os.environ.get('HOSPITAL_LOG_LEVEL', default).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Unknown log level: {level}")
+    logger = logging.getLogger('hospital')
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+# --------------------- METRICS ---------------------
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named family of samples, one per combination of label values."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """[(sample name, [(label, value), ...], value)] for render()."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, list(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram(Metric):
+    """
+    Observations counted into cumulative `le` buckets, with their sum and
+    count, as Prometheus histograms are exposed.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block."""
+        return Timer(self, labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in items:
+            labels = list(zip(self.labelnames, key))
+            total = 0
+            for bound, hits in zip(self.buckets + (float('inf'),), state):
+                total += hits
+                samples.append((self.name + '_bucket', labels + [('le', _format_value(bound))], total))
+            samples.append((self.name + '_sum', labels, state[-1]))
+            samples.append((self.name + '_count', labels, total))
+        return samples
+
+
+class Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Registry:
+    """The metrics exposed at /metrics, plus collectors for state kept elsewhere."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """
+        collector() returns [(name, type, documentation, [(labels dict, value), ...])]
+        for values sampled at scrape time (cache sizes, queue depths, ...).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def family(name, kind, documentation, samples):
+            lines.append(f'# HELP {name} ' + documentation.replace('\\', r'\\').replace('\n', r'\n'))
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in samples:
+                lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            family(metric.name, metric.type, metric.documentation, metric.samples())
+        for collector in list(self._collectors):
+            for name, kind, documentation, values in collector():
+                family(name, kind, documentation,
+                       [(name, sorted(labels.items()), value) for labels, value in values])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# --------------------- HOT-PATH METRICS ---------------------
+STORAGE_SAVE_SECONDS = registry.histogram(
+    'hospital_storage_save_seconds', "Time writing a batch of records to the storage backend.",
+    ('file', 'backend'))
+STORAGE_SAVED_RECORDS = registry.counter(
+    'hospital_storage_saved_records_total', "Records written to the storage backend.", ('file', 'backend'))
+STORAGE_SAVE_ERRORS = registry.counter(
+    'hospital_storage_save_errors_total', "Failed batch writes.", ('file', 'backend'))
+STORAGE_LOAD_SECONDS = registry.histogram(
+    'hospital_storage_load_seconds', "Time loading a file's records at startup.", ('file', 'backend'))
+STORAGE_LOADED_RECORDS = registry.counter(
+    'hospital_storage_loaded_records_total', "Records loaded at startup.", ('file', 'backend'))
+ASSIGNMENT_SECONDS = registry.histogram(
+    'hospital_doctor_assignment_seconds', "Time choosing and assigning a doctor to a patient.")
+ASSIGNMENTS = registry.counter(
+    'hospital_doctor_assignments_total',
+    "Doctor assignments by result (specialist, fallback or unassigned).", ('result',))
+SYMPTOM_MATCH_SECONDS = registry.histogram(
+    'hospital_symptom_match_seconds', "Time matching a patient's symptoms against the rules.")
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'hospital_http_request_seconds', "Flask request handling time by route.", ('method', 'route', 'status'))
+
+
+def instrument_app(app):
+    """Time every request of a Flask app by its URL rule (not the raw path, which would explode labels)."""
+    from flask import request, g
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                         route=rule, status=response.status_code)
+        return response
+
+    return app
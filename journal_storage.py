@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import zlib
+
+from data_storage import StorageBackend, load_json_with_backup, backup_path_for, register_backend
+from json_cache import json_cache, encode as encode_json
+from instrumentation import get_logger
+
+log = get_logger('storage')
+
+
+# --------------------- RECORD JOURNAL ---------------------
+class RecordJournal:
+    """
+    Append-only log of per-record changes on top of a JSON snapshot.
+
+    Each line is "<crc32> <json>" where the JSON is {"id": ..., "record": ...}.
+    Lines are fsynced in batches and folded into the snapshot by compact().
+    A torn or corrupt tail (e.g. after a crash mid-write) is dropped on recovery.
+    """
+
+    def __init__(self, snapshot_path, fsync_batch=64, fsync_interval=0.5, compact_threshold=1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + '.journal'
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.entries = 0
+        self._fh = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._recovered = False
+
+    @staticmethod
+    def encode(record_id, record):
+        return RecordJournal.encode_fragment(record_id, encode_json(record))
+
+    @staticmethod
+    def encode_fragment(record_id, fragment):
+        """Journal line for a record already encoded as compact JSON (see json_cache)."""
+        payload = b'{"id":' + encode_json(record_id) + b',"record":' + fragment + b'}'
+        return b'%08x ' % zlib.crc32(payload) + payload + b'\n'
+
+    @staticmethod
+    def decode(line):
+        if not line.endswith(b'\n'):
+            raise ValueError("incomplete journal line")
+        crc, _, payload = line[:-1].partition(b' ')
+        if int(crc, 16) != zlib.crc32(payload):
+            raise ValueError("journal checksum mismatch")
+        entry = json.loads(payload)
+        return entry['id'], entry['record']
+
+    def _read_snapshot(self):
+        return load_json_with_backup(self.snapshot_path, backup_path_for(self.snapshot_path))
+
+    def _replay(self, data):
+        """Apply valid journal lines to data; return (entries, valid_bytes, file_size)."""
+        if not os.path.exists(self.journal_path):
+            return 0, 0, 0
+        entries = 0
+        valid = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    record_id, record = self.decode(line)
+                except (ValueError, KeyError):
+                    break
+                data[record_id] = record
+                entries += 1
+                valid += len(line)
+            size = f.seek(0, os.SEEK_END)
+        return entries, valid, size
+
+    def recover(self):
+        """Load the snapshot, replay the journal and truncate any torn tail."""
+        self.close()
+        data = self._read_snapshot()
+        entries, valid, size = self._replay(data)
+        if valid < size:
+            log.warning("Discarding %d bytes of incomplete journal: %s", size - valid, self.journal_path)
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid)
+                f.flush()
+                os.fsync(f.fileno())
+        self.entries = entries
+        self._recovered = True
+        return data
+
+    def append(self, records):
+        """Append (record_id, JSON fragment) pairs to the journal."""
+        if not self._recovered:
+            self.recover()
+        fh = self._handle()
+        fh.write(b''.join(self.encode_fragment(record_id, fragment) for record_id, fragment in records))
+        fh.flush()
+        self._unsynced += len(records)
+        self.entries += len(records)
+        if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        if self.entries >= self.compact_threshold:
+            self.compact()
+
+    def sync(self):
+        if self._fh is not None and self._unsynced:
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and start an empty journal."""
+        self.sync()
+        data = self._read_snapshot()
+        self._replay(data)
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Replaying the old journal over the new snapshot is harmless,
+        # so a crash before this truncate cannot lose data.
+        self._close_handle()
+        with open(self.journal_path, 'wb') as f:
+            os.fsync(f.fileno())
+        self.entries = 0
+        return data
+
+    def close(self):
+        self.sync()
+        self._close_handle()
+
+    def _handle(self):
+        if self._fh is None:
+            self._fh = open(self.journal_path, 'ab')
+        return self._fh
+
+    def _close_handle(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class JournalBackend(StorageBackend):
+    """
+    Storage backend that appends changed records to a journal per data file
+    instead of rewriting the whole file, with periodic compaction.
+    """
+
+    name = 'journal'
+
+    def __init__(self, fsync_batch=64, fsync_interval=0.5, compact_threshold=1000):
+        self.options = {
+            'fsync_batch': fsync_batch,
+            'fsync_interval': fsync_interval,
+            'compact_threshold': compact_threshold,
+        }
+        self.journals = {}
+
+    def journal_for(self, file_path):
+        journal = self.journals.get(file_path)
+        if journal is None:
+            journal = RecordJournal(file_path, **self.options)
+            self.journals[file_path] = journal
+        return journal
+
+    def save_many(self, file_path, objs):
+        # Fragments already encoded (for an API read or a write-behind snapshot) are spliced in as is
+        self.journal_for(file_path).append([(obj.id, json_cache.fragment(obj)) for obj in objs])
+
+    def load(self, file_path):
+        return self.journal_for(file_path).recover()
+
+    def compact(self, file_path=None):
+        paths = [file_path] if file_path else list(self.journals)
+        for path in paths:
+            self.journal_for(path).compact()
+
+    def flush(self):
+        for journal in self.journals.values():
+            journal.sync()
+
+    def close(self):
+        for journal in self.journals.values():
+            journal.close()
+
+
+register_backend(JournalBackend.name, JournalBackend)
@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from events import subscribe
+
+DEFAULT_BUDGET_MB = 64
+# Rough per-entry cost beyond the bytes themselves (key tuple, OrderedDict node)
+ENTRY_OVERHEAD = 200
+
+
+def encode(value):
+    """Compact JSON bytes, escaped to ASCII as jsonify does."""
+    return json.dumps(value, separators=(',', ':')).encode('ascii')
+
+
+# --------------------- SERIALIZED RECORD CACHE ---------------------
+class SerializedCache:
+    """
+    LRU cache of each patient's and doctor's to_dict() encoded as compact
+    JSON, so list endpoints and persistence splice the stored fragments
+    instead of rebuilding and re-encoding unchanged records.
+
+    An entry is stored with the record's version and is only served while the
+    version still matches; every mutating method on Patient/Doctor bumps it,
+    which invalidates the entry. Removed records are dropped. Entries beyond
+    the memory budget (bytes of JSON plus ENTRY_OVERHEAD each) are evicted
+    least recently used first.
+    """
+
+    def __init__(self, budget_bytes=None):
+        if budget_bytes is None:
+            budget_bytes = int(float(os.environ.get('HOSPITAL_JSON_CACHE_MB', DEFAULT_BUDGET_MB)) * 1024 * 1024)
+        self.budget = budget_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(record):
+        return type(record).__name__.lower(), record.id
+
+    def fragment(self, record):
+        """The JSON bytes of record.to_dict(), from the cache when still current."""
+        snapshot = getattr(record, 'fragment', None)
+        if snapshot is not None:
+            # A write_behind.RecordSnapshot is already encoded
+            return snapshot
+        key = self._key(record)
+        version = record.version
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Encoded outside the lock; the version was read first, so a change
+        # made meanwhile leaves an entry that no later lookup matches
+        data = encode(record.to_dict())
+        cost = len(data) + ENTRY_OVERHEAD
+        if cost > self.budget:
+            return data
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1]) + ENTRY_OVERHEAD
+            self._entries[key] = (version, data)
+            self.size += cost
+            while self.size > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted) + ENTRY_OVERHEAD
+                self.evictions += 1
+        return data
+
+    def join_object(self, records):
+        """b'{"<id>":<record>,...}' for the records."""
+        return b'{' + b','.join(encode(record.id) + b':' + self.fragment(record) for record in records) + b'}'
+
+    def join_array(self, records):
+        return b'[' + b','.join(self.fragment(record) for record in records) + b']'
+
+    def discard(self, kind, record_id):
+        with self._lock:
+            entry = self._entries.pop((kind, record_id), None)
+            if entry is not None:
+                self.size -= len(entry[1]) + ENTRY_OVERHEAD
+
+    def clear(self, kind=None):
+        with self._lock:
+            for key in [key for key in self._entries if kind is None or key[0] == kind]:
+                self.size -= len(self._entries.pop(key)[1]) + ENTRY_OVERHEAD
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'budget_bytes': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def on_event(self, event, record, details):
+        kind, _, action = event.partition('.')
+        if action == 'removed':
+            self.discard(kind, record.id)
+        elif action == 'cleared':
+            self.clear(kind)
+
+
+def envelope(data, **extra):
+    """The bytes jsonify({'success': True, 'data': ..., **extra}) would send, for pre-encoded data."""
+    tail = b''.join(b',' + encode(name) + b':' + encode(value) for name, value in extra.items())
+    return b'{"success":true,"data":' + data + tail + b'}'
+
+
+json_cache = SerializedCache()
+subscribe(json_cache.on_event)
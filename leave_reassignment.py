@@ -0,0 +1,96 @@
+import heapq
+import time
+from data_storage import save_many_to_json
+from repository import get_repository
+from instrumentation import get_logger
+
+log = get_logger('doctors')
+
+
+# --------------------- LEAVE REASSIGNMENT ---------------------
+def plan_leave(doctor):
+    """
+    Plan moving every patient of `doctor` to the other available doctors,
+    without changing anything. The pool is the doctor's specialization, or
+    every available doctor when nobody else in it is available. Each patient
+    goes to the least loaded doctor in the pool at that point, ties going to
+    the doctor registered first, as repeated least_loaded_doctor() calls
+    would choose, but from one heap built up front.
+
+    Returns {'doctor_id', 'pool', 'moves': [{'patient_id', 'patient_name',
+    'to_doctor_id', 'to_doctor_name'}], 'unassigned': [patient ids],
+    'missing': [ids of listed patients that no longer exist], 'loads':
+    {doctor_id: patients after the moves}}; 'pool' is 'specialization',
+    'any' or None when no doctor is available.
+    """
+    repo = get_repository()
+    pool = 'specialization'
+    loads = repo.doctor_loads(doctor.specialization, exclude=(doctor.id,))
+    if not loads:
+        pool = 'any'
+        loads = repo.doctor_loads(exclude=(doctor.id,))
+    if not loads:
+        pool = None
+    heap = [(load, order, doctor_id) for order, (doctor_id, load) in enumerate(loads)]
+    heapq.heapify(heap)
+
+    moves, unassigned, missing = [], [], []
+    chosen = {}
+    for pid in list(doctor.patients):
+        patient = repo.get_patient(pid)
+        if patient is None:
+            missing.append(pid)
+            continue
+        if not heap:
+            unassigned.append(pid)
+            continue
+        load, order, doctor_id = heap[0]
+        heapq.heapreplace(heap, (load + 1, order, doctor_id))
+        if doctor_id not in chosen:
+            chosen[doctor_id] = repo.get_doctor(doctor_id)
+        moves.append({'patient_id': pid, 'patient_name': patient.name,
+                      'to_doctor_id': doctor_id, 'to_doctor_name': chosen[doctor_id].name})
+    return {
+        'doctor_id': doctor.id,
+        'pool': pool,
+        'moves': moves,
+        'unassigned': unassigned,
+        'missing': missing,
+        'loads': {doctor_id: load for load, _, doctor_id in heap if doctor_id in chosen},
+    }
+
+
+def reassign_on_leave(doctor, dry_run=False):
+    """
+    Mark `doctor` on leave and apply plan_leave(doctor) in memory, then save
+    every moved patient and touched doctor with one batched write per file.
+    With dry_run=True only the plan is returned. Returns the plan plus
+    'applied', 'reassigned' and 'elapsed_seconds'.
+    """
+    started = time.perf_counter()
+    plan = plan_leave(doctor)
+    if dry_run:
+        return dict(plan, applied=False, reassigned=0, elapsed_seconds=round(time.perf_counter() - started, 4))
+
+    repo = get_repository()
+    doctor.on_leave = True
+    log.info("Doctor %s is now marked as on leave.", doctor.name)
+    moved_patients = []
+    touched_doctors = {doctor.id: doctor}
+    try:
+        for move in plan['moves']:
+            patient = repo.get_patient(move['patient_id'])
+            target = touched_doctors.get(move['to_doctor_id']) or repo.get_doctor(move['to_doctor_id'])
+            target.assign_patient(patient)
+            doctor.release_patient(patient.id)
+            touched_doctors[target.id] = target
+            moved_patients.append(patient)
+    finally:
+        # Whatever was moved is persisted, in one write per file
+        save_many_to_json('patients.json', moved_patients)
+        save_many_to_json('doctors.json', touched_doctors.values())
+    for pid in plan['unassigned']:
+        log.warning("No available doctor to reassign patient %s.", pid)
+    log.info("Total patients reassigned: %d", len(moved_patients))
+    return dict(plan, applied=True, reassigned=len(moved_patients),
+                elapsed_seconds=round(time.perf_counter() - started, 4))
@@ -0,0 +1,167 @@
+from array import array
+from events import subscribe
+from data_storage import patients, doctors
+from records import ordinal_to_date
+from doctor_index import doctor_index
+
+try:
+    import numpy
+except ImportError:  # aggregates fall back to plain Python loops
+    numpy = None
+
+UNASSIGNED = 'unassigned'
+UNKNOWN_DATE = 'unknown'
+
+
+# --------------------- BILLING LEDGER ---------------------
+class BillingLedger:
+    """
+    Treatment charges from patient history kept as array-backed columns
+    (patient code, doctor code, date ordinal, amount) for revenue analytics,
+    plus per-patient running totals used when billing a discharge.
+
+    The columns are built on the first report from the `patients` registry
+    and then appended to from 'patient.history' events. Ids are stored as
+    small integer codes; the doctor of a charge is the patient's assigned
+    doctor when it was recorded, or when loaded for charges already in the
+    registry at the first report (history entries carry no doctor; the
+    SQLite store keeps one per row). With NumPy installed the group-by sums
+    run vectorized over the column buffers.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self.reset()
+
+    def reset(self):
+        self.patient_codes = array('q')
+        self.doctor_codes = array('q')
+        self.days = array('q')
+        self.amounts = array('d')
+        self._patient_ids, self._patient_index = [], {}
+        self._doctor_ids, self._doctor_index = [], {}
+        self.built = False
+
+    @staticmethod
+    def _code(ids, index, value):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(ids)
+            ids.append(value)
+        return code
+
+    def append_charge(self, patient_id, doctor_id, day, amount):
+        """Add one charge row; `day` is a date ordinal (0 when unknown)."""
+        self.patient_codes.append(self._code(self._patient_ids, self._patient_index, patient_id))
+        self.doctor_codes.append(self._code(self._doctor_ids, self._doctor_index, doctor_id))
+        self.days.append(day or 0)
+        self.amounts.append(float(amount or 0))
+
+    def _append_entry(self, patient, entry):
+        doctor_id = patient.assigned_doctor_id
+        if doctor_id is None and patient.assigned_doctor:
+            # Records saved before assigned_doctor_id existed only carry the name
+            doctor = doctor_index.find_by_name(patient.assigned_doctor)
+            doctor_id = doctor.id if doctor else None
+        self.append_charge(patient.id, doctor_id, entry.ordinal, entry.get('cost', 0))
+
+    def build(self):
+        """Recreate the columns from every registered patient's history (O(charges))."""
+        self.reset()
+        for patient in patients.values():
+            for entry in patient.history:
+                self._append_entry(patient, entry)
+        self.built = True
+
+    def _ensure_built(self):
+        if not self.built:
+            self.build()
+
+    # ---- per-patient totals ----
+    def patient_total(self, patient):
+        """Sum of the patient's history charges: O(1) after the first call for a registered patient."""
+        if patients.get(patient.id) is not patient:
+            return sum(entry.get('cost', 0) for entry in patient.history)
+        total = self._totals.get(patient.id)
+        if total is None:
+            total = self._totals[patient.id] = sum(entry.get('cost', 0) for entry in patient.history)
+        return total
+
+    def on_event(self, event, record, details):
+        if event == 'patient.history':
+            if patients.get(record.id) is not record:
+                return
+            entry = details['entry']
+            if record.id in self._totals:
+                self._totals[record.id] += entry.get('cost', 0)
+            if self.built:
+                self._append_entry(record, entry)
+        elif event == 'patient.added':
+            self._totals.pop(record.id, None)
+            if self.built:
+                for entry in record.history:
+                    self._append_entry(record, entry)
+        elif event == 'patient.removed':
+            self._totals.pop(record.id, None)
+            # Dropping rows from the middle of the columns is a rebuild
+            if self.built:
+                self.reset()
+        elif event == 'patient.cleared':
+            self._totals.clear()
+            self.reset()
+
+    # ---- aggregates ----
+    def _sums(self, keys, size=None):
+        """{key: summed amount} grouping the amount column by an integer column."""
+        if numpy is not None and len(self.amounts):
+            values = numpy.frombuffer(self.amounts, dtype=numpy.float64)
+            codes = numpy.frombuffer(keys, dtype=numpy.int64)
+            if size is not None:
+                sums = numpy.bincount(codes, weights=values, minlength=size)
+                return {code: float(total) for code, total in enumerate(sums.tolist())}
+            unique, inverse = numpy.unique(codes, return_inverse=True)
+            sums = numpy.bincount(inverse, weights=values)
+            return dict(zip(unique.tolist(), sums.tolist()))
+        sums = {}
+        for code, amount in zip(keys, self.amounts):
+            sums[code] = sums.get(code, 0.0) + amount
+        return sums
+
+    def total(self):
+        self._ensure_built()
+        if numpy is not None and len(self.amounts):
+            return float(numpy.frombuffer(self.amounts, dtype=numpy.float64).sum())
+        return sum(self.amounts)
+
+    def revenue_by_day(self):
+        self._ensure_built()
+        return {ordinal_to_date(day) if day else UNKNOWN_DATE: total
+                for day, total in sorted(self._sums(self.days).items())}
+
+    def revenue_by_doctor(self):
+        self._ensure_built()
+        return {self._doctor_ids[code] or UNASSIGNED: total
+                for code, total in self._sums(self.doctor_codes, len(self._doctor_ids)).items()}
+
+    def revenue_by_specialization(self):
+        result = {}
+        for doctor_id, total in self.revenue_by_doctor().items():
+            doctor = doctors.get(doctor_id)
+            key = doctor.specialization if doctor else UNASSIGNED
+            result[key] = result.get(key, 0.0) + total
+        return result
+
+    def report(self):
+        self._ensure_built()
+        return {
+            'charges': len(self.amounts),
+            'total': self.total(),
+            'by_day': self.revenue_by_day(),
+            'by_doctor': self.revenue_by_doctor(),
+            'by_specialization': self.revenue_by_specialization(),
+            'engine': 'numpy' if numpy is not None else 'python',
+        }
+
+
+ledger = BillingLedger()
+subscribe(ledger.on_event)
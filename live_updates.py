@@ -0,0 +1,199 @@
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from events import subscribe
+from repository import get_repository
+
+# What a dashboard panel shows about a patient
+SUMMARY_FIELDS = ['id', 'name', 'age', 'gender', 'status', 'assigned_doctor', 'admission',
+                  'discharge_date', 'bill_amount']
+PATIENT_EVENTS = ('patient.added', 'patient.removed', 'patient.status', 'patient.doctor',
+                  'patient.history', 'patient.bill')
+# Doctor changes only move the statistics (total_doctors)
+DOCTOR_EVENTS = ('doctor.added', 'doctor.removed', 'doctor.cleared')
+LOG_SIZE = 1000
+HEARTBEAT_SECONDS = 15
+# How often a stream applies other workers' changes in multi-worker mode
+POLL_SECONDS = 1
+RETRY_MILLISECONDS = 3000
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def frame(event, data, event_id=None):
+    """One server-sent event."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def parse_cursor(last_event_id=None, since=None):
+    """The sequence number a stream resumes after (Last-Event-ID wins); None for 'now'."""
+    value = last_event_id or since
+    if not value:
+        return None
+    try:
+        cursor = int(value)
+    except ValueError:
+        raise ValueError("Last-Event-ID/since must be an event id")
+    if cursor < 0:
+        raise ValueError("Last-Event-ID/since must be an event id")
+    return cursor
+
+
+# --------------------- LIVE UPDATES ---------------------
+class LiveUpdates:
+    """
+    Numbered log of changed patient ids feeding the GET /api/events
+    server-sent-events stream. Changes are recorded from registry and
+    patient events (registration, treatment, discharge, reassignment); a
+    stream sends, per batch, the current summary of each changed patient
+    (or a 'removed' event) and the dashboard statistics, so a refresh costs
+    O(changes) instead of serializing every patient.
+
+    A stream that falls behind the log (or resumes from an id the log no
+    longer holds) gets a 'reset' event and reloads the dashboard. While no
+    stream is connected nothing is logged; the sequence still advances.
+    """
+
+    def __init__(self, size=LOG_SIZE):
+        self._log = deque(maxlen=size)
+        self.seq = 0
+        self.subscribers = 0
+        self._cond = threading.Condition()
+        self._wakers = set()
+
+    def on_event(self, event, record, details):
+        if event == 'patient.cleared':
+            self._publish('reset', None)
+        elif event in PATIENT_EVENTS:
+            self._publish('patient', record.id)
+        elif event in DOCTOR_EVENTS:
+            self._publish('doctor', None)
+
+    def _publish(self, kind, record_id):
+        with self._cond:
+            self.seq += 1
+            if not self.subscribers:
+                self._log.clear()
+                return
+            self._log.append((self.seq, kind, record_id))
+            self._cond.notify_all()
+            wakers = list(self._wakers)
+        for wake in wakers:
+            wake()
+
+    def _changed_since(self, cursor):
+        """Returns ([(kind, record_id), ...] or None for a reset, new cursor)."""
+        with self._cond:
+            if cursor == self.seq:
+                return [], cursor
+            if cursor > self.seq:
+                # An id from before a server restart
+                return None, self.seq
+            first = self._log[0][0] if self._log else self.seq + 1
+            if cursor < first - 1:
+                return None, self.seq
+            changes = [(kind, record_id) for seq, kind, record_id in self._log if seq > cursor]
+            cursor = self.seq
+        if any(kind == 'reset' for kind, _ in changes):
+            return None, cursor
+        return changes, cursor
+
+    def frames_since(self, cursor):
+        """Returns (text of the events for changes after `cursor`, new cursor)."""
+        changes, new_cursor = self._changed_since(cursor)
+        if changes is None:
+            return frame('reset', {}, new_cursor), new_cursor
+        if not changes:
+            return "", new_cursor
+        ids = dict.fromkeys(record_id for kind, record_id in changes if kind == 'patient')
+        repo = get_repository()
+        parts = []
+        for pid in ids:
+            patient = repo.get_patient(pid)
+            if patient is None:
+                parts.append(frame('removed', {'id': pid}))
+            else:
+                parts.append(frame('patient', patient.to_dict(SUMMARY_FIELDS)))
+        parts.append(frame('stats', repo.statistics(), new_cursor))
+        return "".join(parts), new_cursor
+
+    def _start(self, cursor):
+        with self._cond:
+            self.subscribers += 1
+            return self.seq if cursor is None else cursor
+
+    def _stop(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def stream(self, cursor=None, poll=None, heartbeat=HEARTBEAT_SECONDS):
+        """
+        Blocking generator of event-stream text for a WSGI response. `poll`
+        is the shared_store.ChangeFeed in multi-worker mode.
+        """
+        cursor = self._start(cursor)
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            idle_since = time.monotonic()
+            while True:
+                text, cursor = self.frames_since(cursor)
+                if text:
+                    yield text
+                    idle_since = time.monotonic()
+                    continue
+                if time.monotonic() - idle_since >= heartbeat:
+                    yield ": keep-alive\n\n"
+                    idle_since = time.monotonic()
+                with self._cond:
+                    if self.seq == cursor:
+                        self._cond.wait(POLL_SECONDS if poll else heartbeat)
+                if poll is not None:
+                    poll.poll()
+        finally:
+            self._stop()
+
+    async def astream(self, cursor=None, poll=None, heartbeat=HEARTBEAT_SECONDS, offload=False):
+        """
+        The same stream for an asyncio server, waiting on the event loop
+        instead of a thread. With `offload`, building frames and polling run
+        in a thread (they may read SQLite).
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        waker = lambda: loop.call_soon_threadsafe(wake.set)
+
+        async def call(func, *args):
+            return await asyncio.to_thread(func, *args) if offload else func(*args)
+
+        cursor = self._start(cursor)
+        with self._cond:
+            self._wakers.add(waker)
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            idle_since = time.monotonic()
+            while True:
+                wake.clear()
+                text, cursor = await call(self.frames_since, cursor)
+                if text:
+                    yield text
+                    idle_since = time.monotonic()
+                    continue
+                if time.monotonic() - idle_since >= heartbeat:
+                    yield ": keep-alive\n\n"
+                    idle_since = time.monotonic()
+                try:
+                    await asyncio.wait_for(wake.wait(), POLL_SECONDS if poll else heartbeat)
+                except asyncio.TimeoutError:
+                    pass
+                if poll is not None:
+                    await call(poll.poll)
+        finally:
+            with self._cond:
+                self._wakers.discard(waker)
+            self._stop()
+
+
+live_updates = LiveUpdates()
+subscribe(live_updates.on_event)
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+from events import subscribe
+from data_storage import doctors
+
+
+# --------------------- LOAD BALANCER ---------------------
+class DoctorLoadBalancer:
+    """
+    Per-specialization min-heaps of available doctors keyed by
+    (number of patients, registration order), plus one heap over every
+    available doctor for the fallback pool.
+
+    Heaps use lazy invalidation: every load or leave change pushes a fresh
+    entry, and stale entries (wrong load, doctor on leave or removed) are
+    dropped when they reach the top. Ties go to the doctor registered first,
+    which is the doctor min() over the registry would have picked.
+    """
+
+    ALL = None  # heap key for the fallback pool of every available doctor
+
+    def __init__(self):
+        self.rebuild()
+
+    def rebuild(self):
+        self._order = {}
+        self._counter = itertools.count()
+        self._heaps = {}
+        for doctor in doctors.values():
+            self._register(doctor)
+            self._push(doctor)
+
+    @staticmethod
+    def _key(specialization):
+        return (specialization or '').lower()
+
+    def _register(self, doctor):
+        # Every doctor is ranked when registered, on leave or not, so one
+        # returning from leave keeps their place in the tie-break order
+        if doctor.id not in self._order:
+            self._order[doctor.id] = next(self._counter)
+
+    def _push(self, doctor):
+        if doctor.on_leave:
+            return
+        self._register(doctor)
+        entry = (len(doctor.patients), self._order[doctor.id], doctor.id)
+        for key in (self._key(doctor.specialization), self.ALL):
+            heap = self._heaps.setdefault(key, [])
+            heapq.heappush(heap, entry)
+            if len(heap) > 4 * len(self._order) + 16:
+                self._compact(key)
+
+    def _valid(self, entry, key):
+        load, _, doctor_id = entry
+        doctor = doctors.get(doctor_id)
+        if doctor is None or doctor.on_leave:
+            return None, False
+        if key is not self.ALL and self._key(doctor.specialization) != key:
+            return None, False
+        return doctor, len(doctor.patients) == load
+
+    def _compact(self, key):
+        best = {}
+        for entry in self._heaps.get(key, []):
+            doctor, _ = self._valid(entry, key)
+            if doctor is not None:
+                best[doctor.id] = (len(doctor.patients), entry[1], doctor.id)
+        heap = list(best.values())
+        heapq.heapify(heap)
+        self._heaps[key] = heap
+
+    def on_event(self, event, record, details):
+        if event in ('doctor.added', 'doctor.patients', 'doctor.leave'):
+            if doctors.get(record.id) is record:
+                if event == 'doctor.added':
+                    self._register(record)
+                self._push(record)
+        elif event == 'doctor.cleared':
+            self.rebuild()
+
+    # ---- selection ----
+    def least_loaded(self, specialization=ALL, exclude=()):
+        """Peek the available doctor with the fewest patients, or None."""
+        key = self.ALL if specialization is self.ALL else self._key(specialization)
+        heap = self._heaps.get(key)
+        skipped = []
+        found = None
+        while heap:
+            entry = heap[0]
+            doctor, current = self._valid(entry, key)
+            if doctor is None:
+                heapq.heappop(heap)
+            elif not current:
+                heapq.heapreplace(heap, (len(doctor.patients), entry[1], doctor.id))
+            elif doctor.id in exclude:
+                skipped.append(heapq.heappop(heap))
+            else:
+                found = doctor
+                break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return found
+
+    def registration_order(self, doctor):
+        """The tie-break rank least_loaded() gives an available doctor."""
+        return self._order.get(doctor.id, len(self._order))
+
+    def assign(self, patient, specialization=ALL):
+        """Assign the patient to the least-loaded available doctor; returns it or None."""
+        doctor = self.least_loaded(specialization)
+        if doctor is not None:
+            doctor.assign_patient(patient)
+        return doctor
+
+    def release(self, doctor, patient_id):
+        doctor.release_patient(patient_id)
+
+    def reassign(self, from_doctor, patients, specialization=ALL):
+        """
+        Move each patient from from_doctor to the least-loaded other available
+        doctor. Returns [(patient, new_doctor)]; new_doctor is None when
+        nobody is available.
+        """
+        moves = []
+        for patient in patients:
+            doctor = self.least_loaded(specialization, exclude=(from_doctor.id,))
+            if doctor is not None:
+                doctor.assign_patient(patient)
+                from_doctor.release_patient(patient.id)
+            moves.append((patient, doctor))
+        return moves
+
+
+balancer = DoctorLoadBalancer()
+subscribe(balancer.on_event)
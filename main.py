@@ -3,89 +3,56 @@ import os
 import json
 from patient import Patient, register_patient
 from doctor import Doctor
-from utilities import register_doctor, simulate_treatment
-from data_storage import patients, doctors
+from utilities import register_doctor
+from data_storage import patients, doctors, load_summaries, get_storage_backend
+from repository import get_repository
+from instrumentation import configure_logging, STORAGE_LOAD_SECONDS, STORAGE_LOADED_RECORDS
+from profiling import CliProfile, MODES
 
 
-def load_json_with_backup(primary_path, backup_path):
-    """
-    Try to load JSON data from primary file.
-    If it fails, try to load from backup file.
-    """
-    data = {}
-    abs_path = os.path.abspath(primary_path)
-    
-    if os.path.exists(primary_path):
-        with open(primary_path, 'r') as f:
-            try:
-                txt = f.read().strip()
-               
-                if txt:
-                    data = json.loads(txt)
-                   
-                else:
-                   
-                    return load_backup(backup_path)
-            except Exception as e:
-               
-                return load_backup(backup_path)
-        return data
-    else:
-        
-        return load_backup(backup_path)
-
-def load_backup(backup_path):
-    if os.path.exists(backup_path):
-        with open(backup_path, 'r') as f:
-            try:
-                txt = f.read().strip()
-                if txt:
-                    print(f"Loaded data from backup: {backup_path}")
-                    return json.loads(txt)
-            except json.JSONDecodeError as e:
-                print(f"Failed to load backup {backup_path}: {e}")
-    return {}
-
 def load_patients():
-    file_path = 'patients.json'
-    backup_path = 'patients_backup.json'
-    data = load_json_with_backup(file_path, backup_path)
+    if not get_storage_backend().eager_load:
+        # Records are fetched on demand through the repository
+        return
+    # In lazy mode history stays on disk until a patient's history is read
+    lazy = get_storage_backend().lazy
+    labels = {'file': 'patients.json', 'backend': get_storage_backend().name}
+    with STORAGE_LOAD_SECONDS.time(**labels):
+        data = load_summaries('patients.json')
 
-    for pid, pinfo in data.items():
-        patient = Patient(
-            pinfo['name'], pinfo['age'], pinfo['gender'], pinfo['symptoms']
-        )
-        patient.id = pid
-        patient.assigned_doctor = pinfo.get('assigned_doctor')
-        patient.status = pinfo.get('status')
-        patient.history = pinfo.get('history', [])
-        patient.admission = pinfo.get('admission')
-        patient.discharge_date = pinfo.get('discharge_date')
-        patient.bill_amount = pinfo.get('bill_amount', 0)
-        patients[pid] = patient
+        for pid, pinfo in data.items():
+            patients[pid] = Patient.from_dict(pinfo, pid, lazy=lazy)
+    STORAGE_LOADED_RECORDS.inc(len(data), **labels)
 
 def load_doctors():
-    file_path = 'doctors.json'
-    backup_path = 'doctors_backup.json'
-    data = load_json_with_backup(file_path, backup_path)
+    if not get_storage_backend().eager_load:
+        return
+    lazy = get_storage_backend().lazy
+    labels = {'file': 'doctors.json', 'backend': get_storage_backend().name}
+    with STORAGE_LOAD_SECONDS.time(**labels):
+        data = load_summaries('doctors.json')
 
-    for did, dinfo in data.items():
-        doctor = Doctor(
-            dinfo['name'], dinfo['specialization']
-        )
-        doctor.id = did
-        doctor.patients = dinfo.get('patients', [])
-        doctor.notes = dinfo.get('notes', {})
-        doctors[did] = doctor
+        for did, dinfo in data.items():
+            doctors[did] = Doctor.from_dict(dinfo, did, lazy=lazy)
+    STORAGE_LOADED_RECORDS.inc(len(data), **labels)
 
-def main():
-    
+def main(profile=None, profile_output=None, profile_seconds=None):
+    """
+    The interactive menu. With profile='cprofile' or 'sampling' the session is
+    profiled until profile_seconds pass or it exits, and the profile is
+    written to profile_output (pstats or collapsed stacks).
+    """
+    # Assignment and discharge messages are shown; HOSPITAL_LOG_LEVEL=WARNING hides them
+    configure_logging('INFO')
+    cli_profile = CliProfile(profile, profile_output, profile_seconds) if profile else None
     load_doctors()
   
     load_patients()
     
     print("=== Patient Tracking System ===")
     while True:
+        if cli_profile is not None:
+            cli_profile.check()
         print("\n1. Register Doctor")
         print("2. Register Patient")
         print("3. List All Doctors")
@@ -101,8 +68,7 @@ def main():
         elif choice == '2':
             # Register patient and assign doctor
             pid = register_patient()
-            load_patients()  # Ensure in-memory patients dict is updated
-            patient = patients[pid]
+            patient = get_repository().get_patient(pid)
             from utilities import assign_doctor_to_patient
             doctor = assign_doctor_to_patient(patient)
             if doctor:
@@ -112,24 +78,27 @@ def main():
                 print("No doctor assigned.")
         elif choice == '3':
             print("\n--- Doctors List ---")
-            for d in doctors.values():
+            for d in get_repository().all_doctors():
                 print(f"{d.id}: {d.name} ({d.specialization}), Patients: {len(d.patients)}")
         elif choice == '4':
             print("\n--- Patients List ---")
-            for p in patients.values():
+            for p in get_repository().all_patients():
                 print(f"{p.id}: {p.name}, Status: {p.status}, Assigned Doctor: {p.assigned_doctor}, Bill: ₹{p.bill_amount}")
         elif choice == '5':
-            if not patients:
+            repo = get_repository()
+            if not repo.patient_count():
                 print("No patients available.")
                 continue
-            valid_patients = [p for p in patients.values() if p.status == 'inpatient' and p.assigned_doctor]
+            valid_patients = [p for p in repo.patients_by_status('inpatient') if p.assigned_doctor]
             if not valid_patients:
                 print("No inpatients with assigned doctor available for treatment simulation.")
                 continue
             print(f"\nSimulating treatment for {len(valid_patients)} inpatients:")
+            # The round is collected first, then applied and saved in one batch
+            entries = []
             for patient in valid_patients:
                 print(f"\n--- {patient.name} (ID: {patient.id}) | Doctor: {patient.assigned_doctor} ---")
-                doctor = next((d for d in doctors.values() if d.name == patient.assigned_doctor), None)
+                doctor = repo.doctor_for_patient(patient)
                 if not doctor:
                     print(f"Assigned doctor {patient.assigned_doctor} not found. Skipping patient.")
                     continue
@@ -140,24 +109,19 @@ def main():
                 except ValueError:
                     print("Invalid cost. Skipping patient.")
                     continue
-                doctor.log_condition(patient.id, note, treatment, cost)
-                patient.add_history(f"{note}, Treatment: {treatment}", cost=cost)
-                from data_storage import save_patient_to_json, save_doctor_to_json
-                save_patient_to_json(patient)
-                save_doctor_to_json(doctor)
-                print(f"Treatment recorded. Current bill: ₹{patient.bill_amount}")
-                discharge = input("Discharge patient? (y/n): ").lower()
-                if discharge == 'y':
-                    total_cost = sum(entry.get('cost', 0) for entry in patient.history)
-                    doctor.discharge_patient(patient, total_cost)
-                    save_patient_to_json(patient)
-                    save_doctor_to_json(doctor)
-                    print(f"Patient discharged. Final bill: ₹{patient.bill_amount}")
+                discharge = input("Discharge patient? (y/n): ").lower() == 'y'
+                entries.append({'patient_id': patient.id, 'note': note, 'treatment': treatment,
+                                'cost': cost, 'discharge': discharge})
+            if entries:
+                from ward_rounds import record_treatments
+                result = record_treatments(entries, atomic=False)
+                for entry in result['results']:
+                    print(entry.get('message') or f"Entry {entry['entry'] + 1} skipped: {entry['error']}")
             print("\nAll inpatients have had their treatments updated.")
         elif choice == '6':
             pid = input("Enter Patient ID: ")
-            if pid in patients:
-                patient = patients[pid]
+            patient = get_repository().get_patient(pid)
+            if patient:
                 print(f"\n--- History for {patient.name} (ID: {patient.id}) ---")
                 for entry in patient.history:
                     print(f"{entry['date']}: {entry['notes']} (Cost: ₹{entry.get('cost', 0)})")
@@ -168,15 +132,21 @@ def main():
         elif choice == '7':
             # Mark doctor on leave and reassign patients
             print("\n--- Doctors List ---")
-            for d in doctors.values():
+            for d in get_repository().all_doctors():
                 print(f"{d.id}: {d.name} ({d.specialization}), Patients: {len(d.patients)}")
             did = input("Enter Doctor ID to mark as on leave: ").strip()
-            doctor = doctors.get(did)
+            doctor = get_repository().get_doctor(did)
             if not doctor:
                 print("Doctor not found.")
                 return
-            from utilities import mark_doctor_on_leave
-            mark_doctor_on_leave(doctor)
+            from leave_reassignment import reassign_on_leave
+            plan = reassign_on_leave(doctor, dry_run=True)
+            for move in plan['moves']:
+                print(f"{move['patient_name']} -> {move['to_doctor_name']}")
+            if plan['unassigned']:
+                print(f"No available doctor for {len(plan['unassigned'])} patients; they stay assigned.")
+            if input(f"Mark {doctor.name} on leave and reassign {len(plan['moves'])} patients? (y/n): ").lower() == 'y':
+                reassign_on_leave(doctor)
         elif choice == '8':
             print("Goodbye!")
             break
@@ -184,8 +154,14 @@ def main():
             print("Invalid choice.")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Patient Tracking System (interactive).")
+    parser.add_argument('--profile', choices=MODES, help="profile this session with cProfile or a stack sampler")
+    parser.add_argument('--profile-output', help="profile file (default profile-<id>.pstats or .collapsed)")
+    parser.add_argument('--profile-seconds', type=float, help="stop profiling after this many seconds")
+    args = parser.parse_args()
     try:
-        main()
+        main(args.profile, args.profile_output, args.profile_seconds)
     except Exception as e:
         import traceback
         print("[FATAL ERROR] Exception in main():", e)
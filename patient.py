@@ -2,56 +2,136 @@ import json
 import os
 import uuid
 from datetime import datetime
+from events import emit
+from symptom_matcher import get_matcher
+from data_storage import load_field
+from records import HistoryEntry, HistoryLog, date_to_ordinal, ordinal_to_date, intern_text
+from ledger import ledger
+from versions import next_version, VersionedField
+from instrumentation import get_logger
+
+log = get_logger('patients')
 
 class Patient:
+    # Slots instead of a per-instance __dict__; dates are stored as ordinals
+    __slots__ = ('id', '_name', '_age', '_gender', '_symptoms', '_assigned_doctor', '_assigned_doctor_id', '_status',
+                 '_history', '_admission', '_discharge_date', 'treatment_total_cost', '_bill_amount', 'version')
+
     @staticmethod
     def should_admit(symptoms, condition):
-        critical_symptoms = {
-    'abdominal pain': 'Gastroenterology',
-    'severe abdominal pain': 'Gastroenterology',
-    'abdominal bleeding': 'Gastroenterology',
-    'chest pain': 'Cardiology',
-    'difficulty breathing': 'Pulmonology',
-    'unconscious': 'Neurology',
-    'severe bleeding': 'Trauma Surgeon',
-    'heart attack': 'Cardiology',
-    'stroke': 'Neurology',
-    'severe allergic reaction': 'Allergist',
-    'severe burns': 'Burn Specialist'
-}
         if condition.lower() == 'critical':
             return True
-        for symptom in symptoms:
-            s_clean = symptom.strip().lower()
-            for crit in critical_symptoms:
-                crit_clean = crit.lower()
-                if crit_clean in s_clean or s_clean in crit_clean:
-                    return True
-        return False
+        # Critical symptoms are the 'admit' rules in symptom_rules.json
+        return get_matcher().should_admit(symptoms)
     
-    def __init__(self, name, age, gender, symptoms):
-        self.id = "PAT-" + str(uuid.uuid4())[:5]
-        self.name = name
-        self.age = age
-        self.gender = gender
-        self.symptoms = [s.strip() for s in symptoms]
-        self.assigned_doctor = None
-        self.status = 'registered'
-        self.history = []
-        self.admission = None
-        self.discharge_date = None
-
-        self.bill_amount = 0
-    def add_history(self, notes, cost=0):
+    def __init__(self, name, age, gender, symptoms, patient_id=None):
+        self.id = intern_text(patient_id or "PAT-" + str(uuid.uuid4())[:5])
+        self._name = name
+        self._age = age
+        self._gender = intern_text(gender)
+        self._symptoms = [intern_text(s.strip()) for s in symptoms]
+        self._assigned_doctor = None
+        self._assigned_doctor_id = None
+        self._status = 'registered'
+        self._history = HistoryLog()
+        self._admission = None
+        self._discharge_date = None
+        self.treatment_total_cost = 0
+
+        self._bill_amount = 0
+        # Bumped by every change, for the API's ETags
+        self.version = next_version()
+
+    def _touch(self):
+        self.version = next_version('patient')
+
+    name = VersionedField()
+    age = VersionedField()
+    gender = VersionedField()
+    symptoms = VersionedField()
+
+    # Status, bill and doctor changes are announced so aggregates stay current
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        old = self._status
+        self._status = intern_text(value)
+        if old != value:
+            self._touch()
+            emit('patient.status', self, old=old, new=value)
+
+    @property
+    def history(self):
+        if self._history is None:
+            # Left on disk by a lazy load until first needed
+            self.history = load_field('patients.json', self.id, 'history') or []
+        return self._history
+
+    @history.setter
+    def history(self, value):
+        self._history = None if value is None else HistoryLog(value)
+
+    @property
+    def admission(self):
+        return ordinal_to_date(self._admission)
+
+    @admission.setter
+    def admission(self, value):
+        self._admission = date_to_ordinal(value)
+        self._touch()
+
+    @property
+    def discharge_date(self):
+        return ordinal_to_date(self._discharge_date)
 
-        self.history.append({
-            'date': datetime.now().strftime("%Y-%m-%d"),
-            'notes': notes,
-            'cost': cost
-        })
+    @discharge_date.setter
+    def discharge_date(self, value):
+        self._discharge_date = date_to_ordinal(value)
+        self._touch()
+
+    @property
+    def bill_amount(self):
+        return self._bill_amount
+
+    @bill_amount.setter
+    def bill_amount(self, value):
+        old = self._bill_amount
+        self._bill_amount = value
+        if old != value:
+            self._touch()
+            emit('patient.bill', self, old=old, new=value)
+
+    @property
+    def assigned_doctor(self):
+        return self._assigned_doctor
+
+    @assigned_doctor.setter
+    def assigned_doctor(self, value):
+        old = self._assigned_doctor
+        self._assigned_doctor = intern_text(value)
+        if old != value:
+            # The id reference is set by Doctor.assign_patient right after the name
+            self.assigned_doctor_id = None
+            emit('patient.doctor', self, old=old, new=value)
+
+    @property
+    def assigned_doctor_id(self):
+        return self._assigned_doctor_id
+
+    @assigned_doctor_id.setter
+    def assigned_doctor_id(self, value):
+        self._assigned_doctor_id = value
+        self._touch()
+
+    def add_history(self, notes, cost=0):
+        entry = HistoryEntry(datetime.now().strftime("%Y-%m-%d"), notes, cost)
+        self.history.append(entry)
+        self._touch()
+        emit('patient.history', self, entry=entry)
 
-        if not hasattr(self, 'treatment_total_cost'):
-            self.treatment_total_cost = 0
         self.treatment_total_cost += cost
         self.bill_amount = self.treatment_total_cost
     def admit(self):
@@ -64,7 +144,7 @@ class Patient:
             if bill is not None:
                 self.bill_amount = bill
             else:
-                self.bill_amount = sum(entry.get('cost', 0) for entry in self.history)
+                self.bill_amount = ledger.patient_total(self)
         else:
             # Outpatient: always set to 500
             self.bill_amount = 500
@@ -74,15 +154,40 @@ class Patient:
         self.status = 'outpatient'
         self.bill_amount = 500
         self.add_history(notes)
-        print(f"Patient {self.name} discharged with bill ₹{self.bill_amount}")
+        log.info("Patient %s discharged with bill ₹%s", self.name, self.bill_amount)
     
     def update_bill(self, amount):
         """Add amount to existing bill"""
         self.bill_amount += float(amount)
-        print(f"Updated bill for {self.name}: ₹{self.bill_amount}")
+        log.debug("Updated bill for %s: ₹%s", self.name, self.bill_amount)
     
 
-    def to_dict(self):
+    @classmethod
+    def from_dict(cls, data, patient_id=None, lazy=False):
+        patient = cls(data['name'], data['age'], data['gender'], data['symptoms'], patient_id or data['id'])
+        # Backing fields are set directly: the patient is not registered yet,
+        # so the change events would be ignored anyway
+        patient._assigned_doctor = intern_text(data.get('assigned_doctor'))
+        patient._assigned_doctor_id = intern_text(data.get('assigned_doctor_id'))
+        patient._status = intern_text(data.get('status'))
+        if lazy and 'history' not in data:
+            patient.history = None
+        else:
+            patient.history = data.get('history', [])
+        patient._admission = date_to_ordinal(data.get('admission'))
+        patient._discharge_date = date_to_ordinal(data.get('discharge_date'))
+        if 'treatment_total_cost' in data:
+            patient.treatment_total_cost = data['treatment_total_cost']
+        patient._bill_amount = data.get('bill_amount', 0)
+        return patient
+
+    FIELDS = ("id", "name", "age", "gender", "symptoms", "assigned_doctor", "assigned_doctor_id", "status",
+              "history", "admission", "discharge_date", "treatment_total_cost", "bill_amount")
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            # Projection: only touch the requested attributes
+            return {field: self._field(field) for field in fields}
         return {
             "id": self.id,
             "name": self.name,
@@ -90,14 +195,22 @@ class Patient:
             "gender": self.gender,
             "symptoms": self.symptoms,
             "assigned_doctor": self.assigned_doctor,
+            "assigned_doctor_id": self.assigned_doctor_id,
             "status": self.status,
-            "history": self.history,
+            "history": [entry.to_dict() for entry in self.history],
             "admission": self.admission,
             "discharge_date": self.discharge_date,
-            "treatment_total_cost": getattr(self, 'treatment_total_cost', 0),
+            "treatment_total_cost": self.treatment_total_cost,
             "bill_amount": float(self.bill_amount)
         }
 
+    def _field(self, field):
+        if field == "history":
+            return [entry.to_dict() for entry in self.history]
+        if field == "bill_amount":
+            return float(self.bill_amount)
+        return getattr(self, field)
+
 from data_storage import save_patient_to_json
 
 def register_patient():
@@ -0,0 +1,238 @@
+from bisect import bisect_right
+from datetime import datetime
+from events import subscribe
+from data_storage import patients
+from patient import Patient
+from records import date_to_ordinal
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+FILTER_PARAMS = ('status', 'doctor', 'admitted_from', 'admitted_to')
+LISTING_PARAMS = FILTER_PARAMS + ('cursor', 'limit', 'fields')
+DEFAULT_HISTORY_PAGE = 50
+MAX_HISTORY_PAGE = 500
+
+
+def parse_fields(value):
+    """Patient fields from a comma-separated 'fields' parameter ('id' always included), or None."""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in Patient.FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+# --------------------- LISTING QUERY ---------------------
+class ListingQuery:
+    """Validated pagination/filter/projection parameters for GET /api/patients."""
+
+    def __init__(self, status=None, doctor=None, admitted_from=None, admitted_to=None,
+                 cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None):
+        self.status = status
+        self.doctor = doctor
+        self.admitted_from = admitted_from
+        self.admitted_to = admitted_to
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = fields
+
+    @staticmethod
+    def requested(args):
+        """True when the request uses any listing parameter (else the legacy full dump is served)."""
+        return any(name in args for name in LISTING_PARAMS)
+
+    @classmethod
+    def from_args(cls, args):
+        """Build from request args; raises ValueError with a client-facing message."""
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        for name in ('admitted_from', 'admitted_to'):
+            value = args.get(name)
+            if value:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    raise ValueError(f"{name} must be a YYYY-MM-DD date")
+        fields = parse_fields(args.get('fields'))
+        return cls(
+            status=args.get('status') or None,
+            doctor=args.get('doctor') or None,
+            admitted_from=args.get('admitted_from') or None,
+            admitted_to=args.get('admitted_to') or None,
+            cursor=args.get('cursor') or None,
+            limit=limit,
+            fields=fields,
+        )
+
+    def variant(self):
+        """The normalized query as a string, for etag()."""
+        return repr((self.status, self.doctor, self.admitted_from, self.admitted_to,
+                     self.cursor, self.limit, self.fields))
+
+    def admission_matches(self, admission):
+        if self.admitted_from is None and self.admitted_to is None:
+            return True
+        if not admission:
+            return False
+        if self.admitted_from and admission < self.admitted_from:
+            return False
+        if self.admitted_to and admission > self.admitted_to:
+            return False
+        return True
+
+
+# --------------------- HISTORY QUERY ---------------------
+class HistoryQuery:
+    """Validated range/paging parameters for GET /api/patients/<id>/history."""
+
+    def __init__(self, start=None, end=None, cursor=None, limit=DEFAULT_HISTORY_PAGE, descending=False):
+        self.start = start
+        self.end = end
+        self.cursor = cursor
+        self.limit = limit
+        self.descending = descending
+
+    @classmethod
+    def from_args(cls, args):
+        """Build from request args (from, to, cursor, limit, order); raises ValueError with a client-facing message."""
+        try:
+            limit = int(args.get('limit', DEFAULT_HISTORY_PAGE))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_HISTORY_PAGE:
+            raise ValueError(f"limit must be between 1 and {MAX_HISTORY_PAGE}")
+        bounds = []
+        for name in ('from', 'to'):
+            value = args.get(name)
+            ordinal = date_to_ordinal(value) if value else None
+            if value and not isinstance(ordinal, int):
+                raise ValueError(f"{name} must be a YYYY-MM-DD date")
+            bounds.append(ordinal)
+        cursor = args.get('cursor') or None
+        if cursor is not None:
+            if not cursor.isdigit():
+                raise ValueError("Invalid cursor")
+            cursor = int(cursor)
+        order = args.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be asc or desc")
+        return cls(bounds[0], bounds[1], cursor, limit, order == 'desc')
+
+    def variant(self):
+        """The normalized query as a string, for etag()."""
+        return repr((self.start, self.end, self.cursor, self.limit, self.descending))
+
+    def page(self, history):
+        """(entry dicts with their 'position', next_cursor, total) for an EntryLog."""
+        positions, following, total = history.page(self.start, self.end, self.cursor, self.limit, self.descending)
+        entries = [dict(history[position].to_dict(), position=position) for position in positions]
+        return entries, None if following is None else str(following), total
+
+
+# --------------------- PATIENT LIST INDEX ---------------------
+class PatientListIndex:
+    """
+    Patient ids in sorted order (the pagination order) plus id buckets per
+    status and per assigned doctor name, kept current from registry events.
+    Buckets are dicts used as insertion-ordered sets.
+    New ids are merged into the sorted list lazily on the next page request,
+    so bulk loads cost one sort rather than one insertion each.
+    """
+
+    def __init__(self):
+        self.rebuild()
+
+    def rebuild(self):
+        self._ids = sorted(patients)
+        self._pending = set()
+        self._removed = set()
+        self.by_status = {}
+        self.by_doctor = {}
+        for patient in patients.values():
+            self._track(patient, 1)
+
+    def _track(self, patient, sign):
+        for table, key in ((self.by_status, patient.status), (self.by_doctor, patient.assigned_doctor)):
+            if sign > 0:
+                table.setdefault(key, {})[patient.id] = None
+            else:
+                bucket = table.get(key)
+                if bucket is not None:
+                    bucket.pop(patient.id, None)
+                    if not bucket:
+                        del table[key]
+
+    def on_event(self, event, record, details):
+        if event == 'patient.added':
+            self._removed.discard(record.id)
+            self._pending.add(record.id)
+            self._track(record, 1)
+        elif event == 'patient.removed':
+            self._pending.discard(record.id)
+            self._removed.add(record.id)
+            self._track(record, -1)
+        elif event == 'patient.cleared':
+            self.rebuild()
+        elif event in ('patient.status', 'patient.doctor') and patients.get(record.id) is record:
+            table = self.by_status if event == 'patient.status' else self.by_doctor
+            old_bucket = table.get(details['old'])
+            if old_bucket is not None:
+                old_bucket.pop(record.id, None)
+                if not old_bucket:
+                    del table[details['old']]
+            table.setdefault(details['new'], {})[record.id] = None
+
+    def sorted_ids(self):
+        if self._removed:
+            self._ids = [pid for pid in self._ids if pid not in self._removed or pid in patients]
+            self._removed.clear()
+        if self._pending:
+            fresh = [pid for pid in self._pending if pid in patients]
+            if len(fresh) < 64:
+                for pid in fresh:
+                    index = bisect_right(self._ids, pid)
+                    if not (index and self._ids[index - 1] == pid):
+                        self._ids.insert(index, pid)
+            else:
+                self._ids = sorted(set(self._ids).union(fresh))
+            self._pending.clear()
+        return self._ids
+
+    def page(self, query):
+        """Return (patients, next_cursor) for one page of the query."""
+        ids = self.sorted_ids()
+        buckets = []
+        if query.status is not None:
+            buckets.append(self.by_status.get(query.status, {}))
+        if query.doctor is not None:
+            buckets.append(self.by_doctor.get(query.doctor, {}))
+        if buckets:
+            smallest = min(buckets, key=len)
+            # A selective filter is cheaper to sort than to walk every id
+            if len(smallest) * 8 < len(ids):
+                ids = sorted(smallest)
+        start = bisect_right(ids, query.cursor) if query.cursor else 0
+        found = []
+        for index in range(start, len(ids)):
+            pid = ids[index]
+            if any(pid not in bucket for bucket in buckets):
+                continue
+            patient = patients.get(pid)
+            if patient is None or not query.admission_matches(patient.admission):
+                continue
+            if len(found) == query.limit:
+                return found, found[-1].id
+            found.append(patient)
+        return found, None
+
+
+listing_index = PatientListIndex()
+subscribe(listing_index.on_event)
@@ -0,0 +1,341 @@
+import io
+import os
+import sys
+import time
+import hmac
+import uuid
+import atexit
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from instrumentation import get_logger
+
+MODES = ('cprofile', 'sampling')
+# Download format produced by each mode
+FORMATS = {'cprofile': 'pstats', 'sampling': 'collapsed'}
+EXTENSIONS = {'pstats': '.pstats', 'collapsed': '.collapsed', 'text': '.txt'}
+MAX_SECONDS = 300
+DEFAULT_SECONDS = 30
+DEFAULT_INTERVAL = 0.005
+TEXT_LIMIT = 40
+
+log = get_logger('profiling')
+
+
+def admin_token():
+    """The HOSPITAL_ADMIN_TOKEN that profiling requests must present; profiling is off without one."""
+    return os.environ.get('HOSPITAL_ADMIN_TOKEN') or None
+
+
+def authorized(headers):
+    """Whether the request headers carry the admin token (Authorization: Bearer ... or X-Admin-Token)."""
+    token = admin_token()
+    if token is None:
+        return False
+    supplied = headers.get('X-Admin-Token', '')
+    authorization = headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# --------------------- PROFILE SESSION ---------------------
+class ProfileSession:
+    """
+    One time-boxed capture. In 'cprofile' mode each profiled request (or the
+    attached thread) runs under its own cProfile.Profile and the results are
+    merged per label, e.g. 'POST /api/treatment'. In 'sampling' mode a
+    background thread records the stacks of the threads currently serving
+    a label every `interval` seconds, as collapsed stacks rooted at the label.
+    """
+
+    def __init__(self, mode='cprofile', seconds=DEFAULT_SECONDS, routes=None, interval=DEFAULT_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("seconds must be positive")
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval must be between 1 and 1000 ms")
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.seconds = seconds
+        self.routes = set(routes) if routes else None
+        self.interval = interval
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.requests = Counter()
+        self.samples = 0
+        self.skipped = 0
+        self._stats = {}
+        self._stacks = Counter()
+        self._active = {}
+        self._attached = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._timer = None
+        if mode == 'sampling':
+            self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        if seconds is not None:
+            self._timer = threading.Timer(seconds, self._end)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def wants(self, route):
+        return self.routes is None or route in self.routes
+
+    @contextmanager
+    def profile(self, label):
+        """Profile the calling thread's work inside the block under `label`."""
+        with self._lock:
+            self.requests[label] += 1
+        if self.mode == 'sampling':
+            ident = threading.get_ident()
+            self._active[ident] = label
+            try:
+                yield
+            finally:
+                self._active.pop(ident, None)
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler already owns this interpreter (Python 3.12+)
+            with self._lock:
+                self.skipped += 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._merge(label, profiler)
+
+    def attach(self, label='main'):
+        """Profile the calling thread until stop() is called from that same thread."""
+        if self.mode == 'sampling':
+            self._active[threading.get_ident()] = label
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            self._attached = (label, profiler)
+        with self._lock:
+            self.requests[label] += 1
+
+    def expired(self):
+        return self.seconds is not None and time.time() - self.started_at >= self.seconds
+
+    def wait(self, timeout=None):
+        """Block until the capture ends; returns False on timeout."""
+        return self._stop.wait(timeout)
+
+    def stop(self):
+        """End the capture (call from the attached thread, if any, to collect its profile)."""
+        if self._timer is not None:
+            self._timer.cancel()
+        attached, self._attached = self._attached, None
+        if attached is not None:
+            label, profiler = attached
+            profiler.disable()
+            self._merge(label, profiler)
+        self._end()
+        return self
+
+    def _end(self):
+        # A profiler attached to another thread can only be disabled by that thread (see stop)
+        with self._lock:
+            if self.running:
+                self.stopped_at = time.time()
+                self._stop.set()
+
+    def _merge(self, label, profiler):
+        stats = pstats.Stats(profiler)
+        with self._lock:
+            if label in self._stats:
+                self._stats[label].add(stats)
+            else:
+                self._stats[label] = stats
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, label in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(label)
+                key = ';'.join(reversed(stack))
+                with self._lock:
+                    self._stacks[key] += 1
+                    self.samples += 1
+
+    def _matches(self, label, route):
+        return route is None or label == route or label.partition(' ')[2] == route
+
+    def render(self, fmt=None, route=None):
+        """
+        The capture as bytes: 'pstats' (marshalled, for pstats.Stats/snakeviz)
+        or 'text' for cprofile sessions, 'collapsed' stacks (flamegraph.pl,
+        speedscope) for sampling sessions. `route` narrows it to one label
+        ('GET /api/patients') or one route pattern ('/api/patients').
+        """
+        fmt = fmt or FORMATS[self.mode]
+        if fmt == 'collapsed':
+            if self.mode != 'sampling':
+                raise ValueError("collapsed stacks need a sampling profile")
+            with self._lock:
+                lines = [f"{stack} {count}" for stack, count in sorted(self._stacks.items())
+                         if self._matches(stack.partition(';')[0], route)]
+            return ('\n'.join(lines) + '\n' if lines else '').encode()
+        if fmt not in ('pstats', 'text'):
+            raise ValueError(f"format must be one of {', '.join(EXTENSIONS)}")
+        if self.mode != 'cprofile':
+            raise ValueError(f"{fmt} output needs a cprofile profile")
+        combined = pstats.Stats()
+        with self._lock:
+            for label, stats in self._stats.items():
+                if self._matches(label, route):
+                    combined.add(stats)
+        if fmt == 'pstats':
+            # What Stats.dump_stats writes to a file
+            return marshal.dumps(combined.stats)
+        out = io.StringIO()
+        combined.stream = out
+        combined.sort_stats('cumulative').print_stats(TEXT_LIMIT)
+        return out.getvalue().encode()
+
+    def filename(self, fmt=None, route=None):
+        fmt = fmt or FORMATS[self.mode]
+        suffix = ''
+        if route:
+            suffix = '-' + ''.join(c if c.isalnum() else '_' for c in route).strip('_')
+        return f"profile-{self.id}{suffix}{EXTENSIONS.get(fmt, '')}"
+
+    def info(self):
+        with self._lock:
+            requests = dict(self.requests)
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'running': self.running,
+            'seconds': self.seconds,
+            'routes': sorted(self.routes) if self.routes else None,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at,
+            'requests': requests,
+            'samples': self.samples,
+            'skipped': self.skipped,
+            'format': FORMATS[self.mode],
+        }
+
+
+# --------------------- WEB SERVER PROFILER ---------------------
+class ProfilingMiddleware:
+    """WSGI wrapper installed only while a session runs, so idle servers pay nothing."""
+
+    def __init__(self, app, wsgi_app, session):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.session = session
+
+    def __call__(self, environ, start_response):
+        session = self.session
+        if session.running:
+            try:
+                rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+            except Exception:
+                rule = None
+            if rule is not None and session.wants(rule.rule):
+                # Streamed bodies (/api/events, exports) are produced after this returns and are not profiled
+                with session.profile(f"{environ['REQUEST_METHOD']} {rule.rule}"):
+                    return self.wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+class AppProfiler:
+    """Starts and stops ProfileSessions on a Flask app; one session at a time."""
+
+    def __init__(self, app):
+        self.app = app
+        self.session = None
+        self._lock = threading.Lock()
+
+    def start(self, mode='cprofile', seconds=DEFAULT_SECONDS, routes=None, interval=DEFAULT_INTERVAL):
+        """Start a capture of at most MAX_SECONDS; raises RuntimeError while another one is running."""
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_SECONDS}")
+        with self._lock:
+            if self.session is not None and self.session.running:
+                raise RuntimeError("A profile is already running")
+            session = ProfileSession(mode, seconds, routes, interval)
+            middleware = ProfilingMiddleware(self.app, self.app.wsgi_app, session)
+            self.app.wsgi_app = middleware
+            self.session = session
+        # The session's own timer ends the capture; unwrap the app then
+        threading.Thread(target=self._unwrap, args=(middleware,), daemon=True).start()
+        log.warning("Profiling started: %s for %ss (routes: %s)", mode, seconds,
+                    ', '.join(sorted(routes)) if routes else 'all')
+        return session
+
+    def stop(self):
+        session = self.session
+        if session is not None:
+            session.stop()
+        return session
+
+    def _unwrap(self, middleware):
+        middleware.session.wait()
+        with self._lock:
+            if self.app.wsgi_app is middleware:
+                if middleware.wsgi_app == type(self.app).wsgi_app.__get__(self.app):
+                    # Back to Flask's own method rather than an instance attribute
+                    del self.app.wsgi_app
+                else:
+                    self.app.wsgi_app = middleware.wsgi_app
+        log.warning("Profiling stopped: %s", middleware.session.id)
+
+
+# --------------------- CLI PROFILER ---------------------
+class CliProfile:
+    """
+    Profile the interactive CLI's main thread until `seconds` pass (checked
+    between menu actions) or the program exits, then write `output`.
+    """
+
+    def __init__(self, mode, output=None, seconds=None, interval=DEFAULT_INTERVAL):
+        self.session = ProfileSession(mode, seconds, interval=interval)
+        self.output = output or self.session.filename()
+        self.written = False
+        self.session.attach('main')
+        atexit.register(self.finish)
+
+    def check(self):
+        if not self.written and self.session.expired():
+            self.finish()
+
+    def finish(self):
+        if self.written:
+            return
+        self.written = True
+        self.session.stop()
+        with open(self.output, 'wb') as f:
+            f.write(self.session.render())
+        print(f"Profile written to {self.output}")
@@ -0,0 +1,261 @@
+import sys
+import bisect
+import datetime
+from functools import lru_cache
+
+
+# --------------------- COMPACT VALUE HELPERS ---------------------
+@lru_cache(maxsize=4096)
+def date_to_ordinal(value):
+    """'YYYY-MM-DD' -> proleptic ordinal (a shared small int); anything else is returned unchanged."""
+    if isinstance(value, str):
+        try:
+            day = datetime.date.fromisoformat(value)
+        except ValueError:
+            return value
+        if day.isoformat() == value:
+            return day.toordinal()
+    return value
+
+
+@lru_cache(maxsize=4096)
+def ordinal_to_date(value):
+    """Inverse of date_to_ordinal."""
+    if isinstance(value, int):
+        return datetime.date.fromordinal(value).isoformat()
+    return value
+
+
+def intern_text(value):
+    """Share one copy of frequently repeated strings (statuses, names, specializations)."""
+    return sys.intern(value) if type(value) is str else value
+
+
+# --------------------- COMPACT RECORDS ---------------------
+class CompactRecord:
+    """
+    Slotted replacement for the small dicts stored in patient history and
+    doctor notes. Dates are kept as ordinals. Entries still read like the
+    original dicts (entry['cost'], entry.get('notes'), == against a dict),
+    and to_dict() returns the original shape.
+    """
+
+    __slots__ = ('_date',)
+    KEYS = ()
+
+    @property
+    def date(self):
+        return ordinal_to_date(self._date)
+
+    @date.setter
+    def date(self, value):
+        self._date = date_to_ordinal(value)
+
+    @property
+    def ordinal(self):
+        """The date as an ordinal, or None when it is not a YYYY-MM-DD date."""
+        return self._date if isinstance(self._date, int) else None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**{key: data[key] for key in cls.KEYS if key in data})
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.KEYS}
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def keys(self):
+        return self.KEYS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.KEYS]
+
+    def __eq__(self, other):
+        if isinstance(other, (CompactRecord, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, CompactRecord) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class HistoryEntry(CompactRecord):
+    """One Patient.history item: {'date', 'notes', 'cost'}."""
+
+    __slots__ = ('notes', 'cost')
+    KEYS = ('date', 'notes', 'cost')
+
+    def __init__(self, date=None, notes=None, cost=0):
+        self._date = date_to_ordinal(date)
+        self.notes = notes
+        self.cost = cost
+
+
+class NoteEntry(CompactRecord):
+    """One Doctor.notes item: {'date', 'note', 'treatment', 'cost'}."""
+
+    __slots__ = ('note', 'treatment', 'cost')
+    KEYS = ('date', 'note', 'treatment', 'cost')
+
+    def __init__(self, date=None, note=None, treatment=None, cost=0):
+        self._date = date_to_ordinal(date)
+        self.note = note
+        self.treatment = intern_text(treatment)
+        self.cost = cost
+
+
+# --------------------- CHUNKED ENTRY LOG ---------------------
+def _entry_ordinal(entry):
+    return entry._date
+
+
+class EntryLog:
+    """
+    The list behind Patient.history and each Doctor.notes[pid]: entries in
+    append order, held in fixed-size chunks so a long stay never means one
+    huge list to grow or copy. It reads like the list it replaces (len,
+    iteration, indexing, slicing, == against a list).
+
+    While entries are appended in date order (the normal case: each one is
+    dated today), positions for a date range are found by binary search,
+    first over the chunks' first dates and then within one chunk. An entry
+    without a YYYY-MM-DD date or out of order turns range queries into a
+    scan. Positions never change, as entries are only appended, so they
+    serve as paging cursors.
+    """
+
+    __slots__ = ('_chunks', '_ordered')
+    CHUNK_SIZE = 256
+    ENTRY_TYPE = CompactRecord
+
+    def __init__(self, entries=()):
+        # A tuple (no spare capacity), replaced on the rare new chunk
+        self._chunks = ()
+        self._ordered = True
+        self.extend(entries)
+
+    def append(self, entry):
+        entry = self.ENTRY_TYPE.from_dict(entry)
+        chunks = self._chunks
+        if self._ordered and (entry.ordinal is None or (chunks and entry._date < chunks[-1][-1]._date)):
+            self._ordered = False
+        if not chunks or len(chunks[-1]) == self.CHUNK_SIZE:
+            chunks = self._chunks = chunks + ([],)
+        chunks[-1].append(entry)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    @property
+    def ordered(self):
+        """Whether every entry has a date and they are in date order (range queries can bisect)."""
+        return self._ordered
+
+    def __len__(self):
+        chunks = self._chunks
+        return (len(chunks) - 1) * self.CHUNK_SIZE + len(chunks[-1]) if chunks else 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("EntryLog index out of range")
+        return self._chunks[index // self.CHUNK_SIZE][index % self.CHUNK_SIZE]
+
+    def __eq__(self, other):
+        if isinstance(other, (EntryLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def bisect(self, ordinal, right=False):
+        """
+        Position of the first entry dated on/after `ordinal` (after it with
+        right=True); only meaningful while the log is ordered.
+        """
+        find = bisect.bisect_right if right else bisect.bisect_left
+        chunk = find(self._chunks, ordinal, key=lambda entries: entries[0]._date) - 1
+        if chunk < 0:
+            return 0
+        return chunk * self.CHUNK_SIZE + find(self._chunks[chunk], ordinal, key=_entry_ordinal)
+
+    def page(self, start=None, end=None, cursor=None, limit=None, descending=False):
+        """
+        Entries dated from `start` to `end` (inclusive ordinals, either may
+        be None), oldest first or newest first. `cursor` is the `next`
+        position of the previous page. Returns (positions, next, total):
+        the positions of at most `limit` entries, the cursor for the
+        following page (None on the last one) and how many entries match
+        the range altogether.
+        """
+        if self._ordered:
+            low = self.bisect(start) if start is not None else 0
+            high = self.bisect(end, right=True) if end is not None else len(self)
+            matching = range(low, max(low, high))
+        else:
+            matching = [position for position, entry in enumerate(self)
+                        if (start is None and end is None) or (
+                            entry.ordinal is not None
+                            and (start is None or entry._date >= start)
+                            and (end is None or entry._date <= end))]
+        total = len(matching)
+        if descending:
+            matching = matching[::-1]
+            if cursor is not None:
+                matching = matching[bisect.bisect_left(matching, -cursor, key=lambda position: -position):]
+        elif cursor is not None:
+            matching = matching[bisect.bisect_left(matching, cursor):]
+        if limit is None or len(matching) <= limit:
+            return list(matching), None, total
+        positions = list(matching[:limit])
+        # Ascending pages resume at the next position, descending ones below the last
+        return positions, matching[limit], total
+
+
+class HistoryLog(EntryLog):
+    """Patient.history."""
+
+    __slots__ = ()
+    ENTRY_TYPE = HistoryEntry
+
+
+class NoteLog(EntryLog):
+    """The notes of one Doctor.notes[pid]."""
+
+    __slots__ = ()
+    ENTRY_TYPE = NoteEntry
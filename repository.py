@@ -0,0 +1,328 @@
+from bisect import bisect_right
+from patient import Patient
+from doctor import Doctor
+from data_storage import patients, doctors, get_storage_backend
+from hospital_stats import stats
+from doctor_index import doctor_index
+from load_balancer import balancer
+from patient_listing import ListingQuery, listing_index
+from ledger import ledger
+
+
+# --------------------- REPOSITORY ---------------------
+class Repository:
+    """
+    Query interface used by the CLI, utilities and web server so they run
+    unchanged against either storage backend. The `patients`/`doctors`
+    dicts in data_storage act as the identity map of live objects.
+    """
+
+    def get_patient(self, patient_id):
+        raise NotImplementedError
+
+    def get_doctor(self, doctor_id):
+        raise NotImplementedError
+
+    def add_patient(self, patient):
+        patients[patient.id] = patient
+
+    def add_doctor(self, doctor):
+        doctors[doctor.id] = doctor
+
+    def all_patients(self):
+        raise NotImplementedError
+
+    def all_doctors(self):
+        raise NotImplementedError
+
+    def patients_by_status(self, status):
+        raise NotImplementedError
+
+    def list_patients(self, query):
+        """One page of patients ordered by id: returns (patients, next_cursor)."""
+        raise NotImplementedError
+
+    def export_records(self, kind, cursor=None, batch_size=500):
+        """
+        Yield to_dict() records of 'patients' or 'doctors' ordered by id,
+        starting after `cursor`, holding at most one batch at a time.
+        """
+        raise NotImplementedError
+
+    def _doctor_name(self, doctor):
+        # Listing filters accept a doctor id as well as a name
+        found = self.get_doctor(doctor) if doctor else None
+        return found.name if found else doctor
+
+    def patients_for_doctor(self, doctor_name):
+        raise NotImplementedError
+
+    def doctors_by_specialization(self, specialization):
+        raise NotImplementedError
+
+    def available_doctors(self, specialization):
+        """Doctors with the given specialization who are not on leave."""
+        return [d for d in self.doctors_by_specialization(specialization) if not d.on_leave]
+
+    def find_doctor_by_name(self, name):
+        raise NotImplementedError
+
+    def least_loaded_doctor(self, specialization=None, exclude=()):
+        """Available doctor with the fewest patients, optionally within a specialization."""
+        raise NotImplementedError
+
+    def doctor_loads(self, specialization=None, exclude=()):
+        """[(doctor_id, patient count)] of available doctors in registration order, for planning."""
+        raise NotImplementedError
+
+    def doctor_for_patient(self, patient):
+        """The patient's assigned doctor, by id reference or else by name."""
+        doctor = self.get_doctor(patient.assigned_doctor_id) if patient.assigned_doctor_id else None
+        if doctor is None and patient.assigned_doctor:
+            doctor = self.find_doctor_by_name(patient.assigned_doctor)
+        return doctor
+
+    def count_by_status(self):
+        raise NotImplementedError
+
+    def patient_count(self):
+        raise NotImplementedError
+
+    def doctor_count(self):
+        raise NotImplementedError
+
+    def total_revenue(self):
+        raise NotImplementedError
+
+    def revenue_report(self):
+        """Treatment charges totalled per day, doctor id and specialization."""
+        raise NotImplementedError
+
+    def statistics(self):
+        """Dashboard totals as served by /api/statistics."""
+        counts = self.count_by_status()
+        return {
+            'total_patients': self.patient_count(),
+            'inpatients': counts.get('inpatient', 0),
+            'outpatients': counts.get('outpatient', 0),
+            'discharged': counts.get('discharged', 0),
+            'total_revenue': self.total_revenue(),
+            'total_doctors': self.doctor_count(),
+        }
+
+
+class JsonRepository(Repository):
+    """Answers queries from the in-memory registries loaded from the JSON files."""
+
+    def get_patient(self, patient_id):
+        return patients.get(patient_id)
+
+    def get_doctor(self, doctor_id):
+        return doctors.get(doctor_id)
+
+    def all_patients(self):
+        return list(patients.values())
+
+    def all_doctors(self):
+        return list(doctors.values())
+
+    def patients_by_status(self, status):
+        return [patients[pid] for pid in listing_index.by_status.get(status, ())]
+
+    def patients_for_doctor(self, doctor_name):
+        return [patients[pid] for pid in listing_index.by_doctor.get(doctor_name, ())]
+
+    def list_patients(self, query):
+        query.doctor = self._doctor_name(query.doctor)
+        return listing_index.page(query)
+
+    def export_records(self, kind, cursor=None, batch_size=500):
+        if kind == 'patients':
+            registry, ids = patients, list(listing_index.sorted_ids())
+        else:
+            registry, ids = doctors, sorted(doctors)
+        for pid in ids[bisect_right(ids, cursor) if cursor else 0:]:
+            record = registry.get(pid)
+            if record is not None:
+                yield record.to_dict()
+
+    def doctors_by_specialization(self, specialization):
+        return doctor_index.with_specialization(specialization)
+
+    def available_doctors(self, specialization):
+        return doctor_index.with_specialization(specialization, include_on_leave=False)
+
+    def find_doctor_by_name(self, name):
+        return doctor_index.find_by_name(name)
+
+    def least_loaded_doctor(self, specialization=None, exclude=()):
+        return balancer.least_loaded(specialization, exclude)
+
+    def doctor_loads(self, specialization=None, exclude=()):
+        # From the index of available doctors, not a scan of the registry
+        if specialization is None:
+            pool = doctor_index.all_available()
+        else:
+            pool = doctor_index.with_specialization(specialization, include_on_leave=False)
+        pool = sorted((d for d in pool if d.id not in exclude), key=balancer.registration_order)
+        return [(d.id, len(d.patients)) for d in pool]
+
+    def doctor_for_patient(self, patient):
+        return doctor_index.for_patient(patient)
+
+    def count_by_status(self):
+        return dict(stats.status_counts)
+
+    def patient_count(self):
+        return len(patients)
+
+    def doctor_count(self):
+        return len(doctors)
+
+    def total_revenue(self):
+        return stats.revenue
+
+    def revenue_report(self):
+        return ledger.report()
+
+    def statistics(self):
+        return stats.snapshot()
+
+
+class SqliteRepository(Repository):
+    """
+    Answers queries with indexed SQL and hydrates only the rows it returns.
+    Objects already in the identity map win over the stored row, so unsaved
+    in-memory changes are never clobbered by a re-read. Only single-record
+    lookups, which precede a change, add to the identity map; listings return
+    detached copies of the rows they did not find there, so a full listing
+    neither grows the registry nor announces every row as 'patient.added'.
+    Fetch a listed record with get_patient()/get_doctor() before changing it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def _read_patient(record):
+        return patients.get(record['id']) or Patient.from_dict(record)
+
+    @staticmethod
+    def _read_doctor(record):
+        return doctors.get(record['id']) or Doctor.from_dict(record)
+
+    def _patient(self, record):
+        patient = patients.get(record['id'])
+        if patient is None:
+            patient = Patient.from_dict(record)
+            patients[patient.id] = patient
+        return patient
+
+    def _doctor(self, record):
+        doctor = doctors.get(record['id'])
+        if doctor is None:
+            doctor = Doctor.from_dict(record)
+            doctors[doctor.id] = doctor
+        return doctor
+
+    def get_patient(self, patient_id):
+        if patient_id in patients:
+            return patients[patient_id]
+        record = self.store.get_patient(patient_id)
+        return self._patient(record) if record else None
+
+    def get_doctor(self, doctor_id):
+        if doctor_id in doctors:
+            return doctors[doctor_id]
+        record = self.store.get_doctor(doctor_id)
+        return self._doctor(record) if record else None
+
+    def all_patients(self):
+        return [self._read_patient(rec) for rec in self.store.all_patients()]
+
+    def all_doctors(self):
+        return [self._read_doctor(rec) for rec in self.store.all_doctors()]
+
+    def patients_by_status(self, status):
+        return [self._read_patient(rec) for rec in self.store.patients_by_status(status)]
+
+    def patients_for_doctor(self, doctor_name):
+        return [self._read_patient(rec) for rec in self.store.patients_for_doctor(doctor_name)]
+
+    def list_patients(self, query):
+        query.doctor = self._doctor_name(query.doctor)
+        records, next_cursor = self.store.page_patients(query)
+        return [self._read_patient(rec) for rec in records], next_cursor
+
+    def export_records(self, kind, cursor=None, batch_size=500):
+        # Rows are converted without entering the identity map, so a full
+        # export does not pull the whole table into memory
+        read = self._read_patient if kind == 'patients' else self._read_doctor
+        while True:
+            if kind == 'patients':
+                records, _ = self.store.page_patients(ListingQuery(cursor=cursor, limit=batch_size))
+            else:
+                records = self.store.page_doctors(cursor, batch_size)
+            for rec in records:
+                yield read(rec).to_dict()
+            if len(records) < batch_size:
+                return
+            cursor = records[-1]['id']
+
+    def doctors_by_specialization(self, specialization):
+        return [self._read_doctor(rec) for rec in self.store.doctors_by_specialization(specialization)]
+
+    def find_doctor_by_name(self, name):
+        record = self.store.doctor_by_name(name)
+        return self._doctor(record) if record else None
+
+    def least_loaded_doctor(self, specialization=None, exclude=()):
+        loads = self.doctor_loads(specialization, exclude)
+        if not loads:
+            return None
+        # min() keeps the first of equal loads: the doctor registered first
+        doctor_id, _ = min(loads, key=lambda item: item[1])
+        return self.get_doctor(doctor_id)
+
+    def doctor_loads(self, specialization=None, exclude=()):
+        # Doctors in the identity map may hold assignments not saved yet (the
+        # bulk importer saves once per chunk), so their in-memory state wins
+        loads = []
+        for doctor_id, load in self.store.doctor_loads(specialization, exclude):
+            live = doctors.get(doctor_id)
+            if live is not None:
+                if live.on_leave:
+                    continue
+                load = len(live.patients)
+            loads.append((doctor_id, load))
+        return loads
+
+    def count_by_status(self):
+        return self.store.count_by_status()
+
+    def patient_count(self):
+        return self.store.patient_count()
+
+    def doctor_count(self):
+        return self.store.doctor_count()
+
+    def total_revenue(self):
+        return self.store.total_revenue()
+
+    def revenue_report(self):
+        return self.store.revenue_report()
+
+
+_repository = None
+_repository_backend = None
+
+
+def get_repository():
+    """Return the repository matching the configured storage backend."""
+    global _repository, _repository_backend
+    backend = get_storage_backend()
+    if _repository is None or _repository_backend is not backend:
+        store = getattr(backend, 'store', None)
+        _repository = SqliteRepository(store) if store is not None else JsonRepository()
+        _repository_backend = backend
+    return _repository
@@ -0,0 +1,185 @@
+import os
+import signal
+import socket
+import threading
+from data_storage import patients, doctors, get_storage_backend, flush_storage
+import versions
+
+try:
+    import fcntl
+except ImportError:  # no cross-process file locks (Windows): multi-worker mode is unavailable
+    fcntl = None
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def worker_count():
+    """Number of web worker processes sharing the store (HOSPITAL_WORKERS, default 1)."""
+    return max(1, int(os.environ.get('HOSPITAL_WORKERS', 1)))
+
+
+# --------------------- CHANGE FEED ---------------------
+class ChangeFeed:
+    """
+    Keeps this process's identity map (the `patients`/`doctors` registries)
+    in step with writes made by other processes. Every SQLite write appends
+    the ids it touched to the `changes` table; poll() reads the entries
+    logged since the last poll and evicts those records, so the next lookup
+    re-reads them from the database. Changes made by this process are skipped,
+    since its own objects are already current.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.seq = store.change_seq()
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Apply pending changes; returns the number of records evicted."""
+        with self._lock:
+            oldest, changes = self.store.changes_since(self.seq)
+            evicted = 0
+            if oldest is not None and self.seq < oldest - 1:
+                # Fell behind the pruned log: nothing cached can be trusted
+                evicted = len(patients) + len(doctors)
+                patients.clear()
+                doctors.clear()
+            else:
+                pid = os.getpid()
+                for seq, kind, record_id, origin in changes:
+                    if origin == pid:
+                        continue
+                    # Even for records never loaded here: listings (and their ETags) include them
+                    versions.touch(kind)
+                    registry = patients if kind == 'patient' else doctors
+                    if registry.pop(record_id, None) is not None:
+                        evicted += 1
+            if changes:
+                self.seq = changes[-1][0]
+            self.evicted += evicted
+            return evicted
+
+
+# --------------------- WRITE LOCK ---------------------
+class WriteLock:
+    """
+    Serializes writing requests across worker processes with an flock on
+    `<db>.lock`, so each one reads current records and commits before the
+    next begins. Reads never take it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            if self._pid != os.getpid():
+                # Descriptors inherited across fork share one lock; open our own
+                self._file = open(self.path, 'a')
+                self._pid = os.getpid()
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# --------------------- FLASK INTEGRATION ---------------------
+def install(app):
+    """
+    Run `app` as one of several worker processes over the shared SQLite store:
+    each request first applies other workers' changes, and writing requests
+    hold the cross-process write lock until their response is produced.
+    Saves must be synchronous in this mode so they commit inside the lock.
+    """
+    from flask import g, request
+
+    store = getattr(get_storage_backend(), 'store', None)
+    if store is None:
+        raise RuntimeError("Multi-worker mode needs the SQLite backend (HOSPITAL_STORAGE=sqlite)")
+    if fcntl is None:
+        raise RuntimeError("Multi-worker mode needs fcntl file locks (POSIX)")
+    feed = ChangeFeed(store)
+    lock = WriteLock(store.db_path + '.lock')
+
+    @app.before_request
+    def sync_shared_store():
+        if request.method in WRITE_METHODS:
+            lock.acquire()
+            g.holds_write_lock = True
+        feed.poll()
+
+    @app.teardown_request
+    def release_write_lock(exc):
+        if g.pop('holds_write_lock', False):
+            flush_storage()
+            lock.release()
+
+    app.extensions['shared_store'] = feed
+    return feed
+
+
+# --------------------- PRE-FORK SERVER ---------------------
+def serve(app, host='0.0.0.0', port=5000, workers=None):
+    """
+    Bind one listening socket and fork `workers` processes that accept on it,
+    each running a threaded WSGI server. Stops every worker on SIGINT/SIGTERM.
+    """
+    from werkzeug.serving import make_server
+
+    workers = workers or worker_count()
+    if not hasattr(os, 'fork'):
+        raise RuntimeError("The pre-fork server needs os.fork (POSIX)")
+    listener = socket.create_server((host, port), backlog=128)
+    # SQLite connections must not cross a fork: drop the parent's before forking
+    flush_storage()
+    get_storage_backend().close()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    print(f"Serving on http://{host}:{port} with {workers} worker processes")
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for child in children:
+        while True:
+            try:
+                os.waitpid(child, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+    listener.close()
@@ -0,0 +1,234 @@
+import os
+import json
+import zlib
+
+from data_storage import JsonFileBackend, load_json_with_backup, backup_path_for, register_backend
+from instrumentation import get_logger
+
+log = get_logger('storage')
+
+CHUNK_SIZE = 1 << 20
+
+
+# --------------------- SNAPSHOT FILES ---------------------
+def generation_paths(file_path, generations):
+    """Newest first: file_path, file_path.1, ..., file_path.<generations - 1>."""
+    return [file_path] + [f"{file_path}.{n}" for n in range(1, generations)]
+
+
+def manifest_path_for(path):
+    return path + '.snap'
+
+
+def read_manifest(manifest_path):
+    """
+    The {'seq', 'length', 'crc32', 'mtime_ns'} sidecar describing a snapshot
+    file, e.g. {"seq": 12, "length": 48213, "crc32": "9a3b0c11", ...}, or None.
+    """
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        return {
+            'seq': int(manifest['seq']),
+            'length': int(manifest['length']),
+            'crc32': int(manifest['crc32'], 16),
+            'mtime_ns': int(manifest['mtime_ns']),
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def validate_snapshot(path, manifest_path=None):
+    """
+    Return (seq, length) if `path` is a complete snapshot whose checksum
+    matches its manifest (path + '.snap' by default), else None. The body
+    is checked with a streaming CRC32, so no JSON decoding is needed.
+    """
+    manifest = read_manifest(manifest_path or manifest_path_for(path))
+    if manifest is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size != manifest['length']:
+                return None
+            checksum = 0
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                checksum = zlib.crc32(chunk, checksum)
+    except OSError:
+        return None
+    return (manifest['seq'], manifest['length']) if checksum == manifest['crc32'] else None
+
+
+def _fsync_directory(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path, chunks, fsync):
+    """Write `chunks` to `path`; returns (size, crc32, mtime_ns)."""
+    checksum = 0
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            checksum = zlib.crc32(chunk, checksum)
+            size += len(chunk)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+        # Renames keep the mtime, so the manifest can tell this file from later rewrites
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+    return size, checksum, mtime_ns
+
+
+class SnapshotBackend(JsonFileBackend):
+    """
+    JSON snapshots that are written durably and verified on load.
+
+    The data files stay plain JSON, exactly as the json backend writes
+    them, so every other backend (and sqlite's import) can still read
+    them. Each one has a manifest beside it (patients.json.snap) with a
+    sequence number, length, CRC32 and mtime. A save writes and fsyncs a
+    temp file and its manifest, shifts the older generations down (file ->
+    file.1 -> ... -> file.<N-1>) and renames the temp files into place.
+    load() validates generations by checksum alone and parses only the
+    newest valid one, so a crash at any point leaves a loadable generation.
+    A data file rewritten since its manifest (e.g. by the json backend) is
+    the newest data and is loaded as plain JSON.
+    """
+
+    name = 'snapshot'
+
+    def __init__(self, generations=None, fsync=True, lazy=None):
+        super().__init__(lazy=lazy)
+        if generations is None:
+            generations = int(os.environ.get('HOSPITAL_SNAPSHOT_GENERATIONS', '3'))
+        self.generations = max(1, generations)
+        self.fsync = fsync
+        self._seq = {}
+        # file_path -> (size, mtime_ns) of the file as last written: while it matches,
+        # saves re-read only that file instead of re-validating every generation
+        self._written = {}
+
+    def _candidates(self, file_path):
+        tmp_path = file_path + '.tmp'
+        pairs = [(path, manifest_path_for(path)) for path in generation_paths(file_path, self.generations)]
+        # A crash between the two final renames leaves the new file with the temp manifest
+        return pairs + [(tmp_path, manifest_path_for(tmp_path)), (file_path, manifest_path_for(tmp_path))]
+
+    def newest_valid(self, file_path):
+        """(path, seq, length) of the newest valid generation, or None."""
+        best = None
+        for path, manifest_path in self._candidates(file_path):
+            info = validate_snapshot(path, manifest_path)
+            if info and (best is None or info[0] > best[1]):
+                best = (path, info[0], info[1])
+        return best
+
+    def _rewritten(self, file_path):
+        """Whether file_path was replaced since its manifest was written, e.g. by the json backend."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        manifest = read_manifest(manifest_path_for(file_path))
+        return manifest is None or (manifest['length'], manifest['mtime_ns']) != (stat.st_size, stat.st_mtime_ns)
+
+    def load(self, file_path):
+        best = self.newest_valid(file_path)
+        self._seq[file_path] = best[1] if best else 0
+        if best is None:
+            # No snapshot yet: read files left by the plain json backend
+            return load_json_with_backup(file_path, backup_path_for(file_path))
+        path, seq, length = best
+        if path != file_path and self._rewritten(file_path):
+            try:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
+                log.warning("%s was rewritten outside the snapshot backend; loading it over snapshot %d",
+                            file_path, seq)
+                return data
+            except (OSError, ValueError):
+                pass  # Corrupt: fall back to the newest valid generation
+        if path != file_path:
+            log.warning("Loaded %s (snapshot %d); newer generations of %s are missing or invalid", path, seq, file_path)
+        with open(path, 'rb') as f:
+            return json.loads(f.read(length))
+
+    def save_many(self, file_path, objs):
+        # Serialize first: lazily loaded fields are read from the current file
+        records = [(obj.id, obj.to_dict()) for obj in objs]
+        data = self._last_written(file_path)
+        if data is None:
+            data = self.load(file_path)
+        for record_id, record in records:
+            data[record_id] = record
+        self.write_records(file_path, data)
+        log.debug("Saved to %s", file_path)
+
+    def _last_written(self, file_path):
+        signature = self._written.pop(file_path, None)
+        try:
+            if signature is not None and self._signature(file_path) == signature:
+                with open(file_path, 'r') as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def write_records(self, file_path, data, backup_path=None):
+        # Older generations take the place of the json backend's single backup file
+        if file_path not in self._seq:
+            best = self.newest_valid(file_path)
+            self._seq[file_path] = best[1] if best else 0
+        seq = self._seq[file_path] + 1
+        offsets = {}
+        tmp_path = file_path + '.tmp'
+        size, checksum, mtime_ns = _write_file(tmp_path, self._encode(data, offsets), self.fsync)
+        manifest = json.dumps({'seq': seq, 'length': size, 'crc32': f'{checksum:08x}', 'mtime_ns': mtime_ns})
+        _write_file(manifest_path_for(tmp_path), [manifest.encode()], self.fsync)
+        paths = generation_paths(file_path, self.generations)
+        for older, newer in zip(reversed(paths[1:]), reversed(paths[:-1])):
+            if os.path.exists(newer):
+                # Manifest first: a data file briefly without one is read as plain JSON, never mismatched
+                if os.path.exists(manifest_path_for(newer)):
+                    os.replace(manifest_path_for(newer), manifest_path_for(older))
+                elif os.path.exists(manifest_path_for(older)):
+                    os.remove(manifest_path_for(older))
+                os.replace(newer, older)
+        os.replace(tmp_path, file_path)
+        os.replace(manifest_path_for(tmp_path), manifest_path_for(file_path))
+        if self.fsync:
+            _fsync_directory(file_path)
+        self._seq[file_path] = seq
+        self._written[file_path] = self._signature(file_path)
+        if self.lazy:
+            self._write_index(file_path, data, offsets)
+
+
+register_backend(SnapshotBackend.name, SnapshotBackend)
+
+
+if __name__ == '__main__':
+    import sys
+
+    backend = SnapshotBackend()
+    for file_path in sys.argv[1:] or ['patients.json', 'doctors.json']:
+        for path in generation_paths(file_path, backend.generations):
+            if os.path.exists(path):
+                info = validate_snapshot(path)
+                if info:
+                    print(f"{path}: valid, snapshot {info[0]}, {info[1]} bytes")
+                elif read_manifest(manifest_path_for(path)) is None:
+                    print(f"{path}: plain JSON, no manifest")
+                else:
+                    print(f"{path}: INVALID")
@@ -0,0 +1,431 @@
+import os
+import json
+import sqlite3
+import threading
+
+from data_storage import StorageBackend, register_backend, load_json_with_backup, backup_path_for
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age,
+    gender TEXT,
+    symptoms TEXT NOT NULL DEFAULT '[]',
+    assigned_doctor TEXT,
+    assigned_doctor_id TEXT,
+    status TEXT,
+    admission TEXT,
+    discharge_date TEXT,
+    treatment_total_cost REAL NOT NULL DEFAULT 0,
+    bill_amount REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS patient_history (
+    patient_id TEXT NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    notes TEXT,
+    cost REAL NOT NULL DEFAULT 0,
+    doctor_id TEXT,
+    PRIMARY KEY (patient_id, seq)
+);
+CREATE TABLE IF NOT EXISTS doctors (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    specialization TEXT NOT NULL,
+    on_leave INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS doctor_patients (
+    doctor_id TEXT NOT NULL REFERENCES doctors(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    patient_id TEXT NOT NULL,
+    PRIMARY KEY (doctor_id, seq)
+);
+CREATE TABLE IF NOT EXISTS doctor_notes (
+    doctor_id TEXT NOT NULL REFERENCES doctors(id) ON DELETE CASCADE,
+    patient_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    note TEXT,
+    treatment TEXT,
+    cost REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (doctor_id, patient_id, seq)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    origin INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_patients_status ON patients(status);
+CREATE INDEX IF NOT EXISTS idx_patients_assigned_doctor ON patients(assigned_doctor);
+CREATE INDEX IF NOT EXISTS idx_doctors_specialization ON doctors(specialization COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_doctors_name ON doctors(name);
+CREATE INDEX IF NOT EXISTS idx_doctor_patients_patient ON doctor_patients(patient_id);
+"""
+
+PATIENT_COLUMNS = ('id', 'name', 'age', 'gender', 'symptoms', 'assigned_doctor', 'assigned_doctor_id',
+                   'status', 'admission', 'discharge_date', 'treatment_total_cost', 'bill_amount')
+
+# Rows kept in the change log; readers further behind drop their whole cache
+CHANGE_LOG_SIZE = 10000
+
+PATIENT_UPSERT = (
+    f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}) VALUES ({', '.join('?' * len(PATIENT_COLUMNS))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ', '.join(f"{col} = excluded.{col}" for col in PATIENT_COLUMNS[1:])
+)
+
+
+# --------------------- SQLITE STORE ---------------------
+class SqliteStore:
+    """
+    Normalized SQLite storage for patients, doctors, history entries and doctor notes.
+    Records go in and come out in the same dict shape as Patient/Doctor.to_dict().
+    """
+
+    def __init__(self, db_path='hospital.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(patients)")}
+            if 'assigned_doctor_id' not in columns:
+                conn.execute("ALTER TABLE patients ADD COLUMN assigned_doctor_id TEXT")
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(patient_history)")}
+            if 'doctor_id' not in columns:
+                # Charges stored before then are credited to the patient's current doctor
+                conn.execute("ALTER TABLE patient_history ADD COLUMN doctor_id TEXT")
+                conn.execute("UPDATE patient_history SET doctor_id = "
+                             "(SELECT assigned_doctor_id FROM patients WHERE id = patient_history.patient_id)")
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            if self.db_path != ':memory:':
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---- writes ----
+    def _log_changes(self, conn, kind, records):
+        """Append the written ids to the change log in the writing transaction."""
+        origin = os.getpid()
+        cursor = conn.executemany("INSERT INTO changes (kind, record_id, origin) VALUES (?, ?, ?)",
+                                  [(kind, rec['id'], origin) for rec in records])
+        last = conn.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+        if cursor.rowcount and last % 1000 < cursor.rowcount:
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (last - CHANGE_LOG_SIZE,))
+
+    def upsert_patients(self, records):
+        records = list(records)
+        with self.connection() as conn:
+            self._log_changes(conn, 'patient', records)
+            for rec in records:
+                conn.execute(PATIENT_UPSERT,
+                    (rec['id'], rec['name'], rec['age'], rec['gender'], json.dumps(rec['symptoms']),
+                     rec.get('assigned_doctor'), rec.get('assigned_doctor_id'), rec.get('status'),
+                     rec.get('admission'), rec.get('discharge_date'),
+                     rec.get('treatment_total_cost', 0) or 0, rec.get('bill_amount', 0) or 0),
+                )
+                # History is append-only: only entries past the stored ones are written, each
+                # with the doctor assigned at the time, as the billing ledger credits charges
+                history = rec.get('history', [])
+                stored = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM patient_history WHERE patient_id = ?",
+                                      (rec['id'],)).fetchone()[0]
+                doctor_id = rec.get('assigned_doctor_id')
+                if doctor_id is None and rec.get('assigned_doctor') and len(history) > stored:
+                    # Records saved before assigned_doctor_id existed only carry the name
+                    row = conn.execute("SELECT id FROM doctors WHERE name = ? ORDER BY rowid LIMIT 1",
+                                       (rec['assigned_doctor'],)).fetchone()
+                    doctor_id = row[0] if row else None
+                conn.executemany(
+                    "INSERT INTO patient_history (patient_id, seq, date, notes, cost, doctor_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(rec['id'], seq, e.get('date'), e.get('notes'), e.get('cost', 0), doctor_id)
+                     for seq, e in enumerate(history) if seq >= stored],
+                )
+                if stored > len(history):
+                    conn.execute("DELETE FROM patient_history WHERE patient_id = ? AND seq >= ?",
+                                 (rec['id'], len(history)))
+
+    def upsert_doctors(self, records):
+        records = list(records)
+        with self.connection() as conn:
+            self._log_changes(conn, 'doctor', records)
+            for rec in records:
+                conn.execute(
+                    "INSERT INTO doctors (id, name, specialization, on_leave) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+                    "specialization = excluded.specialization, on_leave = excluded.on_leave",
+                    (rec['id'], rec['name'], rec['specialization'], int(bool(rec.get('on_leave')))),
+                )
+                self._update_doctor_patients(conn, rec['id'], rec.get('patients', []))
+                self._update_doctor_notes(conn, rec['id'], rec.get('notes', {}))
+
+    @staticmethod
+    def _update_doctor_patients(conn, doctor_id, patient_ids):
+        """Delete the unlisted and append the new patient ids, rewriting only when the order changed."""
+        stored = [row[0] for row in conn.execute(
+            "SELECT patient_id FROM doctor_patients WHERE doctor_id = ? ORDER BY seq", (doctor_id,))]
+        if stored == patient_ids:
+            return
+        current, known = set(patient_ids), set(stored)
+        added = [pid for pid in patient_ids if pid not in known]
+        if [pid for pid in stored if pid in current] + added == patient_ids:
+            conn.executemany("DELETE FROM doctor_patients WHERE doctor_id = ? AND patient_id = ?",
+                             [(doctor_id, pid) for pid in known - current])
+        else:
+            conn.execute("DELETE FROM doctor_patients WHERE doctor_id = ?", (doctor_id,))
+            added = patient_ids
+        next_seq = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM doctor_patients WHERE doctor_id = ?",
+                                (doctor_id,)).fetchone()[0]
+        conn.executemany("INSERT INTO doctor_patients (doctor_id, seq, patient_id) VALUES (?, ?, ?)",
+                         [(doctor_id, next_seq + i, pid) for i, pid in enumerate(added)])
+
+    @staticmethod
+    def _update_doctor_notes(conn, doctor_id, notes):
+        """Append the notes past the stored ones per patient; notes are append-only like history."""
+        stored = dict(conn.execute("SELECT patient_id, MAX(seq) + 1 FROM doctor_notes WHERE doctor_id = ? "
+                                   "GROUP BY patient_id", (doctor_id,)).fetchall())
+        conn.executemany("DELETE FROM doctor_notes WHERE doctor_id = ? AND patient_id = ?",
+                         [(doctor_id, pid) for pid in stored.keys() - notes.keys()])
+        conn.executemany("DELETE FROM doctor_notes WHERE doctor_id = ? AND patient_id = ? AND seq >= ?",
+                         [(doctor_id, pid, len(entries)) for pid, entries in notes.items()
+                          if stored.get(pid, 0) > len(entries)])
+        conn.executemany(
+            "INSERT INTO doctor_notes (doctor_id, patient_id, seq, date, note, treatment, cost) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(doctor_id, pid, seq, n.get('date'), n.get('note'), n.get('treatment'), n.get('cost', 0))
+             for pid, entries in notes.items() for seq, n in enumerate(entries) if seq >= stored.get(pid, 0)],
+        )
+
+    # ---- reads ----
+    def change_seq(self):
+        """Sequence number of the latest logged change (0 when none)."""
+        return self.connection().execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """
+        Returns (oldest_seq, [(seq, kind, record_id, origin), ...]) for changes
+        after `seq`; oldest_seq is the first change still in the log.
+        """
+        conn = self.connection()
+        oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        rows = conn.execute("SELECT seq, kind, record_id, origin FROM changes WHERE seq > ? ORDER BY seq",
+                            (seq,)).fetchall()
+        return oldest, [tuple(row) for row in rows]
+
+    def _patients_where(self, where='', params=()):
+        conn = self.connection()
+        records = {}
+        for row in conn.execute(f"SELECT p.* FROM patients p {where} ORDER BY p.rowid", params):
+            rec = {col: row[col] for col in PATIENT_COLUMNS}
+            rec['symptoms'] = json.loads(rec['symptoms'])
+            rec['history'] = []
+            records[rec['id']] = rec
+        if records:
+            for h in conn.execute(
+                    f"SELECT h.patient_id, h.date, h.notes, h.cost FROM patient_history h "
+                    f"JOIN patients p ON p.id = h.patient_id {where} ORDER BY h.patient_id, h.seq", params):
+                records[h['patient_id']]['history'].append({'date': h['date'], 'notes': h['notes'], 'cost': h['cost']})
+        return list(records.values())
+
+    def _doctors_where(self, where='', params=()):
+        conn = self.connection()
+        records = {}
+        for row in conn.execute(f"SELECT d.* FROM doctors d {where} ORDER BY d.rowid", params):
+            records[row['id']] = {
+                'id': row['id'], 'name': row['name'], 'specialization': row['specialization'],
+                'patients': [], 'notes': {}, 'on_leave': bool(row['on_leave']),
+            }
+        if records:
+            for r in conn.execute(
+                    f"SELECT dp.doctor_id, dp.patient_id FROM doctor_patients dp "
+                    f"JOIN doctors d ON d.id = dp.doctor_id {where} ORDER BY dp.doctor_id, dp.seq", params):
+                records[r['doctor_id']]['patients'].append(r['patient_id'])
+            for n in conn.execute(
+                    f"SELECT n.* FROM doctor_notes n JOIN doctors d ON d.id = n.doctor_id {where} "
+                    f"ORDER BY n.doctor_id, n.patient_id, n.seq", params):
+                records[n['doctor_id']]['notes'].setdefault(n['patient_id'], []).append(
+                    {'date': n['date'], 'note': n['note'], 'treatment': n['treatment'], 'cost': n['cost']})
+        return list(records.values())
+
+    def get_patient(self, patient_id):
+        found = self._patients_where("WHERE p.id = ?", (patient_id,))
+        return found[0] if found else None
+
+    def get_doctor(self, doctor_id):
+        found = self._doctors_where("WHERE d.id = ?", (doctor_id,))
+        return found[0] if found else None
+
+    def all_patients(self):
+        return self._patients_where()
+
+    def all_doctors(self):
+        return self._doctors_where()
+
+    def patients_by_status(self, status):
+        return self._patients_where("WHERE p.status = ?", (status,))
+
+    def patients_for_doctor(self, doctor_name):
+        return self._patients_where("WHERE p.assigned_doctor = ?", (doctor_name,))
+
+    def page_patients(self, query):
+        """One page of patients ordered by id for a patient_listing.ListingQuery."""
+        where = []
+        params = []
+        for clause, value in (("p.id > ?", query.cursor), ("p.status = ?", query.status),
+                              ("p.assigned_doctor = ?", query.doctor),
+                              ("p.admission >= ?", query.admitted_from), ("p.admission <= ?", query.admitted_to)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = "SELECT p.id FROM patients p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.id LIMIT ?"
+        ids = [row[0] for row in self.connection().execute(sql, params + [query.limit + 1])]
+        next_cursor = ids[query.limit - 1] if len(ids) > query.limit else None
+        ids = ids[:query.limit]
+        if not ids:
+            return [], None
+        records = {rec['id']: rec for rec in self._patients_where(
+            f"WHERE p.id IN ({', '.join('?' * len(ids))})", ids)}
+        return [records[pid] for pid in ids], next_cursor
+
+    def page_doctors(self, cursor=None, limit=500):
+        """Up to `limit` doctors with ids after `cursor`, ordered by id."""
+        if cursor is None:
+            found = self._doctors_where("WHERE d.id IN (SELECT id FROM doctors ORDER BY id LIMIT ?)", (limit,))
+        else:
+            found = self._doctors_where(
+                "WHERE d.id IN (SELECT id FROM doctors WHERE id > ? ORDER BY id LIMIT ?)", (cursor, limit))
+        return sorted(found, key=lambda rec: rec['id'])
+
+    def doctors_by_specialization(self, specialization):
+        return self._doctors_where("WHERE d.specialization = ? COLLATE NOCASE", (specialization,))
+
+    def doctor_by_name(self, name):
+        found = self._doctors_where("WHERE d.name = ?", (name,))
+        return found[0] if found else None
+
+    @staticmethod
+    def _available_where(specialization, exclude):
+        where = ["d.on_leave = 0"]
+        params = []
+        if specialization is not None:
+            where.append("d.specialization = ? COLLATE NOCASE")
+            params.append(specialization)
+        for doctor_id in exclude:
+            where.append("d.id != ?")
+            params.append(doctor_id)
+        return ' AND '.join(where), params
+
+    def doctor_loads(self, specialization=None, exclude=()):
+        """[(id, patient count)] of every available doctor, in registration order."""
+        where, params = self._available_where(specialization, exclude)
+        return [tuple(row) for row in self.connection().execute(
+            f"SELECT d.id, COUNT(dp.patient_id) FROM doctors d LEFT JOIN doctor_patients dp ON dp.doctor_id = d.id "
+            f"WHERE {where} GROUP BY d.id ORDER BY d.rowid", params)]
+
+    def count_by_status(self):
+        rows = self.connection().execute("SELECT status, COUNT(*) FROM patients GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def patient_count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def doctor_count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM doctors").fetchone()[0]
+
+    def total_revenue(self):
+        return self.connection().execute("SELECT COALESCE(SUM(bill_amount), 0) FROM patients").fetchone()[0]
+
+    def revenue_report(self):
+        """
+        The ledger.BillingLedger report computed with GROUP BY over
+        patient_history; each charge counts for the doctor stored on its row.
+        """
+        conn = self.connection()
+        charges, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(cost), 0) FROM patient_history").fetchone()
+        by_day = conn.execute(
+            "SELECT COALESCE(date, 'unknown'), SUM(cost) FROM patient_history GROUP BY 1 ORDER BY 1")
+        by_doctor = conn.execute(
+            "SELECT COALESCE(doctor_id, 'unassigned'), SUM(cost) FROM patient_history GROUP BY 1")
+        by_specialization = conn.execute(
+            "SELECT COALESCE(d.specialization, 'unassigned'), SUM(h.cost) FROM patient_history h "
+            "LEFT JOIN doctors d ON d.id = h.doctor_id GROUP BY 1")
+        return {
+            'charges': charges,
+            'total': float(total),
+            'by_day': {day: float(amount) for day, amount in by_day},
+            'by_doctor': {doctor_id: float(amount) for doctor_id, amount in by_doctor},
+            'by_specialization': {spec: float(amount) for spec, amount in by_specialization},
+            'engine': 'sqlite',
+        }
+
+    def import_json(self, patients_path='patients.json', doctors_path='doctors.json'):
+        """One-off migration of the JSON data files into the database."""
+        patient_data = load_json_with_backup(patients_path, backup_path_for(patients_path))
+        doctor_data = load_json_with_backup(doctors_path, backup_path_for(doctors_path))
+        self.upsert_patients([dict(rec, id=pid) for pid, rec in patient_data.items()])
+        self.upsert_doctors([dict(rec, id=did) for did, rec in doctor_data.items()])
+        return len(patient_data), len(doctor_data)
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Storage backend that keeps records in SQLite. Records are not loaded
+    eagerly at startup; the repository fetches them on demand.
+    """
+
+    name = 'sqlite'
+    eager_load = False
+
+    def __init__(self, db_path=None):
+        self.store = SqliteStore(db_path or os.environ.get('HOSPITAL_DB', 'hospital.db'))
+
+    def _table(self, file_path):
+        base = os.path.basename(file_path)
+        if base.startswith('patients'):
+            return 'patients'
+        if base.startswith('doctors'):
+            return 'doctors'
+        raise ValueError(f"SQLite backend cannot store {file_path}")
+
+    def save_many(self, file_path, objs):
+        records = [obj.to_dict() for obj in objs]
+        if self._table(file_path) == 'patients':
+            self.store.upsert_patients(records)
+        else:
+            self.store.upsert_doctors(records)
+
+    def load(self, file_path):
+        if self._table(file_path) == 'patients':
+            records = self.store.all_patients()
+        else:
+            records = self.store.all_doctors()
+        return {rec['id']: rec for rec in records}
+
+    def close(self):
+        self.store.close()
+
+
+register_backend(SqliteBackend.name, SqliteBackend)
+
+if __name__ == '__main__':
+    import sys
+    store = SqliteStore(sys.argv[1] if len(sys.argv) > 1 else 'hospital.db')
+    n_patients, n_doctors = store.import_json()
+    print(f"Imported {n_patients} patients and {n_doctors} doctors into {store.db_path}")
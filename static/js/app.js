@@ -1,6 +1,10 @@
 // Global variables
 let symptoms = [];
 let currentPatient = null;
+// Patients shown on the dashboard, kept current by /api/events deltas
+let dashboardPatients = new Map();
+let liveUpdates = null;
+let dashboardRenderPending = false;
 
 // DOM Loaded
 document.addEventListener('DOMContentLoaded', function() {
@@ -113,7 +117,7 @@ function showSection(sectionId) {
     // Load section-specific data
     switch(sectionId) {
         case 'dashboard':
-            loadDashboard();
+            refreshDashboard();
             break;
         case 'patients':
             loadPatients();
@@ -237,6 +241,24 @@ function removeNotification(button) {
     }
 }
 
+// Patient lists are fetched a page at a time, with only the columns they show
+const PATIENT_PAGE_SIZE = 500;
+const DASHBOARD_FIELDS = 'id,name,age,gender,status';
+const PATIENT_LIST_FIELDS = 'id,name,age,gender,status,assigned_doctor,bill_amount';
+
+async function loadPatientPages(fields, onPage) {
+    let cursor = null;
+    do {
+        let url = `/api/patients?limit=${PATIENT_PAGE_SIZE}&fields=${fields}`;
+        if (cursor !== null) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        const page = await apiRequest(url);
+        onPage(page.data);
+        cursor = page.next_cursor;
+    } while (cursor);
+}
+
 // Dashboard functions
 async function loadDashboard() {
     console.log('Loading dashboard...');
@@ -245,30 +267,28 @@ async function loadDashboard() {
         // Test server connection first
         console.log('Testing server connection...');
         
-        const [statisticsResult, patientsResult] = await Promise.all([
+        // The counts come from /api/statistics; the lists only need a few fields per patient
+        const patients = new Map();
+        const [statisticsResult] = await Promise.all([
             apiRequest('/api/statistics'),
-            apiRequest('/api/patients')
+            loadPatientPages(DASHBOARD_FIELDS, (page) => {
+                page.forEach((patient) => patients.set(patient.id, patient));
+            })
         ]);
         
         const stats = statisticsResult.data;
-        const patients = patientsResult.data;
         
         console.log('Statistics:', stats);
-        console.log('Patients:', patients);
-        
-        // Update header stats
-        updateElementText('total-patients', stats.total_patients);
-        updateElementText('total-doctors', stats.total_doctors);
+        console.log(`Patients: ${patients.size}`);
         
-        // Update dashboard stats
-        updateElementText('inpatients-count', stats.inpatients);
-        updateElementText('outpatients-count', stats.outpatients);
-        updateElementText('discharged-count', stats.discharged);
-        updateElementText('total-revenue', `₹${stats.total_revenue.toFixed(2)}`);
+        updateStatistics(stats);
         
         // Load recent patients
-        loadRecentPatients(patients);
-        loadCurrentInpatients(patients);
+        dashboardPatients = patients;
+        renderDashboardPatients();
+        
+        // Further changes arrive as server-sent events
+        connectLiveUpdates();
         
         console.log('Dashboard loaded successfully');
         
@@ -291,6 +311,78 @@ async function loadDashboard() {
     }
 }
 
+function updateStatistics(stats) {
+    // Update header stats
+    updateElementText('total-patients', stats.total_patients);
+    updateElementText('total-doctors', stats.total_doctors);
+    
+    // Update dashboard stats
+    updateElementText('inpatients-count', stats.inpatients);
+    updateElementText('outpatients-count', stats.outpatients);
+    updateElementText('discharged-count', stats.discharged);
+    updateElementText('total-revenue', `₹${stats.total_revenue.toFixed(2)}`);
+}
+
+function renderDashboardPatients() {
+    dashboardRenderPending = false;
+    const patients = Object.fromEntries(dashboardPatients);
+    loadRecentPatients(patients);
+    loadCurrentInpatients(patients);
+}
+
+// Render once per batch of events rather than once per event
+function scheduleDashboardRender() {
+    if (!dashboardRenderPending) {
+        dashboardRenderPending = true;
+        requestAnimationFrame(renderDashboardPatients);
+    }
+}
+
+// Live dashboard updates (server-sent events)
+function connectLiveUpdates() {
+    if (liveUpdates || typeof EventSource === 'undefined') {
+        return;
+    }
+    console.log('Connecting to live updates...');
+    // The browser reconnects by itself, resuming from the last event id
+    liveUpdates = new EventSource('/api/events');
+    
+    liveUpdates.addEventListener('patient', (event) => {
+        const summary = JSON.parse(event.data);
+        // New patients are appended, so they show up as the most recent
+        const known = dashboardPatients.get(summary.id) || {};
+        dashboardPatients.set(summary.id, { ...known, ...summary });
+        scheduleDashboardRender();
+    });
+    
+    liveUpdates.addEventListener('removed', (event) => {
+        dashboardPatients.delete(JSON.parse(event.data).id);
+        scheduleDashboardRender();
+    });
+    
+    liveUpdates.addEventListener('stats', (event) => {
+        updateStatistics(JSON.parse(event.data));
+    });
+    
+    // The server could not replay the missed changes: reload everything
+    liveUpdates.addEventListener('reset', () => {
+        console.log('Live updates reset, reloading dashboard...');
+        loadDashboard();
+    });
+    
+    liveUpdates.onerror = () => {
+        console.warn('Live updates connection lost, retrying...');
+    };
+}
+
+// Reload the dashboard unless live updates are keeping it current
+function refreshDashboard() {
+    if (liveUpdates && liveUpdates.readyState === EventSource.OPEN) {
+        return;
+    }
+    loadDashboard();
+}
+
 // Helper function to safely update element text
 function updateElementText(elementId, text) {
     const element = document.getElementById(elementId);
@@ -395,7 +487,7 @@ async function handleDoctorRegistration(e) {
         
         showNotification('Success', result.message, 'success');
         document.getElementById('doctor-form').reset();
-        loadDashboard();
+        refreshDashboard();
         
     } catch (error) {
         console.error('Error registering doctor:', error);
@@ -430,7 +522,7 @@ async function handlePatientRegistration(e) {
         
         showNotification('Success', result.message, 'success');
         clearPatientForm();
-        loadDashboard();
+        refreshDashboard();
         
     } catch (error) {
         console.error('Error registering patient:', error);
@@ -496,8 +588,6 @@ async function loadPatients() {
     console.log('Loading patients...');
     
     try {
-        const result = await apiRequest('/api/patients');
-        const patients = result.data;
         const tbody = document.querySelector('#patients-table tbody');
         
         if (!tbody) {
@@ -506,10 +596,11 @@ async function loadPatients() {
         }
         
         tbody.innerHTML = '';
+        let count = 0;
         
-        console.log(`Displaying ${Object.keys(patients).length} patients`);
-        
-        Object.entries(patients).forEach(([patientId, patient]) => {
+        // Rows are added as each page arrives
+        await loadPatientPages(PATIENT_LIST_FIELDS, (page) => page.forEach((patient) => {
+            const patientId = patient.id;
             const row = document.createElement('tr');
             row.innerHTML = `
                 <td>${patientId}</td>
@@ -526,9 +617,12 @@ async function loadPatients() {
                 </td>
             `;
             tbody.appendChild(row);
-        });
+            count++;
+        }));
         
-        if (Object.keys(patients).length === 0) {
+        console.log(`Displayed ${count} patients`);
+        
+        if (count === 0) {
             tbody.innerHTML = '<tr><td colspan="8" class="text-center">No patients found.</td></tr>';
         }
     } catch (error) {
@@ -574,12 +668,26 @@ async function loadDoctors() {
 }
 
 // Patient details
+// The history is paged (newest first) rather than sent whole with the patient
+const PATIENT_SUMMARY_FIELDS = 'id,name,age,gender,symptoms,assigned_doctor,assigned_doctor_id,status,' +
+    'admission,discharge_date,treatment_total_cost,bill_amount';
+const HISTORY_PAGE_SIZE = 20;
+
+function historyPageURL(patientId, cursor = null) {
+    let url = `/api/patients/${patientId}/history?order=desc&limit=${HISTORY_PAGE_SIZE}`;
+    if (cursor !== null) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    return url;
+}
+
 async function viewPatientDetails(patientId) {
     console.log(`Viewing details for patient: ${patientId}`);
     
     try {
-        const result = await apiRequest(`/api/patients/${patientId}`);
+        const result = await apiRequest(`/api/patients/${patientId}?fields=${PATIENT_SUMMARY_FIELDS}`);
         const patient = result.data;
+        const history = await apiRequest(historyPageURL(patientId));
         
         const modalTitle = document.getElementById('modal-patient-title');
         const modalBody = document.getElementById('patient-modal-body');
@@ -590,7 +698,7 @@ async function viewPatientDetails(patientId) {
         }
         
         modalTitle.textContent = `Patient Details - ${patient.name}`;
-        modalBody.innerHTML = createPatientDetailsHTML(patient);
+        modalBody.innerHTML = createPatientDetailsHTML(patient, history);
         
         showModal('patient-modal');
     } catch (error) {
@@ -598,7 +706,32 @@ async function viewPatientDetails(patientId) {
     }
 }
 
-function createPatientDetailsHTML(patient) {
+function createHistoryEntriesHTML(entries) {
+    return entries.map(entry => `
+                <div class="history-entry">
+                    <strong>${entry.date}:</strong> ${entry.notes}
+                </div>
+            `).join('');
+}
+
+function createHistoryMoreHTML(patientId, cursor) {
+    if (cursor === null) {
+        return '';
+    }
+    return `<button class="btn btn-secondary btn-sm" id="history-more" onclick="loadMoreHistory('${patientId}', '${cursor}')">Load older entries</button>`;
+}
+
+async function loadMoreHistory(patientId, cursor) {
+    try {
+        const page = await apiRequest(historyPageURL(patientId, cursor));
+        document.getElementById('history-entries').insertAdjacentHTML('beforeend', createHistoryEntriesHTML(page.data));
+        document.getElementById('history-more').outerHTML = createHistoryMoreHTML(patientId, page.next_cursor);
+    } catch (error) {
+        console.error('Error loading patient history:', error);
+    }
+}
+
+function createPatientDetailsHTML(patient, history = null) {
     let html = `
         <div class="patient-details">
             <div class="detail-group">
@@ -653,21 +786,14 @@ function createPatientDetailsHTML(patient) {
         `;
     }
     
-    if (patient.history && patient.history.length > 0) {
+    if (history && history.total > 0) {
         html += `
             <div class="history-section">
-                <h4>Medical History</h4>
+                <h4>Medical History (${history.total} entries, newest first)</h4>
+                <div id="history-entries">${createHistoryEntriesHTML(history.data)}</div>
+                ${createHistoryMoreHTML(patient.id, history.next_cursor)}
+            </div>
         `;
-        
-        patient.history.forEach(entry => {
-            html += `
-                <div class="history-entry">
-                    <strong>${entry.date}:</strong> ${entry.notes}
-                </div>
-            `;
-        });
-        
-        html += '</div>';
     }
     
     html += '</div>';
@@ -685,7 +811,7 @@ async function searchPatientForTreatment() {
     }
     
     try {
-        const result = await apiRequest(`/api/patients/${patientId}`);
+        const result = await apiRequest(`/api/patients/${patientId}?fields=${PATIENT_SUMMARY_FIELDS}`);
         const patient = result.data;
         
         if (patient.status !== 'inpatient') {
@@ -754,7 +880,7 @@ async function handleTreatment(e) {
         document.getElementById('treatment-form').reset();
         document.getElementById('patient-info').style.display = 'none';
         currentPatient = null;
-        loadDashboard();
+        refreshDashboard();
 
     } catch (error) {
         console.error('Error processing treatment:', error);
@@ -0,0 +1,157 @@
+import os
+import json
+from collections import deque
+from instrumentation import SYMPTOM_MATCH_SECONDS
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symptom_rules.json')
+
+
+# --------------------- SYMPTOM MATCHER ---------------------
+class SymptomMatch:
+    def __init__(self, admit, specializations):
+        self.admit = admit
+        # Distinct specializations in order of first match (symptom order, then rule order)
+        self.specializations = specializations
+
+    @property
+    def specialization(self):
+        return self.specializations[0] if self.specializations else None
+
+
+class SymptomMatcher:
+    """
+    Symptom rules compiled once for matching many symptom strings.
+
+    A rule matches a symptom when the rule text occurs in the symptom or the
+    symptom occurs in the rule text (both case-insensitive). The first case
+    is answered by an Aho-Corasick automaton in one pass over the symptom,
+    the second by a precomputed table of every substring of every rule.
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            {
+                'symptom': rule['symptom'].strip().lower(),
+                'specialization': rule.get('specialization'),
+                'admit': bool(rule.get('admit', False)),
+            }
+            for rule in rules
+        ]
+        self._build_automaton()
+        self._build_substring_table()
+        self._cache = {}
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        with open(path, 'r') as f:
+            return cls(json.load(f)['rules'])
+
+    def _build_automaton(self):
+        # goto[state] = {char: next_state}; out[state] = rule indices ending here
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for index, rule in enumerate(self.rules):
+            state = 0
+            for ch in rule['symptom']:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = nxt
+            self._out[state].add(index)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+        self._out = [frozenset(o) for o in self._out]
+
+    def _build_substring_table(self):
+        self._contained_in = {}
+        for index, rule in enumerate(self.rules):
+            text = rule['symptom']
+            for start in range(len(text) + 1):
+                for end in range(start, len(text) + 1):
+                    self._contained_in.setdefault(text[start:end], set()).add(index)
+        self._contained_in = {k: frozenset(v) for k, v in self._contained_in.items()}
+
+    def _scan(self, text):
+        """Rule indices whose text occurs in `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = set()
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    CACHE_SIZE = 10000
+
+    def _classify(self, symptom):
+        """(matching rule indices in rule order, admit?) for one symptom, cached by raw text."""
+        result = self._cache.get(symptom)
+        if result is None:
+            s_clean = symptom.strip().lower()
+            found = tuple(sorted(self._scan(s_clean) | self._contained_in.get(s_clean, frozenset())))
+            result = (found, any(self.rules[index]['admit'] for index in found))
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            self._cache[symptom] = result
+        return result
+
+    def matching_rules(self, symptom):
+        """Indices of the rules matching one symptom, in rule order."""
+        return self._classify(symptom)[0]
+
+    def match(self, symptoms):
+        with SYMPTOM_MATCH_SECONDS.time():
+            return self._match(symptoms)
+
+    def _match(self, symptoms):
+        admit = False
+        specializations = []
+        seen = set()
+        for symptom in symptoms:
+            for index in self.matching_rules(symptom):
+                rule = self.rules[index]
+                admit = admit or rule['admit']
+                spec = rule['specialization']
+                if spec and spec not in seen:
+                    seen.add(spec)
+                    specializations.append(spec)
+        return SymptomMatch(admit, specializations)
+
+    def should_admit(self, symptoms):
+        classify = self._classify
+        for symptom in symptoms:
+            if classify(symptom)[1]:
+                return True
+        return False
+
+
+_matcher = None
+
+
+def get_matcher():
+    """The shared matcher, compiled from HOSPITAL_SYMPTOM_RULES or symptom_rules.json."""
+    global _matcher
+    if _matcher is None:
+        _matcher = SymptomMatcher.from_file(os.environ.get('HOSPITAL_SYMPTOM_RULES', DEFAULT_RULES_PATH))
+    return _matcher
+
+
+def set_matcher(matcher):
+    global _matcher
+    _matcher = matcher
@@ -0,0 +1,189 @@
+import unittest
+import json
+import asyncio
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, stream_with_context
+from data_storage import configure_storage
+from write_behind import start_write_behind, stop_write_behind
+from async_server import AsyncServer, REVALIDATE_KEY, REVALIDATE_HEADER
+import test_support
+
+
+def make_app(started=None, release=None):
+    app = Flask(__name__)
+
+    @app.route('/api/items', methods=['GET'])
+    def items():
+        return jsonify({'success': True, 'data': {'limit': request.args.get('limit')}})
+
+    @app.route('/api/items', methods=['POST'])
+    def add_item():
+        data = request.get_json()
+        if not data.get('name'):
+            return jsonify({'success': False, 'error': 'Name is required'}), 400
+        return jsonify({'success': True, 'data': data})
+
+    @app.route('/api/stream')
+    def stream():
+        def lines():
+            for i in range(3):
+                yield f"{request.args.get('prefix', '')}{i}\n"
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+    @app.route('/api/tagged')
+    def tagged():
+        if request.if_none_match.contains_weak('v1'):
+            response = Response(status=304)
+        elif request.environ.get(REVALIDATE_KEY):
+            return Response(status=204, headers={REVALIDATE_HEADER: 'miss'})
+        else:
+            response = jsonify({'success': True, 'thread': threading.current_thread().name})
+        response.set_etag('v1')
+        return response
+
+    @app.route('/api/slow')
+    def slow():
+        started.set()
+        release.wait(5)
+        return jsonify({'success': True})
+
+    return app
+
+
+class TestAsyncServer(unittest.TestCase):
+    def setUp(self):
+        configure_storage('json')
+        self.loop = asyncio.new_event_loop()
+        self.started, self.release = threading.Event(), threading.Event()
+        self.server = AsyncServer(make_app(self.started, self.release), '127.0.0.1', 0, threads=4,
+                                  inline_endpoints=('items',), conditional_endpoints=('tagged',))
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.conn = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.release.set()
+        self.conn.close()
+        asyncio.run_coroutine_threadsafe(self.server.shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.server.close()
+        self.loop.close()
+        stop_write_behind()
+        configure_storage('json')
+
+    def _request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def test_json_routes_keep_alive(self):
+        for limit in ('1', '2'):
+            response, body = self._request('GET', f'/api/items?limit={limit}')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(json.loads(body), {'success': True, 'data': {'limit': limit}})
+        response, body = self._request('POST', '/api/items', {'name': 'x'})
+        self.assertEqual(json.loads(body)['data'], {'name': 'x'})
+        response, body = self._request('POST', '/api/items', {})
+        self.assertEqual(response.status, 400)
+        self.assertEqual(json.loads(body), {'success': False, 'error': 'Name is required'})
+        response, _ = self._request('GET', '/missing')
+        self.assertEqual(response.status, 404)
+
+    def test_streamed_response_is_chunked(self):
+        for _ in range(2):
+            response, body = self._request('GET', '/api/stream?prefix=r')
+            self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+            self.assertEqual(body, b"r0\nr1\nr2\n")
+        response, body = self._request('HEAD', '/api/stream')
+        self.assertEqual(body, b"")
+
+    def test_not_modified_has_no_body(self):
+        response, _ = self._request('GET', '/api/tagged')
+        etag = response.getheader('ETag')
+        self.conn.request('GET', '/api/tagged', headers={'If-None-Match': etag})
+        response = self.conn.getresponse()
+        self.assertEqual(response.status, 304)
+        self.assertIsNone(response.getheader('Transfer-Encoding'))
+        self.assertEqual(response.read(), b"")
+        # The connection is still usable
+        response, body = self._request('GET', '/api/items?limit=3')
+        self.assertEqual(json.loads(body)['data'], {'limit': '3'})
+
+    def test_handlers_run_inline_with_write_behind(self):
+        self.assertFalse(AsyncServer.runs_inline())
+        start_write_behind()
+        self.assertTrue(AsyncServer.runs_inline())
+        response, body = self._request('GET', '/api/stream')
+        self.assertEqual(body, b"0\n1\n2\n")
+        configure_storage('json', lazy=True)
+        self.assertFalse(AsyncServer.runs_inline())
+
+    def test_slow_handler_does_not_delay_other_requests(self):
+        # Records in memory with write-behind: the case where cheap routes run on the loop
+        start_write_behind()
+        with ThreadPoolExecutor(1) as pool:
+            def slow_request():
+                conn = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+                try:
+                    conn.request('GET', '/api/slow')
+                    return conn.getresponse().status
+                finally:
+                    conn.close()
+
+            slow = pool.submit(slow_request)
+            self.assertTrue(self.started.wait(5))
+            response, body = self._request('GET', '/api/tagged')
+            self.assertEqual(response.status, 200)
+            self.assertFalse(slow.done())
+            self.release.set()
+            self.assertEqual(slow.result(5), 200)
+
+    def test_only_listed_routes_run_on_the_loop(self):
+        def environ(path, **headers):
+            return dict({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'SERVER_NAME': 'localhost',
+                         'SERVER_PORT': '80', 'wsgi.url_scheme': 'http'}, **headers)
+
+        self.assertEqual(self.server.placement(environ('/api/items')), 'pool')
+        start_write_behind()
+        self.assertEqual(self.server.placement(environ('/api/items')), 'inline')
+        self.assertEqual(self.server.placement(environ('/api/stream')), 'pool')
+        self.assertEqual(self.server.placement(environ('/api/tagged')), 'pool')
+        self.assertEqual(self.server.placement(environ('/api/tagged', HTTP_IF_NONE_MATCH='"v1"')), 'revalidate')
+        self.assertEqual(self.server.placement(environ('/missing')), 'pool')
+        # A current copy is answered by the probe; a stale one is served from the pool
+        self.conn.request('GET', '/api/tagged', headers={'If-None-Match': '"v1"'})
+        response = self.conn.getresponse()
+        self.assertEqual((response.status, response.read()), (304, b""))
+        self.conn.request('GET', '/api/tagged', headers={'If-None-Match': '"v0"'})
+        response = self.conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertIsNone(response.getheader(REVALIDATE_HEADER))
+        self.assertTrue(json.loads(response.read())['thread'].startswith('async-server'))
+
+    def test_malformed_request(self):
+        sock = self.conn.sock or self.conn.connect() or self.conn.sock
+        sock.sendall(b"NONSENSE\r\n\r\n")
+        self.assertIn(b"400 Bad Request", sock.recv(1024))
+
+class TestRevalidation(unittest.TestCase):
+    def setUp(self):
+        self.client = test_support.web_client()
+
+    def test_stale_copy_is_deferred_only_when_revalidating(self):
+        tag = self.client.get('/api/doctors').headers['ETag']
+        probe = {REVALIDATE_KEY: True}
+        response = self.client.get('/api/doctors', headers={'If-None-Match': tag}, environ_overrides=probe)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/doctors', headers={'If-None-Match': '"stale"'}, environ_overrides=probe)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.headers[REVALIDATE_HEADER], 'miss')
+        response = self.client.get('/api/doctors', headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
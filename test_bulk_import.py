@@ -0,0 +1,153 @@
+import unittest
+import io
+import json
+from unittest import mock
+from data_storage import configure_storage, save_doctor_to_json, patients, doctors
+from bulk_import import import_patients, parse_row
+from repository import get_repository
+from doctor import Doctor
+import test_support
+from test_support import TempDirTestCase
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+        self.backend = configure_storage('recording')
+        self.cardio = Doctor("Dr. Heart", "Cardiology")
+        self.general = Doctor("Dr. Gen", "General Medicine")
+        for doc in (self.cardio, self.general):
+            doctors[doc.id] = doc
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_ndjson_import_batches_writes(self):
+        rows = [{"name": f"P{i}", "age": 30 + i, "gender": "F", "symptoms": ["chest pain"] if i % 2 else ["cough"]}
+                for i in range(5)]
+        stream = io.StringIO("\n".join(json.dumps(r) for r in rows) + "\n")
+        result = import_patients(stream, 'ndjson', chunk_size=2)
+        self.assertEqual(result['imported'], 5)
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual(result['admitted'], 2)
+        self.assertEqual(result['outpatients'], 3)
+        self.assertEqual(result['chunks'], 3)
+        patient_writes = [ids for path, ids in self.backend.writes if path == 'patients.json']
+        self.assertEqual([len(ids) for ids in patient_writes], [2, 2, 1])
+        self.assertEqual(len(patients), 5)
+        self.assertEqual(len(self.cardio.patients), 3)
+        self.assertEqual(len(self.general.patients), 2)
+
+    def test_csv_import_reports_row_errors(self):
+        stream = io.StringIO(
+            "name,age,gender,symptoms,condition\n"
+            "Ann,40,F,fever;stroke,\n"
+            "Bob,,M,cough,\n"
+            "Cid,50,M,cough,critical\n"
+        )
+        result = import_patients(stream, 'csv')
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['errors'], [{'row': 2, 'error': 'All fields are required'}])
+        statuses = sorted(p.status for p in patients.values())
+        self.assertEqual(statuses, ['inpatient', 'inpatient'])
+
+    def test_csv_parse_error_is_reported_per_row(self):
+        stream = io.StringIO(
+            "name,age,gender,symptoms\n"
+            "Ann,40,F,cough\n"
+            'Bob,50,M,"' + "x" * 200000 + '"\n'
+            "Cid,50,M,cough\n"
+        )
+        result = import_patients(stream, 'csv')
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(result['errors'][0]['row'], 2)
+        self.assertIn('Invalid CSV', result['errors'][0]['error'])
+        self.assertEqual(sorted(p.name for p in patients.values()), ['Ann', 'Cid'])
+
+    def test_failed_row_leaves_no_patient_behind(self):
+        stream = io.StringIO(json.dumps({"name": "Ann", "age": 40, "gender": "F", "symptoms": ["cough"]}) + "\n")
+        with mock.patch('utilities.assign_doctor_to_patient', side_effect=RuntimeError("matcher down")):
+            result = import_patients(stream, 'ndjson')
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(len(patients), 0)
+        self.assertEqual(self.general.patients, [])
+
+    def test_invalid_json_line(self):
+        result = import_patients(io.StringIO('{"name": \n'), 'ndjson')
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(result['errors'][0]['row'], 1)
+        self.assertEqual(self.backend.writes, [])
+
+    def test_parse_row(self):
+        self.assertEqual(parse_row({"name": " A ", "age": 3, "gender": "M", "symptoms": "x; y", "condition": "Critical"}),
+                         ("A", 3, "M", ["x", " y"], "critical"))
+        with self.assertRaises(ValueError):
+            parse_row(["not", "an", "object"])
+
+class TestSqliteBulkImport(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('sqlite', db_path='test_hospital.db')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_chunk_is_balanced_across_doctors(self):
+        cardiologists = [Doctor(f"Dr. Heart {i}", "Cardiology") for i in range(3)]
+        for doc in cardiologists:
+            doctors[doc.id] = doc
+            save_doctor_to_json(doc)
+        # Assignments within a chunk are not in the database yet when the next row is routed
+        rows = [{"name": f"P{i}", "age": 40, "gender": "F", "symptoms": ["chest pain"]} for i in range(9)]
+        stream = io.StringIO("\n".join(json.dumps(r) for r in rows) + "\n")
+        result = import_patients(stream, 'ndjson', chunk_size=100)
+        self.assertEqual(result['imported'], 9)
+        self.assertEqual([len(doc.patients) for doc in cardiologists], [3, 3, 3])
+        patients.clear()
+        doctors.clear()
+        stored = [get_repository().get_doctor(doc.id) for doc in cardiologists]
+        self.assertEqual([len(doc.patients) for doc in stored], [3, 3, 3])
+
+class TestBulkImportEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = test_support.web_client()
+        patients.clear()
+        doctors.clear()
+        self.backend = configure_storage('recording')
+        self.cardio = Doctor("Dr. Heart", "Cardiology")
+        doctors[self.cardio.id] = self.cardio
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_ndjson_upload(self):
+        body = "\n".join(json.dumps({"name": f"P{i}", "age": 40, "gender": "F", "symptoms": ["chest pain"]})
+                         for i in range(3)) + "\n"
+        response = self.client.post('/api/patients/bulk?chunk_size=2', data=body,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['data']['imported'], 3)
+        self.assertEqual([len(ids) for path, ids in self.backend.writes if path == 'patients.json'], [2, 1])
+        self.assertEqual(len(self.cardio.patients), 3)
+
+    def test_csv_file_upload_and_unknown_format(self):
+        upload = (io.BytesIO(b"name,age,gender,symptoms\nAnn,40,F,cough\n"), 'ward.csv')
+        response = self.client.post('/api/patients/bulk', data={'file': upload},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['data']['imported'], 1)
+        response = self.client.post('/api/patients/bulk?format=xml', data="<p/>")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('csv', response.get_json()['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -60,6 +60,7 @@ class TestDoctor(unittest.TestCase):
         self.assertEqual(dct['specialization'], self.doctor.specialization)
         self.assertEqual(dct['patients'], self.doctor.patients)
         self.assertEqual(dct['notes'], self.doctor.notes)
+        self.assertFalse(dct['on_leave'])
 
     def test_save_doctor_to_json(self):
         save_doctor_to_json(self.doctor)
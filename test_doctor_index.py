@@ -0,0 +1,59 @@
+import unittest
+from data_storage import patients, doctors
+from doctor_index import doctor_index
+from doctor import Doctor
+from patient import Patient
+
+class TestDoctorIndex(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+        self.a = Doctor("Dr. A", "Cardiology")
+        self.b = Doctor("Dr. B", "cardiology")
+        self.c = Doctor("Dr. C", "Neurology")
+        for doc in (self.a, self.b, self.c):
+            doctors[doc.id] = doc
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def test_lookup_by_name_and_specialization(self):
+        self.assertIs(doctor_index.find_by_name("Dr. C"), self.c)
+        self.assertIsNone(doctor_index.find_by_name("Dr. Nobody"))
+        self.assertEqual(doctor_index.with_specialization("CARDIOLOGY"), [self.a, self.b])
+        self.assertEqual(doctor_index.with_specialization("Oncology"), [])
+
+    def test_leave_updates_available_doctors(self):
+        self.a.on_leave = True
+        self.assertEqual(doctor_index.with_specialization("Cardiology", include_on_leave=False), [self.b])
+        self.assertEqual(doctor_index.with_specialization("Cardiology"), [self.a, self.b])
+        self.a.on_leave = False
+        self.assertEqual(len(doctor_index.with_specialization("Cardiology", include_on_leave=False)), 2)
+
+    def test_removal_and_reload(self):
+        del doctors[self.a.id]
+        self.assertIsNone(doctor_index.find_by_name("Dr. A"))
+        loaded = Doctor.from_dict(self.a.to_dict())
+        doctors[loaded.id] = loaded
+        self.assertIs(doctor_index.find_by_name("Dr. A"), loaded)
+        doctors.clear()
+        self.assertEqual(doctor_index.with_specialization("Cardiology"), [])
+
+    def test_patient_doctor_reference(self):
+        pat = Patient("P", 30, "Male", ["chest pain"])
+        self.a.assign_patient(pat)
+        self.assertEqual(pat.assigned_doctor_id, self.a.id)
+        self.assertIs(doctor_index.for_patient(pat), self.a)
+        self.b.assign_patient(pat)
+        self.assertEqual(pat.assigned_doctor_id, self.b.id)
+        # Records saved before the id reference existed resolve by name
+        data = pat.to_dict()
+        del data['assigned_doctor_id']
+        legacy = Patient.from_dict(data)
+        self.assertIsNone(legacy.assigned_doctor_id)
+        self.assertIs(doctor_index.for_patient(legacy), self.b)
+        self.assertEqual(legacy.assigned_doctor_id, self.b.id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import gzip
+import json
+from data_storage import configure_storage, save_patient_to_json, save_doctor_to_json, patients, doctors
+from repository import get_repository
+from patient import Patient
+from doctor import Doctor
+from export import iter_export, gzip_chunks
+from test_support import TempDirTestCase
+
+class ExportTestMixin:
+    def _register(self, count=5):
+        repo = get_repository()
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        repo.add_doctor(self.doctor)
+        for i in range(count):
+            patient = Patient(f"P{i}", 20 + i, "Female", ["cough"])
+            patient.id = f"PAT-{i:05d}"
+            repo.add_patient(patient)
+            self.doctor.assign_patient(patient)
+            save_patient_to_json(patient)
+        save_doctor_to_json(self.doctor)
+        return repo
+
+    def test_ndjson_export_and_resume(self):
+        self._register()
+        lines = "".join(iter_export('patients', 'ndjson', batch_size=2)).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['id'] for r in records], [f"PAT-{i:05d}" for i in range(5)])
+        self.assertEqual(records[0]['assigned_doctor'], "Dr. Heart")
+        resumed = "".join(iter_export('patients', 'ndjson', cursor="PAT-00002")).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in resumed], ["PAT-00003", "PAT-00004"])
+
+    def test_json_export_matches_listing(self):
+        self._register()
+        document = json.loads("".join(iter_export('doctors', 'json')))
+        self.assertEqual(document, {'success': True, 'data': {self.doctor.id: self.doctor.to_dict()}})
+        empty = json.loads("".join(iter_export('patients', 'json', cursor="PAT-99999")))
+        self.assertEqual(empty['data'], {})
+
+    def test_gzip(self):
+        self._register()
+        plain = "".join(iter_export('patients', 'ndjson'))
+        compressed = b"".join(gzip_chunks(iter_export('patients', 'ndjson', batch_size=1)))
+        self.assertEqual(gzip.decompress(compressed).decode('utf-8'), plain)
+
+    def test_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            list(iter_export('nurses'))
+
+class TestJsonExport(ExportTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+class TestSqliteExport(ExportTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('sqlite', db_path='test_hospital.db')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_export_does_not_hydrate(self):
+        self._register()
+        patients.clear()
+        doctors.clear()
+        lines = "".join(iter_export('patients', 'ndjson', batch_size=2)).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(len(patients), 0)
+
+if __name__ == '__main__':
+    unittest.main()
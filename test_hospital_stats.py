@@ -0,0 +1,82 @@
+import unittest
+from data_storage import patients, doctors
+from hospital_stats import stats
+from patient import Patient
+from doctor import Doctor
+
+class TestHospitalStats(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+        stats.verify_on_read = True
+
+    def tearDown(self):
+        stats.verify_on_read = False
+        patients.clear()
+        doctors.clear()
+
+    def assertInSync(self):
+        self.assertEqual(stats.verify(), [])
+
+    def test_lifecycle_updates_aggregates(self):
+        doc = Doctor("Dr. Heart", "Cardiology")
+        doctors[doc.id] = doc
+        pat = Patient("John", 55, "Male", ["chest pain"])
+        patients[pat.id] = pat
+        self.assertEqual(stats.status_counts, {"registered": 1})
+        doc.assign_patient(pat)
+        pat.admit()
+        self.assertEqual(stats.doctor_load, {"Dr. Heart": 1})
+        pat.add_history("ECG", cost=500)
+        pat.update_bill(100)
+        self.assertEqual(stats.revenue, 600)
+        self.assertInSync()
+        doc.discharge_patient(pat, 1200)
+        self.assertInSync()
+        self.assertEqual(stats.doctor_load, {})
+        self.assertEqual(stats.snapshot(), {
+            'total_patients': 1, 'inpatients': 0, 'outpatients': 0, 'discharged': 1,
+            'total_revenue': 1200, 'total_doctors': 1,
+        })
+
+    def test_outpatient_and_reassignment(self):
+        pat = Patient("Jane", 40, "Female", ["cough"])
+        patients[pat.id] = pat
+        pat.assigned_doctor = "Dr. A"
+        pat.set_outpatient("Rest")
+        self.assertInSync()
+        pat.assigned_doctor = "Dr. B"
+        self.assertEqual(stats.doctor_load, {"Dr. B": 1})
+        self.assertEqual(stats.snapshot()['outpatients'], 1)
+
+    def test_loaded_replaced_and_removed_records(self):
+        data = Patient("Old", 70, "Male", ["stroke"]).to_dict()
+        data.update(status="inpatient", bill_amount=300.0, assigned_doctor="Dr. C")
+        loaded = Patient.from_dict(data)
+        patients[loaded.id] = loaded
+        self.assertEqual(stats.revenue, 300)
+        patients[loaded.id] = Patient.from_dict(dict(data, status="discharged"))
+        self.assertEqual(stats.status_counts, {"discharged": 1})
+        self.assertInSync()
+        del patients[loaded.id]
+        self.assertEqual(stats.snapshot()['total_patients'], 0)
+        self.assertInSync()
+
+    def test_unregistered_patients_are_ignored(self):
+        pat = Patient("Ghost", 30, "Male", ["fever"])
+        pat.admit()
+        pat.add_history("x", cost=50)
+        self.assertEqual(stats.status_counts, {})
+        self.assertEqual(stats.revenue, 0)
+
+    def test_verify_detects_drift(self):
+        pat = Patient("Drift", 30, "Male", ["fever"])
+        patients[pat.id] = pat
+        stats.revenue += 10
+        with self.assertRaises(AssertionError):
+            stats.snapshot()
+        stats.rebuild()
+        self.assertInSync()
+
+if __name__ == '__main__':
+    unittest.main()
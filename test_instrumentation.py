@@ -0,0 +1,119 @@
+import unittest
+import io
+import os
+import logging
+import instrumentation
+from instrumentation import Registry, configure_logging, get_logger
+from data_storage import configure_storage, save_many_to_json, patients, doctors
+from repository import get_repository
+from utilities import assign_doctor_to_patient
+from patient import Patient
+from doctor import Doctor
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_render(self):
+        counter = self.registry.counter('test_events_total', "Events seen.", ('kind',))
+        counter.inc(kind='a')
+        counter.inc(2, kind='b "quoted"')
+        self.assertEqual(counter.value(kind='a'), 1)
+        self.assertEqual(self.registry.render(), (
+            '# HELP test_events_total Events seen.\n'
+            '# TYPE test_events_total counter\n'
+            'test_events_total{kind="a"} 1\n'
+            'test_events_total{kind="b \\"quoted\\""} 2\n'
+        ))
+        with self.assertRaises(ValueError):
+            counter.inc(other='x')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram('test_seconds', "Durations.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value)
+        lines = self.registry.render().splitlines()
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum 4.05', lines)
+        self.assertIn('test_seconds_count 4', lines)
+
+    def test_timer_and_collectors(self):
+        histogram = self.registry.histogram('test_timed_seconds', "Timed blocks.", ('step',))
+        with histogram.time(step='one'):
+            pass
+        self.assertEqual(histogram.count(step='one'), 1)
+        self.registry.add_collector(lambda: [('test_queue', 'gauge', "Queue depth.", [({}, 7)])])
+        self.assertIn('test_queue 7', self.registry.render().splitlines())
+        self.registry.reset()
+        self.assertEqual(histogram.count(step='one'), 0)
+
+    def test_registering_twice_returns_the_same_metric(self):
+        first = self.registry.counter('test_total', "Total.")
+        self.assertIs(self.registry.counter('test_total', "Total."), first)
+        with self.assertRaises(ValueError):
+            self.registry.histogram('test_total', "Total.")
+
+
+class TestHotPathMetrics(unittest.TestCase):
+    def setUp(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+        instrumentation.registry.reset()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+        for path in ('instrumentation_test.json', 'instrumentation_test_backup.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_saves_and_assignments_are_recorded(self):
+        repo = get_repository()
+        repo.add_doctor(Doctor("Dr. Heart", "Cardiology"))
+        first = Patient("Ann", 40, "Female", ["chest pain"])
+        second = Patient("Bob", 50, "Male", ["sneezing"])
+        self.assertIsNotNone(assign_doctor_to_patient(first, persist=False))
+        self.assertIsNotNone(assign_doctor_to_patient(second, persist=False))
+        self.assertEqual(instrumentation.ASSIGNMENTS.value(result='specialist'), 1)
+        self.assertEqual(instrumentation.ASSIGNMENTS.value(result='fallback'), 1)
+        self.assertEqual(instrumentation.ASSIGNMENT_SECONDS.count(), 2)
+        self.assertGreaterEqual(instrumentation.SYMPTOM_MATCH_SECONDS.count(), 2)
+
+        save_many_to_json('instrumentation_test.json', [first, second])
+        labels = {'file': 'instrumentation_test.json', 'backend': 'json'}
+        self.assertEqual(instrumentation.STORAGE_SAVED_RECORDS.value(**labels), 2)
+        self.assertEqual(instrumentation.STORAGE_SAVE_SECONDS.count(**labels), 1)
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('hospital')
+        self.saved = (self.logger.level, list(self.logger.handlers), self.logger.propagate)
+        self.logger.handlers = []
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        self.logger.level, self.logger.handlers, self.logger.propagate = self.saved
+        os.environ.pop('HOSPITAL_LOG_LEVEL', None)
+
+    def test_level_comes_from_the_environment(self):
+        os.environ['HOSPITAL_LOG_LEVEL'] = 'debug'
+        configure_logging('WARNING', stream=self.stream)
+        get_logger('storage').debug("Saved to %s", 'patients.json')
+        self.assertIn('[DEBUG] hospital.storage: Saved to patients.json', self.stream.getvalue())
+
+    def test_disabled_levels_are_dropped(self):
+        configure_logging('WARNING', stream=self.stream)
+        get_logger('storage').info("hidden")
+        get_logger('storage').warning("shown")
+        self.assertEqual(self.stream.getvalue().count('\n'), 1)
+        os.environ['HOSPITAL_LOG_LEVEL'] = 'LOUD'
+        with self.assertRaises(ValueError):
+            configure_logging()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import json
+import data_storage
+from data_storage import configure_storage, save_patient_to_json, save_doctor_to_json, patients, doctors
+from journal_storage import RecordJournal
+from patient import Patient
+from doctor import Doctor
+from main import load_patients, load_doctors
+from test_support import TempDirTestCase
+
+class TestJournalStorage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = configure_storage('journal', compact_threshold=5)
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_save_appends_instead_of_rewriting(self):
+        pat = Patient("Alice", 30, "Female", ["cough"])
+        save_patient_to_json(pat)
+        self.assertFalse(os.path.exists("patients.json"))
+        with open("patients.journal", "rb") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(RecordJournal.decode(lines[0])[0], pat.id)
+
+    def test_load_patients_replays_journal(self):
+        pat = Patient("Bob", 40, "Male", ["chest pain"])
+        save_patient_to_json(pat)
+        pat.admit()
+        pat.add_history("ECG", cost=300)
+        save_patient_to_json(pat)
+        doc = Doctor("Dr. Who", "Cardiology")
+        save_doctor_to_json(doc)
+
+        load_patients()
+        load_doctors()
+        self.assertEqual(patients[pat.id].status, "inpatient")
+        self.assertEqual(patients[pat.id].bill_amount, 300)
+        self.assertIn(doc.id, doctors)
+
+    def test_compaction_writes_snapshot(self):
+        saved = [Patient(f"P{i}", 20 + i, "Female", ["fever"]) for i in range(5)]
+        for pat in saved:
+            save_patient_to_json(pat)
+        with open("patients.json", "r") as f:
+            data = json.load(f)
+        self.assertEqual(set(data), {p.id for p in saved})
+        self.assertEqual(os.path.getsize("patients.journal"), 0)
+        self.assertEqual(self.backend.journal_for("patients.json").entries, 0)
+
+    def test_recovery_drops_torn_tail(self):
+        pat = Patient("Carol", 50, "Female", ["stroke"])
+        save_patient_to_json(pat)
+        data_storage.flush_storage()
+        with open("patients.journal", "ab") as f:
+            f.write(b'deadbeef {"id": "PAT-torn", "rec')
+        data = configure_storage('journal').load("patients.json")
+        self.assertEqual(list(data), [pat.id])
+        with open("patients.journal", "rb") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_corrupt_line_is_rejected(self):
+        line = RecordJournal.encode("PAT-1", {"name": "X"})
+        with self.assertRaises(ValueError):
+            RecordJournal.decode(line.replace(b'"X"', b'"Y"'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import json
+from data_storage import configure_storage, patients, doctors
+from repository import get_repository
+from json_cache import SerializedCache, envelope, ENTRY_OVERHEAD
+from journal_storage import RecordJournal
+from write_behind import RecordSnapshot
+from patient import Patient
+from doctor import Doctor
+
+
+class TestSerializedCache(unittest.TestCase):
+    def setUp(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+        self.cache = SerializedCache(budget_bytes=1024 * 1024)
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        self.patient = Patient("Ann", 40, "Female", ["chest pain"])
+        repo = get_repository()
+        repo.add_doctor(self.doctor)
+        repo.add_patient(self.patient)
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def test_fragment_matches_to_dict_and_is_reused(self):
+        first = self.cache.fragment(self.patient)
+        self.assertEqual(json.loads(first), self.patient.to_dict())
+        self.assertIs(self.cache.fragment(self.patient), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_mutations_invalidate(self):
+        self.cache.fragment(self.patient)
+        self.cache.fragment(self.doctor)
+        self.patient.admit()
+        self.doctor.log_condition(self.patient.id, "Stable")
+        self.assertEqual(json.loads(self.cache.fragment(self.patient))['status'], 'inpatient')
+        self.assertIn(self.patient.id, json.loads(self.cache.fragment(self.doctor))['notes'])
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_removed_records_are_dropped(self):
+        self.cache.on_event('patient.removed', self.patient, {})
+        self.cache.fragment(self.patient)
+        self.cache.fragment(self.doctor)
+        self.cache.on_event('patient.removed', self.patient, {})
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.cache.on_event('doctor.cleared', doctors, {})
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_budget_evicts_least_recently_used(self):
+        others = [Patient(f"P{i}", 30, "Male", ["cough"]) for i in range(3)]
+        size = len(self.cache.fragment(others[0])) + ENTRY_OVERHEAD
+        self.cache = SerializedCache(budget_bytes=2 * size + 10)
+        self.cache.fragment(others[0])
+        self.cache.fragment(others[1])
+        self.cache.fragment(others[0])
+        self.cache.fragment(others[2])
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 1))
+        self.assertLessEqual(stats['bytes'], stats['budget_bytes'])
+        self.cache.fragment(others[0])
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_spliced_documents_decode(self):
+        other = Patient("Bob", 50, "Male", ["cough"])
+        body = envelope(self.cache.join_object([self.patient, other]), count=2, next_cursor=None)
+        self.assertEqual(json.loads(body), {
+            'success': True,
+            'data': {self.patient.id: self.patient.to_dict(), other.id: other.to_dict()},
+            'count': 2,
+            'next_cursor': None,
+        })
+        self.assertEqual(json.loads(self.cache.join_array([])), [])
+
+    def test_snapshots_and_journal_lines_splice_fragments(self):
+        snapshot = RecordSnapshot(self.patient.id, self.cache.fragment(self.patient))
+        self.assertIs(self.cache.fragment(snapshot), snapshot.fragment)
+        self.assertEqual(snapshot.to_dict(), self.patient.to_dict())
+        line = RecordJournal.encode_fragment(self.patient.id, snapshot.fragment)
+        self.assertEqual(line, RecordJournal.encode(self.patient.id, self.patient.to_dict()))
+        self.assertEqual(RecordJournal.decode(line), (self.patient.id, self.patient.to_dict()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import json
+from data_storage import configure_storage, save_patient_to_json, save_doctor_to_json, load_summaries, patients, doctors
+from main import load_patients, load_doctors
+from patient import Patient
+from doctor import Doctor
+from test_support import TempDirTestCase
+
+class TestLazyLoading(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = configure_storage('json', lazy=True)
+        patients.clear()
+        doctors.clear()
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        doctors[self.doctor.id] = self.doctor
+        self.created = []
+        for i in range(3):
+            patient = Patient(f"P{i}", 30 + i, "Male", ["chest pain"])
+            patients[patient.id] = patient
+            self.doctor.assign_patient(patient)
+            patient.add_history(f"ECG {i}", cost=100 * i)
+            self.doctor.log_condition(patient.id, "stable", "ECG", 100 * i)
+            save_patient_to_json(patient)
+            self.created.append(patient)
+        save_doctor_to_json(self.doctor)
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _reload(self):
+        patients.clear()
+        doctors.clear()
+        load_doctors()
+        load_patients()
+
+    def test_history_and_notes_load_on_first_access(self):
+        self.assertTrue(os.path.exists('patients.json.idx'))
+        self._reload()
+        first = patients[self.created[1].id]
+        self.assertIsNone(first._history)
+        self.assertEqual(first.status, self.created[1].status)
+        self.assertEqual([e['notes'] for e in first.history], ["ECG 1"])
+        doctor = doctors[self.doctor.id]
+        self.assertIsNone(doctor._notes)
+        self.assertEqual(doctor.notes[first.id][0]['cost'], 100)
+        self.assertEqual(doctor.to_dict(), self.doctor.to_dict())
+
+    def test_saves_keep_offsets_current(self):
+        self._reload()
+        changed = patients[self.created[0].id]
+        changed.add_history("MRI", cost=2000)
+        save_patient_to_json(changed)
+        untouched = patients[self.created[2].id]
+        self.assertIsNone(untouched._history)
+        self.assertEqual([e['notes'] for e in untouched.history], ["ECG 2"])
+        self._reload()
+        self.assertEqual([e['notes'] for e in patients[changed.id].history], ["ECG 0", "MRI"])
+
+    def test_stale_or_missing_index_falls_back_to_full_load(self):
+        os.remove('patients.json.idx')
+        data = load_summaries('patients.json')
+        self.assertIn('history', data[self.created[0].id])
+        # The canonical file was indexed, so the next load is lazy again
+        self.assertNotIn('history', load_summaries('patients.json')[self.created[0].id])
+        with open('patients.json', 'w') as f:
+            json.dump(data, f, indent=2)
+        self.assertIn('history', load_summaries('patients.json')[self.created[0].id])
+
+if __name__ == '__main__':
+    unittest.main()
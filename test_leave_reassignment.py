@@ -0,0 +1,133 @@
+import unittest
+import os
+from unittest import mock
+from data_storage import configure_storage, save_many_to_json, patients, doctors
+from repository import get_repository
+from leave_reassignment import plan_leave, reassign_on_leave
+from patient import Patient
+from doctor import Doctor
+from main import load_doctors
+import test_support
+from test_support import TempDirTestCase
+
+
+class TestLeaveReassignment(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+        self.backend = configure_storage('recording')
+        self.repo = get_repository()
+        self.leaving = self._doctor("Dr. Heart", "Cardiology", 4)
+        self.busy = self._doctor("Dr. Busy", "Cardiology", 1)
+        self.idle = self._doctor("Dr. Idle", "cardiology", 0)
+        self.neuro = self._doctor("Dr. Brain", "Neurology", 0)
+        self.backend.writes.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _doctor(self, name, specialization, patient_count):
+        doctor = Doctor(name, specialization)
+        self.repo.add_doctor(doctor)
+        for i in range(patient_count):
+            patient = Patient(f"{name} patient {i}", 40, "Female", ["chest pain"])
+            self.repo.add_patient(patient)
+            doctor.assign_patient(patient)
+        return doctor
+
+    def test_dry_run_plans_balanced_moves_without_changes(self):
+        ward = list(self.leaving.patients)
+        plan = reassign_on_leave(self.leaving, dry_run=True)
+        self.assertFalse(plan['applied'])
+        self.assertEqual(plan['pool'], 'specialization')
+        # Least loaded first, ties to the doctor registered first
+        self.assertEqual([move['to_doctor_id'] for move in plan['moves']],
+                         [self.idle.id, self.busy.id, self.idle.id, self.busy.id])
+        self.assertEqual(plan['loads'], {self.busy.id: 3, self.idle.id: 2})
+        self.assertFalse(self.leaving.on_leave)
+        self.assertEqual(self.leaving.patients, ward)
+        self.assertEqual(self.backend.writes, [])
+
+    def test_apply_moves_everyone_with_one_write_per_file(self):
+        ward = list(self.leaving.patients)
+        result = reassign_on_leave(self.leaving)
+        self.assertTrue(result['applied'])
+        self.assertEqual(result['reassigned'], 4)
+        self.assertTrue(self.leaving.on_leave)
+        self.assertEqual(self.leaving.patients, [])
+        self.assertEqual((len(self.busy.patients), len(self.idle.patients)), (3, 2))
+        for pid in ward:
+            self.assertIn(self.repo.get_patient(pid).assigned_doctor_id, (self.busy.id, self.idle.id))
+        self.assertEqual([(path, sorted(ids)) for path, ids in self.backend.writes], [
+            ('patients.json', sorted(ward)),
+            ('doctors.json', sorted([self.leaving.id, self.busy.id, self.idle.id])),
+        ])
+
+    def test_plan_reads_the_doctor_index(self):
+        with mock.patch.object(type(doctors), 'values', side_effect=AssertionError("registry scanned")):
+            plan = plan_leave(self.leaving)
+        self.assertEqual(len(plan['moves']), 4)
+        # A doctor back from leave keeps the balancer's tie-break order
+        self.busy.on_leave = True
+        self.busy.on_leave = False
+        self.assertEqual(self.repo.doctor_loads("cardiology", exclude=(self.leaving.id,)),
+                         [(self.busy.id, 1), (self.idle.id, 0)])
+        self.assertEqual([doctor_id for doctor_id, _ in self.repo.doctor_loads()],
+                         [self.leaving.id, self.busy.id, self.idle.id, self.neuro.id])
+
+    def test_falls_back_to_any_doctor_then_leaves_patients_unassigned(self):
+        self.busy.on_leave = True
+        self.idle.on_leave = True
+        plan = plan_leave(self.leaving)
+        self.assertEqual(plan['pool'], 'any')
+        self.assertEqual({move['to_doctor_id'] for move in plan['moves']}, {self.neuro.id})
+        self.neuro.on_leave = True
+        result = reassign_on_leave(self.leaving)
+        self.assertIsNone(result['pool'])
+        self.assertEqual(result['unassigned'], self.leaving.patients)
+        self.assertEqual(len(self.leaving.patients), 4)
+
+class TestLeaveEndpoint(TempDirTestCase):
+    def setUp(self):
+        self.client = test_support.web_client()
+        super().setUp()
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_leave_survives_a_restart(self):
+        for backend in ('json', 'journal', 'snapshot'):
+            with self.subTest(backend=backend):
+                os.mkdir(os.path.join(self.tmpdir, backend))
+                os.chdir(os.path.join(self.tmpdir, backend))
+                configure_storage(backend)
+                patients.clear()
+                doctors.clear()
+                repo = get_repository()
+                leaving, other = Doctor("Dr. Away", "Cardiology"), Doctor("Dr. Here", "Cardiology")
+                for doctor in (leaving, other):
+                    repo.add_doctor(doctor)
+                patient = Patient("Ann", 40, "Female", ["chest pain"])
+                repo.add_patient(patient)
+                leaving.assign_patient(patient)
+                save_many_to_json('doctors.json', [leaving, other])
+
+                response = self.client.post(f'/api/doctors/{leaving.id}/leave', json={})
+                self.assertEqual(response.status_code, 200, response.get_json())
+                configure_storage(backend)
+                doctors.clear()
+                load_doctors()
+                self.assertTrue(doctors[leaving.id].on_leave)
+                self.assertFalse(doctors[other.id].on_leave)
+                self.assertEqual(doctors[other.id].patients, [patient.id])
+                # The balancer no longer routes new patients to the absent doctor
+                self.assertIs(get_repository().least_loaded_doctor("Cardiology"), doctors[other.id])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import sqlite3
+import ledger as ledger_module
+from data_storage import configure_storage, save_patient_to_json, save_doctor_to_json, patients, doctors
+from repository import get_repository
+from ledger import ledger
+from patient import Patient
+from doctor import Doctor
+from sqlite_storage import SqliteStore, SCHEMA
+from test_support import TempDirTestCase
+
+class LedgerTestMixin:
+    def _register(self):
+        repo = get_repository()
+        self.cardio = Doctor("Dr. Heart", "Cardiology")
+        self.neuro = Doctor("Dr. Brain", "Neurology")
+        for doc in (self.cardio, self.neuro):
+            repo.add_doctor(doc)
+            save_doctor_to_json(doc)
+        self.ann = Patient("Ann", 50, "Female", ["chest pain"])
+        self.bob = Patient("Bob", 60, "Male", ["stroke"])
+        for patient, doctor, charges in ((self.ann, self.cardio, (("2025-07-01", 100), ("2025-07-02", 50))),
+                                         (self.bob, self.neuro, (("2025-07-02", 300),))):
+            repo.add_patient(patient)
+            doctor.assign_patient(patient)
+            for day, cost in charges:
+                patient.add_history("treatment", cost=cost)
+                patient.history[-1].date = day
+            save_patient_to_json(patient)
+        return repo
+
+    def test_revenue_report(self):
+        report = self._register().revenue_report()
+        self.assertEqual(report['charges'], 3)
+        self.assertEqual(report['total'], 450)
+        self.assertEqual(report['by_day'], {"2025-07-01": 100, "2025-07-02": 350})
+        self.assertEqual(report['by_doctor'], {self.cardio.id: 150, self.neuro.id: 300})
+        self.assertEqual(report['by_specialization'], {"Cardiology": 150, "Neurology": 300})
+
+    def test_charges_stay_with_the_doctor_at_charge_time(self):
+        repo = self._register()
+        repo.revenue_report()
+        self.cardio.release_patient(self.ann.id)
+        self.neuro.assign_patient(self.ann)
+        self.ann.add_history("MRI", cost=25)
+        save_patient_to_json(self.ann)
+        for doc in (self.cardio, self.neuro):
+            save_doctor_to_json(doc)
+        report = repo.revenue_report()
+        self.assertEqual(report['by_doctor'], {self.cardio.id: 150, self.neuro.id: 325})
+        self.assertEqual(report['by_specialization'], {"Cardiology": 150, "Neurology": 325})
+
+class TestLedger(LedgerTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def test_running_totals(self):
+        self._register()
+        self.assertEqual(ledger.patient_total(self.ann), 150)
+        self.ann.add_history("MRI", cost=25)
+        self.assertEqual(ledger.patient_total(self.ann), 175)
+        stray = Patient("Cid", 30, "Male", ["cough"])
+        stray.add_history("x", cost=5)
+        self.assertEqual(ledger.patient_total(stray), 5)
+        self.ann.admit()
+        self.ann.discharge()
+        self.assertEqual(self.ann.bill_amount, 175)
+
+    def test_columns_follow_events(self):
+        self._register()
+        self.assertEqual(ledger.total(), 450)
+        self.bob.add_history("CT", cost=50)
+        self.assertEqual(ledger.revenue_by_doctor()[self.neuro.id], 350)
+        del patients[self.bob.id]
+        self.assertEqual(ledger.revenue_by_specialization(), {"Cardiology": 150})
+        self.assertEqual(len(ledger.amounts), 2)
+
+    def test_numpy_sums_match_python(self):
+        if ledger_module.numpy is None:
+            self.skipTest("NumPy is not installed")
+        self._register()
+        self.bob.add_history("CT", cost=0.1)
+        self.bob.add_history("CT", cost=0.2)
+        vectorized = ledger.report()
+        self.assertEqual(vectorized.pop('engine'), 'numpy')
+        keyed = ledger._sums(ledger.days), ledger._sums(ledger.doctor_codes, len(ledger._doctor_ids))
+        saved, ledger_module.numpy = ledger_module.numpy, None
+        try:
+            fallback = ledger.report()
+            expected = ledger._sums(ledger.days), ledger._sums(ledger.doctor_codes, len(ledger._doctor_ids))
+        finally:
+            ledger_module.numpy = saved
+        self.assertEqual(fallback.pop('engine'), 'python')
+        self.assertEqual(vectorized.keys(), fallback.keys())
+        for key in ('charges', 'total'):
+            self.assertAlmostEqual(vectorized[key], fallback[key])
+        for key in ('by_day', 'by_doctor', 'by_specialization'):
+            self.assertEqual(vectorized[key].keys(), fallback[key].keys())
+            for group, amount in fallback[key].items():
+                self.assertAlmostEqual(vectorized[key][group], amount)
+        for sums, python_sums in zip(keyed, expected):
+            self.assertEqual(sums.keys(), python_sums.keys())
+            self.assertTrue(all(type(code) is int for code in sums))
+
+    def test_python_fallback_matches(self):
+        self._register()
+        expected = ledger.report()
+        saved, ledger_module.numpy = ledger_module.numpy, None
+        try:
+            fallback = ledger.report()
+        finally:
+            ledger_module.numpy = saved
+        expected.pop('engine')
+        fallback.pop('engine')
+        self.assertEqual(fallback, expected)
+
+class TestSqliteLedger(LedgerTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('sqlite', db_path='test_hospital.db')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_stored_charges_are_credited_on_upgrade(self):
+        conn = sqlite3.connect('old.db')
+        conn.executescript(SCHEMA.replace("    doctor_id TEXT,\n", ""))
+        conn.execute("INSERT INTO patients (id, name, assigned_doctor_id) VALUES ('PAT-1', 'Ann', 'DOC-1')")
+        conn.execute("INSERT INTO patient_history (patient_id, seq, date, cost) VALUES ('PAT-1', 0, '2025-07-01', 40)")
+        conn.commit()
+        conn.close()
+        self.assertEqual(SqliteStore('old.db').revenue_report()['by_doctor'], {'DOC-1': 40})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import json
+import asyncio
+from data_storage import configure_storage, patients, doctors
+from events import subscribe, unsubscribe
+from repository import get_repository
+from live_updates import LiveUpdates
+from patient import Patient
+from doctor import Doctor
+
+
+def parse(text):
+    """[(event, data, id)] from event-stream text."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data']), fields.get('id')))
+    return events
+
+
+class TestLiveUpdates(unittest.TestCase):
+    def setUp(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+        self.updates = LiveUpdates(size=10)
+        subscribe(self.updates.on_event)
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        get_repository().add_doctor(self.doctor)
+
+    def tearDown(self):
+        unsubscribe(self.updates.on_event)
+        patients.clear()
+        doctors.clear()
+
+    def _register(self, name):
+        patient = Patient(name, 40, "Female", ["chest pain"])
+        get_repository().add_patient(patient)
+        self.doctor.assign_patient(patient)
+        patient.admit()
+        return patient
+
+    def test_batches_patient_summaries_and_statistics(self):
+        stream = self.updates.stream()
+        self.assertTrue(next(stream).startswith("retry:"))
+        ann = self._register("Ann")
+        bob = self._register("Bob")
+        ann.add_history("ECG", cost=100)
+        events = parse(next(stream))
+        self.assertEqual([(event, data.get('id')) for event, data, _ in events],
+                         [('patient', ann.id), ('patient', bob.id), ('stats', None)])
+        self.assertEqual(events[0][1]['status'], 'inpatient')
+        self.assertEqual(events[0][1]['bill_amount'], 100.0)
+        self.assertNotIn('history', events[0][1])
+        self.assertEqual(events[-1][1]['total_patients'], 2)
+        self.assertEqual(int(events[-1][2]), self.updates.seq)
+        del patients[bob.id]
+        events = parse(next(stream))
+        self.assertEqual(events[0][:2], ('removed', {'id': bob.id}))
+        stream.close()
+        self.assertEqual(self.updates.subscribers, 0)
+
+    def test_resume_and_reset(self):
+        stream = self.updates.stream()
+        next(stream)
+        self._register("Ann")
+        cursor = self.updates.seq
+        doctors[self.doctor.id] = Doctor("Dr. Brain", "Neurology")
+        text, _ = self.updates.frames_since(cursor)
+        self.assertEqual([event for event, _, _ in parse(text)], ['stats'])
+        # Further behind than the log holds
+        for i in range(6):
+            self._register(f"P{i}")
+        text, new_cursor = self.updates.frames_since(cursor)
+        self.assertEqual(parse(text), [('reset', {}, str(new_cursor))])
+        # An id from a previous server run
+        text, _ = self.updates.frames_since(self.updates.seq + 5)
+        self.assertEqual(parse(text)[0][0], 'reset')
+        patients.clear()
+        self.assertEqual(parse(self.updates.frames_since(self.updates.seq - 1)[0])[0][0], 'reset')
+        stream.close()
+
+    def test_nothing_logged_without_subscribers(self):
+        self._register("Ann")
+        self.assertGreater(self.updates.seq, 0)
+        self.assertEqual(len(self.updates._log), 0)
+        text, _ = self.updates.frames_since(0)
+        self.assertEqual(parse(text)[0][0], 'reset')
+
+    def test_async_stream_wakes_on_change(self):
+        async def scenario():
+            stream = self.updates.astream()
+            self.assertTrue((await stream.__anext__()).startswith("retry:"))
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.01)
+            self.assertFalse(pending.done())
+            patient = self._register("Ann")
+            text = await asyncio.wait_for(pending, 1)
+            await stream.aclose()
+            return patient, text
+
+        patient, text = asyncio.run(scenario())
+        self.assertEqual(parse(text)[0][1]['id'], patient.id)
+        self.assertEqual(self.updates.subscribers, 0)
+
+if __name__ == '__main__':
+    unittest.main()
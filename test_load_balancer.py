@@ -0,0 +1,93 @@
+import unittest
+import random
+from data_storage import patients, doctors
+from load_balancer import balancer
+from doctor import Doctor
+from patient import Patient
+
+class TestLoadBalancer(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def _doctors(self, *specs):
+        registered = []
+        for i, spec in enumerate(specs):
+            doc = Doctor(f"Dr. {i}", spec)
+            doctors[doc.id] = doc
+            registered.append(doc)
+        return registered
+
+    def _patient(self):
+        pat = Patient("P", 30, "Male", ["fever"])
+        patients[pat.id] = pat
+        return pat
+
+    def test_ties_go_to_first_registered(self):
+        a, b, c = self._doctors("Cardiology", "Cardiology", "Neurology")
+        self.assertIs(balancer.assign(self._patient(), "cardiology"), a)
+        self.assertIs(balancer.assign(self._patient(), "Cardiology"), b)
+        self.assertIs(balancer.assign(self._patient(), "Cardiology"), a)
+        self.assertIs(balancer.least_loaded(), c)
+        self.assertIsNone(balancer.least_loaded("Oncology"))
+
+    def test_skips_doctors_on_leave_and_release(self):
+        a, b = self._doctors("Cardiology", "Cardiology")
+        pat = self._patient()
+        balancer.assign(pat, "Cardiology")
+        b.on_leave = True
+        self.assertIs(balancer.least_loaded("Cardiology"), a)
+        b.on_leave = False
+        self.assertIs(balancer.least_loaded("Cardiology"), b)
+        pat.admit()
+        a.discharge_patient(pat, 100)
+        self.assertIs(balancer.least_loaded("Cardiology"), a)
+
+    def test_doctor_loaded_on_leave_keeps_registration_order(self):
+        a = Doctor.from_dict({'id': "DOC-a", 'name': "Dr. A", 'specialization': "Cardiology", 'on_leave': True})
+        doctors[a.id] = a
+        b, = self._doctors("Cardiology")
+        a.on_leave = False
+        self.assertLess(balancer.registration_order(a), balancer.registration_order(b))
+        self.assertIs(balancer.least_loaded("Cardiology"), a)
+        balancer.rebuild()
+        self.assertIs(balancer.least_loaded("Cardiology"), a)
+
+    def test_reassign_spreads_patients(self):
+        a, b, c = self._doctors("Neurology", "Neurology", "Neurology")
+        moving = [self._patient() for _ in range(4)]
+        for pat in moving:
+            a.assign_patient(pat)
+        a.on_leave = True
+        moves = balancer.reassign(a, moving, "Neurology")
+        self.assertEqual([doc for _, doc in moves], [b, c, b, c])
+        self.assertEqual(a.patients, [])
+        self.assertEqual(moving[0].assigned_doctor_id, b.id)
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        pool = self._doctors(*[rng.choice(["Cardiology", "Neurology"]) for _ in range(12)])
+        active = []
+        for _ in range(500):
+            op = rng.random()
+            if op < 0.6:
+                spec = rng.choice(["Cardiology", "Neurology", None])
+                eligible = [d for d in doctors.values() if not d.on_leave and (spec is None or d.specialization == spec)]
+                expected = min(eligible, key=lambda d: len(d.patients)) if eligible else None
+                pat = self._patient()
+                self.assertIs(balancer.assign(pat, spec), expected)
+                if expected:
+                    active.append((expected, pat))
+            elif op < 0.85 and active:
+                doc, pat = active.pop(rng.randrange(len(active)))
+                doc.release_patient(pat.id)
+            else:
+                doc = rng.choice(pool)
+                doc.on_leave = not doc.on_leave
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from data_storage import configure_storage, save_patient_to_json, patients, doctors
+from repository import get_repository
+from patient import Patient
+from patient_listing import ListingQuery, HistoryQuery, listing_index
+import test_support
+from test_support import TempDirTestCase
+
+class ListingTestMixin:
+    def _register(self, count=7):
+        repo = get_repository()
+        self.created = []
+        for i in range(count):
+            patient = Patient(f"P{i}", 20 + i, "Female", ["cough"])
+            patient.id = f"PAT-{i:05d}"
+            patient.assigned_doctor = "Dr. Heart" if i % 2 else "Dr. Gen"
+            patient.admission = f"2025-07-{10 + i:02d}"
+            if i % 3 == 0:
+                patient.status = 'inpatient'
+            repo.add_patient(patient)
+            save_patient_to_json(patient)
+            self.created.append(patient)
+        return repo
+
+    def _all_pages(self, repo, **args):
+        ids = []
+        cursor = None
+        while True:
+            if cursor:
+                args['cursor'] = cursor
+            page, cursor = repo.list_patients(ListingQuery.from_args(args))
+            ids.extend(p.id for p in page)
+            if cursor is None:
+                return ids
+
+    def test_cursor_pagination(self):
+        repo = self._register()
+        page, cursor = repo.list_patients(ListingQuery.from_args({'limit': '3'}))
+        self.assertEqual([p.id for p in page], ["PAT-00000", "PAT-00001", "PAT-00002"])
+        self.assertEqual(cursor, "PAT-00002")
+        self.assertEqual(self._all_pages(repo, limit='3'), sorted(p.id for p in self.created))
+        _, cursor = repo.list_patients(ListingQuery.from_args({'limit': '7'}))
+        self.assertIsNone(cursor)
+
+    def test_filters(self):
+        repo = self._register()
+        self.assertEqual(self._all_pages(repo, status='inpatient', limit='1'),
+                         ["PAT-00000", "PAT-00003", "PAT-00006"])
+        self.assertEqual(self._all_pages(repo, doctor='Dr. Heart', status='inpatient'), ["PAT-00003"])
+        self.assertEqual(self._all_pages(repo, admitted_from='2025-07-12', admitted_to='2025-07-13'),
+                         ["PAT-00002", "PAT-00003"])
+
+    def test_projection(self):
+        repo = self._register(1)
+        page, _ = repo.list_patients(ListingQuery.from_args({'fields': 'name,status'}))
+        self.assertEqual(page[0].to_dict(ListingQuery.from_args({'fields': 'name,status'}).fields),
+                         {'id': 'PAT-00000', 'name': 'P0', 'status': 'inpatient'})
+
+    def test_invalid_arguments(self):
+        for args in ({'limit': 'x'}, {'limit': '0'}, {'fields': 'name,password'}, {'admitted_from': '07/10/2025'}):
+            with self.assertRaises(ValueError):
+                ListingQuery.from_args(args)
+        self.assertFalse(ListingQuery.requested({}))
+        self.assertTrue(ListingQuery.requested({'status': 'inpatient'}))
+
+class TestJsonListing(ListingTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def test_index_follows_changes(self):
+        repo = self._register()
+        self.created[1].status = 'inpatient'
+        del patients["PAT-00003"]
+        self.assertEqual(self._all_pages(repo, status='inpatient'), ["PAT-00000", "PAT-00001", "PAT-00006"])
+        self.assertEqual(listing_index.sorted_ids(), sorted(patients))
+
+class TestSqliteListing(ListingTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('sqlite', db_path='test_hospital.db')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+class TestHistoryQuery(unittest.TestCase):
+    def setUp(self):
+        self.patient = Patient("Ann", 40, "Female", ["cough"])
+        self.patient.history = [{'date': f"2025-07-{day:02d}", 'notes': f"Day {day}", 'cost': 10}
+                                for day in range(1, 31)]
+
+    def test_pages_a_date_range(self):
+        query = HistoryQuery.from_args({'from': "2025-07-10", 'to': "2025-07-19", 'limit': '4', 'order': 'desc'})
+        entries, cursor, total = query.page(self.patient.history)
+        self.assertEqual(total, 10)
+        self.assertEqual([e['notes'] for e in entries], ["Day 19", "Day 18", "Day 17", "Day 16"])
+        self.assertEqual(entries[0], {'date': "2025-07-19", 'notes': "Day 19", 'cost': 10, 'position': 18})
+        query = HistoryQuery.from_args({'from': "2025-07-10", 'to': "2025-07-19", 'limit': '10',
+                                        'order': 'desc', 'cursor': cursor})
+        entries, cursor, _ = query.page(self.patient.history)
+        self.assertEqual([e['notes'] for e in entries], [f"Day {day}" for day in range(15, 9, -1)])
+        self.assertIsNone(cursor)
+
+    def test_rejects_bad_parameters(self):
+        for args in ({'from': "10/07/2025"}, {'limit': '0'}, {'limit': 'x'}, {'cursor': 'abc'}, {'order': 'up'}):
+            with self.assertRaises(ValueError):
+                HistoryQuery.from_args(args)
+
+class TestListingEndpoint(ListingTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.client = test_support.web_client()
+        configure_storage('recording')
+        patients.clear()
+        doctors.clear()
+        self._register()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_query_is_validated_before_the_etag(self):
+        response = self.client.get('/api/patients?limit=2')
+        self.assertEqual(response.status_code, 200)
+        tag = response.headers['ETag']
+        self.assertEqual(self.client.get('/api/patients?limit=2', headers={'If-None-Match': tag}).status_code, 304)
+        response = self.client.get('/api/patients?limit=abc', headers={'If-None-Match': tag})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], "limit must be an integer")
+        # Another page or projection is another response, with its own tag
+        for other in ('/api/patients?limit=3', '/api/patients?limit=2&fields=name', '/api/patients'):
+            self.assertEqual(self.client.get(other, headers={'If-None-Match': tag}).status_code, 200)
+
+    def test_detail_and_history_tags_follow_the_query(self):
+        patient = self.created[0]
+        for day in range(1, 4):
+            patient.add_history(f"Day {day}", cost=0)
+        base = f'/api/patients/{patient.id}'
+        for first, other in ((base, base + '?fields=name'),
+                             (base + '/history?limit=1', base + '/history?limit=1&order=desc')):
+            tag = self.client.get(first).headers['ETag']
+            self.assertEqual(self.client.get(first, headers={'If-None-Match': tag}).status_code, 304)
+            self.assertEqual(self.client.get(other, headers={'If-None-Match': tag}).status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import time
+import marshal
+import tempfile
+from flask import Flask
+from profiling import ProfileSession, AppProfiler, CliProfile, authorized
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class TestProfileSession(unittest.TestCase):
+    def test_cprofile_merges_per_label(self):
+        session = ProfileSession('cprofile', seconds=None)
+        with session.profile('POST /api/treatment'):
+            busy(0.01)
+        with session.profile('GET /api/patients'):
+            sorted(range(1000))
+        session.stop()
+        self.assertFalse(session.running)
+        self.assertEqual(session.info()['requests'], {'POST /api/treatment': 1, 'GET /api/patients': 1})
+        everything = marshal.loads(session.render('pstats'))
+        only_treatment = marshal.loads(session.render('pstats', route='/api/treatment'))
+        self.assertTrue(any(func[2] == 'busy' for func in only_treatment))
+        self.assertFalse(any(func[2] == 'busy' for func in marshal.loads(session.render(route='GET /api/patients'))))
+        self.assertGreater(len(everything), len(only_treatment) - 1)
+        self.assertIn(b'busy', session.render('text'))
+        with self.assertRaises(ValueError):
+            session.render('collapsed')
+
+    def test_sampling_collects_collapsed_stacks(self):
+        session = ProfileSession('sampling', seconds=None, interval=0.001)
+        with session.profile('GET /api/patients'):
+            busy(0.1)
+        session.stop()
+        lines = session.render().decode().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('GET /api/patients;'))
+        self.assertTrue(any('busy (test_profiling.py' in line for line in lines))
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), session.samples)
+        self.assertEqual(session.render(route='/api/treatment'), b'')
+
+    def test_time_box_and_validation(self):
+        session = ProfileSession('cprofile', seconds=0.05)
+        self.assertTrue(session.wait(2))
+        self.assertIsNotNone(session.stopped_at)
+        with self.assertRaises(ValueError):
+            ProfileSession('tracing')
+
+    def test_cli_profile_writes_on_finish(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cli.pstats')
+        cli = CliProfile('cprofile', path)
+        busy(0.01)
+        cli.finish()
+        cli.finish()
+        with open(path, 'rb') as f:
+            self.assertTrue(any(func[2] == 'busy' for func in marshal.load(f)))
+        os.remove(path)
+
+
+class TestAppProfiler(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+        @self.app.route('/api/patients/<patient_id>')
+        def patient(patient_id):
+            busy(0.005)
+            return patient_id
+
+        @self.app.route('/api/statistics')
+        def statistics():
+            return 'ok'
+
+        self.profiler = AppProfiler(self.app)
+
+    def test_profiles_selected_routes_then_unwraps(self):
+        session = self.profiler.start('cprofile', seconds=5, routes=['/api/patients/<patient_id>'])
+        self.assertIsNotNone(vars(self.app).get('wsgi_app'))
+        with self.assertRaises(RuntimeError):
+            self.profiler.start('cprofile', seconds=5)
+        client = self.app.test_client()
+        self.assertEqual(client.get('/api/patients/P1').data, b'P1')
+        client.get('/api/statistics')
+        client.get('/missing')
+        self.profiler.stop()
+        self.assertEqual(session.info()['requests'], {'GET /api/patients/<patient_id>': 1})
+        deadline = time.time() + 2
+        while 'wsgi_app' in vars(self.app) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertNotIn('wsgi_app', vars(self.app))
+        with self.assertRaises(ValueError):
+            self.profiler.start('cprofile', seconds=3600)
+
+    def test_admin_token(self):
+        os.environ.pop('HOSPITAL_ADMIN_TOKEN', None)
+        self.assertFalse(authorized({'X-Admin-Token': ''}))
+        os.environ['HOSPITAL_ADMIN_TOKEN'] = 'secret'
+        try:
+            self.assertTrue(authorized({'Authorization': 'Bearer secret'}))
+            self.assertTrue(authorized({'X-Admin-Token': 'secret'}))
+            self.assertFalse(authorized({'X-Admin-Token': 'guess'}))
+        finally:
+            del os.environ['HOSPITAL_ADMIN_TOKEN']
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+from datetime import date, timedelta
+from records import HistoryEntry, NoteEntry, HistoryLog, date_to_ordinal, ordinal_to_date
+from patient import Patient
+from doctor import Doctor
+
+class TestCompactRecords(unittest.TestCase):
+    def test_date_ordinals(self):
+        self.assertEqual(ordinal_to_date(date_to_ordinal("2025-07-21")), "2025-07-21")
+        for value in (None, "", "21/07/2025", "2025-W30-1"):
+            self.assertEqual(date_to_ordinal(value), value)
+        self.assertIs(date_to_ordinal("2025-07-21"), date_to_ordinal("".join(["2025-07-", "21"])))
+
+    def test_entries_read_like_dicts(self):
+        entry = HistoryEntry("2025-07-21", "ECG", 500)
+        self.assertEqual(entry['notes'], "ECG")
+        self.assertEqual(entry.get('cost', 0), 500)
+        self.assertIsNone(entry.get('missing'))
+        self.assertEqual(entry, {'date': "2025-07-21", 'notes': "ECG", 'cost': 500})
+        with self.assertRaises(KeyError):
+            entry['note']
+        note = NoteEntry.from_dict({'date': "2025-07-21", 'note': "Stable", 'treatment': "MRI", 'cost': 10})
+        self.assertEqual(note.to_dict(), {'date': "2025-07-21", 'note': "Stable", 'treatment': "MRI", 'cost': 10})
+
+    def test_round_trip_is_compatible(self):
+        record = {
+            "id": "PAT-00001", "name": "Ann", "age": 40, "gender": "Female", "symptoms": ["cough"],
+            "assigned_doctor": "Dr. Gen", "assigned_doctor_id": "DOC-00001", "status": "inpatient",
+            "history": [{"date": "2025-07-21", "notes": "X-ray", "cost": 300.0}],
+            "admission": "2025-07-20", "discharge_date": None, "treatment_total_cost": 300.0, "bill_amount": 300.0,
+        }
+        patient = Patient.from_dict(record)
+        self.assertFalse(hasattr(patient, '__dict__'))
+        self.assertEqual(patient.to_dict(), record)
+        self.assertIs(patient.status, sys.intern("inpatient"))
+        self.assertIsInstance(patient.history[0], HistoryEntry)
+
+    def test_new_patient_defaults(self):
+        patient = Patient("Bob", 30, "Male", [" fever "])
+        self.assertEqual(patient.to_dict()['treatment_total_cost'], 0)
+        patient.add_history("Consulted", cost=50)
+        self.assertEqual(patient.treatment_total_cost, 50)
+        doctor = Doctor("Dr. Gen", "General Medicine")
+        doctor.log_condition(patient.id, "Stable", "Rest", 0)
+        self.assertEqual(doctor.to_dict()['notes'][patient.id][0]['treatment'], "Rest")
+
+class TestEntryLog(unittest.TestCase):
+    def setUp(self):
+        self.first = date(2025, 1, 1)
+        # Three entries a day, across several chunks
+        self.log = HistoryLog([
+            {'date': (self.first + timedelta(days=i // 3)).isoformat(), 'notes': f"visit {i}", 'cost': i}
+            for i in range(1000)])
+
+    def test_reads_like_a_list(self):
+        self.assertEqual(len(self.log), 1000)
+        self.assertEqual(self.log[-1]['notes'], "visit 999")
+        self.assertEqual([e['cost'] for e in self.log[254:258]], [254, 255, 256, 257])
+        self.assertEqual(list(self.log)[300], self.log[300])
+        self.assertEqual(HistoryLog([{'date': "2025-01-01", 'notes': "x", 'cost': 0}]),
+                         [{'date': "2025-01-01", 'notes': "x", 'cost': 0}])
+        with self.assertRaises(IndexError):
+            self.log[1000]
+
+    def test_range_pages_by_binary_search(self):
+        start = (self.first + timedelta(days=100)).toordinal()
+        end = (self.first + timedelta(days=109)).toordinal()
+        positions, following, total = self.log.page(start, end, limit=20)
+        self.assertEqual((positions[0], total, following), (300, 30, 320))
+        positions, following, _ = self.log.page(start, end, cursor=following, limit=20)
+        self.assertEqual((positions, following), (list(range(320, 330)), None))
+        newest, following, _ = self.log.page(start, end, limit=4, descending=True)
+        self.assertEqual((newest, following), ([329, 328, 327, 326], 325))
+        self.assertEqual(self.log.page(start, end, cursor=following, limit=2, descending=True)[0], [325, 324])
+        self.assertEqual(self.log.page(end + 1000, None), ([], None, 0))
+
+    def test_unordered_entries_fall_back_to_a_scan(self):
+        log = HistoryLog([{'date': "2025-03-02", 'notes': "b"}, {'date': "2025-03-01", 'notes': "a"},
+                                      {'date': None, 'notes': "undated"}])
+        self.assertFalse(log.ordered)
+        day = date_to_ordinal("2025-03-01")
+        self.assertEqual(log.page(day, day), ([1], None, 1))
+        self.assertEqual(log.page()[2], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from data_storage import configure_storage, save_patient_to_json, save_doctor_to_json, patients, doctors
+from repository import get_repository, JsonRepository, SqliteRepository
+from patient import Patient
+from doctor import Doctor
+from patient_listing import ListingQuery
+from utilities import assign_doctor_to_patient, mark_doctor_on_leave
+from test_support import TempDirTestCase
+
+class RepositoryTestMixin:
+    def _register(self):
+        repo = get_repository()
+        self.cardio = Doctor("Dr. Heart", "Cardiology")
+        self.neuro = Doctor("Dr. Brain", "Neurology")
+        for doc in (self.cardio, self.neuro):
+            repo.add_doctor(doc)
+            save_doctor_to_json(doc)
+        self.pat = Patient("John", 55, "Male", ["chest pain"])
+        repo.add_patient(self.pat)
+        assign_doctor_to_patient(self.pat)
+        self.pat.admit()
+        self.pat.add_history("ECG", cost=500)
+        save_patient_to_json(self.pat)
+        return repo
+
+    def test_queries(self):
+        repo = self._register()
+        self.assertIs(repo.find_doctor_by_name("Dr. Heart"), self.cardio)
+        self.assertEqual([d.id for d in repo.doctors_by_specialization("cardiology")], [self.cardio.id])
+        self.assertEqual([p.id for p in repo.patients_by_status("inpatient")], [self.pat.id])
+        self.assertEqual([p.id for p in repo.patients_for_doctor("Dr. Heart")], [self.pat.id])
+        self.assertEqual(repo.count_by_status(), {"inpatient": 1})
+        self.assertEqual(repo.patient_count(), 1)
+        self.assertEqual(repo.doctor_count(), 2)
+        self.assertEqual(repo.total_revenue(), 500)
+        self.assertIs(repo.least_loaded_doctor("cardiology"), self.cardio)
+        self.assertIs(repo.least_loaded_doctor(), self.neuro)
+        self.assertIsNone(repo.least_loaded_doctor("Neurology", exclude=(self.neuro.id,)))
+
+class TestJsonRepository(RepositoryTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def test_repository_type(self):
+        self.assertIsInstance(get_repository(), JsonRepository)
+
+class TestSqliteRepository(RepositoryTestMixin, TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = configure_storage('sqlite', db_path='test_hospital.db')
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def test_repository_type(self):
+        self.assertIsInstance(get_repository(), SqliteRepository)
+
+    def test_records_hydrate_on_demand(self):
+        self._register()
+        patients.clear()
+        doctors.clear()
+        repo = get_repository()
+        pat = repo.get_patient(self.pat.id)
+        self.assertEqual(pat.to_dict(), self.pat.to_dict())
+        self.assertEqual(list(patients), [self.pat.id])
+        self.assertIs(repo.get_patient(self.pat.id), pat)
+        doc = repo.find_doctor_by_name("Dr. Heart")
+        self.assertEqual(doc.patients, [self.pat.id])
+        self.assertIsNone(repo.get_patient("PAT-none"))
+
+    def test_listings_leave_the_registry_alone(self):
+        self._register()
+        patients.clear()
+        doctors.clear()
+        repo = get_repository()
+        listed = repo.all_patients()
+        self.assertEqual([p.id for p in listed], [self.pat.id])
+        self.assertEqual(repo.patients_by_status("inpatient")[0].to_dict(), self.pat.to_dict())
+        self.assertEqual(len(repo.list_patients(ListingQuery())[0]), 1)
+        self.assertEqual(len(repo.all_doctors()), 2)
+        self.assertEqual(len(patients), 0)
+        self.assertEqual(len(doctors), 0)
+        # A record fetched for a change is registered, and later listings return it
+        pat = repo.get_patient(self.pat.id)
+        self.assertIs(repo.all_patients()[0], pat)
+        self.assertEqual(len(patients), 1)
+
+    def test_on_leave_reassignment_persists(self):
+        self._register()
+        backup = Doctor("Dr. Pulse", "Cardiology")
+        get_repository().add_doctor(backup)
+        save_doctor_to_json(backup)
+        mark_doctor_on_leave(self.cardio)
+        record = self.backend.store.get_doctor(self.cardio.id)
+        self.assertTrue(record['on_leave'])
+        self.assertEqual(self.backend.store.get_doctor(backup.id)['patients'], [self.pat.id])
+
+    def test_saves_write_only_changed_rows(self):
+        self._register()
+        backup = Doctor("Dr. Pulse", "Cardiology")
+        get_repository().add_doctor(backup)
+        second = Patient("Jane", 60, "Female", ["chest pain"])
+        get_repository().add_patient(second)
+        self.cardio.assign_patient(second)
+        self.cardio.log_condition(self.pat.id, "Stable", "ECG", 500)
+        save_doctor_to_json(self.cardio)
+        conn = self.backend.store.connection()
+
+        def rows(query, *params):
+            return conn.execute(query, params).fetchall()
+
+        history = rows("SELECT rowid, seq FROM patient_history WHERE patient_id = ?", self.pat.id)
+        assigned = rows("SELECT rowid, patient_id FROM doctor_patients WHERE doctor_id = ?", self.cardio.id)
+        notes = rows("SELECT rowid, seq FROM doctor_notes WHERE doctor_id = ?", self.cardio.id)
+        self.pat.add_history("Echo", cost=800)
+        save_patient_to_json(self.pat)
+        self.cardio.log_condition(self.pat.id, "Better", "Echo", 800)
+        self.cardio.release_patient(self.pat.id)
+        backup.assign_patient(self.pat)
+        save_doctor_to_json(self.cardio)
+        save_doctor_to_json(backup)
+        # Stored rows are left in place; only the new ones are added
+        self.assertEqual(rows("SELECT rowid, seq FROM patient_history WHERE patient_id = ? AND seq < 1",
+                              self.pat.id), history)
+        self.assertEqual(rows("SELECT rowid, patient_id FROM doctor_patients WHERE doctor_id = ?",
+                              self.cardio.id), assigned[1:])
+        self.assertEqual(rows("SELECT rowid, seq FROM doctor_notes WHERE doctor_id = ? AND seq < 1",
+                              self.cardio.id), notes)
+        patients.clear()
+        doctors.clear()
+        repo = get_repository()
+        self.assertEqual([e['notes'] for e in repo.get_patient(self.pat.id).history], ["ECG", "Echo"])
+        self.assertEqual(repo.get_doctor(self.cardio.id).patients, [second.id])
+        self.assertEqual(repo.get_doctor(backup.id).patients, [self.pat.id])
+        self.assertEqual([n['treatment'] for n in repo.get_doctor(self.cardio.id).notes[self.pat.id]],
+                         ["ECG", "Echo"])
+
+    def test_lookups_use_indexes(self):
+        conn = self.backend.store.connection()
+        plans = {
+            "idx_patients_status": "SELECT id FROM patients WHERE status = 'inpatient'",
+            "idx_patients_assigned_doctor": "SELECT id FROM patients WHERE assigned_doctor = 'x'",
+            "idx_doctors_specialization": "SELECT id FROM doctors WHERE specialization = 'x' COLLATE NOCASE",
+        }
+        for index, query in plans.items():
+            plan = ' '.join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query))
+            self.assertIn(index, plan)
+
+if __name__ == '__main__':
+    unittest.main()
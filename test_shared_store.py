@@ -0,0 +1,120 @@
+import unittest
+import os
+import fcntl
+import multiprocessing
+from flask import Flask
+from data_storage import configure_storage, save_patient_to_json, patients, doctors
+from repository import get_repository
+from sqlite_storage import SqliteStore
+from shared_store import ChangeFeed, install
+from patient import Patient
+from versions import collection_version
+from test_support import TempDirTestCase
+
+
+def rename_in_other_process(db_path, patient_id, name):
+    store = SqliteStore(db_path)
+    record = store.get_patient(patient_id)
+    record['name'] = name
+    store.upsert_patients([record])
+    store.close()
+
+
+class TestSharedStore(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = configure_storage('sqlite', db_path='test_hospital.db')
+        self.store = self.backend.store
+        patients.clear()
+        doctors.clear()
+        self.pat = Patient("Ann", 40, "Female", ["cough"])
+        get_repository().add_patient(self.pat)
+        save_patient_to_json(self.pat)
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _run_in_other_process(self, target, *args):
+        process = multiprocessing.get_context('fork').Process(target=target, args=args)
+        process.start()
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+
+    def test_writes_are_logged(self):
+        oldest, changes = self.store.changes_since(0)
+        self.assertEqual(oldest, 1)
+        self.assertEqual([(kind, record_id, origin) for _, kind, record_id, origin in changes],
+                         [('patient', self.pat.id, os.getpid())])
+        self.assertEqual(self.store.change_seq(), changes[-1][0])
+
+    def test_feed_evicts_records_changed_elsewhere(self):
+        feed = ChangeFeed(self.store)
+        save_patient_to_json(self.pat)
+        self.assertEqual(feed.poll(), 0)
+        self._run_in_other_process(rename_in_other_process, 'test_hospital.db', self.pat.id, "Ann B")
+        self.assertIs(get_repository().get_patient(self.pat.id), self.pat)
+        self.assertEqual(feed.poll(), 1)
+        fresh = get_repository().get_patient(self.pat.id)
+        self.assertIsNot(fresh, self.pat)
+        self.assertEqual(fresh.name, "Ann B")
+        self.assertEqual(feed.poll(), 0)
+
+    def test_feed_marks_collection_changed_for_unloaded_records(self):
+        feed = ChangeFeed(self.store)
+        save_patient_to_json(self.pat)
+        feed.poll()
+        patients.pop(self.pat.id)
+        version = collection_version('patient')
+        self._run_in_other_process(rename_in_other_process, 'test_hospital.db', self.pat.id, "Ann B")
+        self.assertEqual(feed.poll(), 0)
+        self.assertGreater(collection_version('patient'), version)
+
+    def test_feed_behind_pruned_log_drops_cache(self):
+        feed = ChangeFeed(self.store)
+        save_patient_to_json(self.pat)
+        save_patient_to_json(self.pat)
+        with self.store.connection() as conn:
+            conn.execute("DELETE FROM changes WHERE seq < ?", (self.store.change_seq(),))
+        feed.poll()
+        self.assertEqual(len(patients), 0)
+        self.assertEqual(get_repository().get_patient(self.pat.id).name, "Ann")
+
+    def test_install_locks_writing_requests(self):
+        app = Flask(__name__)
+        feed = install(app)
+        lock_path = self.store.db_path + '.lock'
+
+        def lock_is_held():
+            with open(lock_path, 'a') as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return True
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                return False
+
+        @app.route('/write', methods=['POST'])
+        def write():
+            return {'locked': lock_is_held()}
+
+        @app.route('/read')
+        def read():
+            return {'locked': lock_is_held()}
+
+        client = app.test_client()
+        self.assertTrue(client.post('/write').get_json()['locked'])
+        self.assertFalse(client.get('/read').get_json()['locked'])
+        self._run_in_other_process(rename_in_other_process, 'test_hospital.db', self.pat.id, "Ann C")
+        client.post('/write')
+        self.assertEqual(feed.evicted, 1)
+        self.assertNotIn(self.pat.id, patients)
+
+    def test_install_requires_sqlite(self):
+        configure_storage('json')
+        with self.assertRaises(RuntimeError):
+            install(Flask(__name__))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import os
+import json
+from unittest import mock
+from data_storage import configure_storage, save_patient_to_json, load_records, patients, doctors
+import snapshot_storage
+from snapshot_storage import validate_snapshot, generation_paths, manifest_path_for
+from main import load_patients
+from patient import Patient
+from test_support import TempDirTestCase
+
+class TestSnapshotStorage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = configure_storage('snapshot', generations=3)
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _save_versions(self, count):
+        patient = Patient("Ann", 40, "Female", ["cough"])
+        for version in range(count):
+            patient.name = f"Ann v{version}"
+            save_patient_to_json(patient)
+        return patient
+
+    def test_generations_and_checksums(self):
+        patient = self._save_versions(5)
+        paths = generation_paths('patients.json', 3)
+        self.assertEqual([validate_snapshot(p)[0] for p in paths], [5, 4, 3])
+        self.assertFalse(os.path.exists('patients.json.3'))
+        self.assertEqual(load_records('patients.json')[patient.id]['name'], "Ann v4")
+
+    def test_corrupt_newest_falls_back(self):
+        patient = self._save_versions(3)
+        with open('patients.json', 'r+b') as f:
+            f.seek(20)
+            f.write(b'X')
+        self.assertIsNone(validate_snapshot('patients.json'))
+        self.assertEqual(load_records('patients.json')[patient.id]['name'], "Ann v1")
+        # The next save continues after the newest valid generation
+        save_patient_to_json(patient)
+        self.assertEqual(validate_snapshot('patients.json')[0], 3)
+
+    def test_truncated_and_orphaned_temp_files(self):
+        patient = self._save_versions(2)
+        os.replace('patients.json', 'patients.json.tmp')
+        os.replace('patients.json.snap', 'patients.json.tmp.snap')
+        self.assertEqual(load_records('patients.json')[patient.id]['name'], "Ann v1")
+        with open('patients.json.tmp', 'r+b') as f:
+            f.truncate(30)
+        self.assertEqual(load_records('patients.json')[patient.id]['name'], "Ann v0")
+
+    def test_reads_plain_json_files(self):
+        with open('patients.json', 'w') as f:
+            json.dump({"PAT-1": Patient("Bob", 50, "Male", ["fever"], "PAT-1").to_dict()}, f, indent=4)
+        load_patients()
+        self.assertEqual(patients["PAT-1"].name, "Bob")
+        save_patient_to_json(patients["PAT-1"])
+        self.assertEqual(validate_snapshot('patients.json')[0], 1)
+
+    def test_files_stay_plain_json_for_other_backends(self):
+        patient = self._save_versions(2)
+        with open('patients.json') as f:
+            self.assertEqual(json.load(f)[patient.id]['name'], "Ann v1")
+        self.assertTrue(os.path.exists(manifest_path_for('patients.json')))
+        # Back to the json backend: it reads the snapshot, and its own save keeps every record
+        configure_storage('json')
+        other = Patient("Bob", 50, "Male", ["fever"])
+        save_patient_to_json(other)
+        self.assertEqual(sorted(load_records('patients.json')), sorted([patient.id, other.id]))
+        # ...and the snapshot backend then prefers that newer plain file over its generations
+        configure_storage('snapshot', generations=3)
+        self.assertEqual(sorted(load_records('patients.json')), sorted([patient.id, other.id]))
+        save_patient_to_json(patient)
+        self.assertEqual(validate_snapshot('patients.json')[0], 2)
+        self.assertEqual(len(load_records('patients.json')), 2)
+
+    def test_saves_skip_revalidating_generations(self):
+        self._save_versions(1)
+        # Only the written file's signature is kept, not a copy of its records
+        stat = os.stat('patients.json')
+        self.assertEqual(self.backend._written, {'patients.json': (stat.st_size, stat.st_mtime_ns)})
+        with mock.patch.object(snapshot_storage, 'validate_snapshot',
+                               wraps=snapshot_storage.validate_snapshot) as validate:
+            patient = self._save_versions(3)
+            self.assertEqual(validate.call_count, 0)
+            # A file changed behind the backend's back is read again
+            os.utime('patients.json', ns=(1, 1))
+            save_patient_to_json(patient)
+            self.assertGreater(validate.call_count, 0)
+        self.assertEqual(len(load_records('patients.json')), 2)
+
+    def test_lazy_mode(self):
+        self.backend = configure_storage('snapshot', lazy=True)
+        patient = Patient("Cid", 30, "Male", ["cough"])
+        patient.add_history("ECG", cost=10)
+        patients[patient.id] = patient
+        save_patient_to_json(patient)
+        patients.clear()
+        load_patients()
+        self.assertIsNone(patients[patient.id]._history)
+        self.assertEqual(patients[patient.id].history[0]['notes'], "ECG")
+
+if __name__ == '__main__':
+    unittest.main()
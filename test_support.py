@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from data_storage import StorageBackend, register_backend
+from write_behind import stop_write_behind
+
+
+class RecordingBackend(StorageBackend):
+    """
+    Storage backend for tests: keeps every batch write instead of touching
+    disk. `writes` holds (file, [ids]) and `saved` (file, [records]) per
+    save_many() call, in order; `failures` makes that many saves raise.
+    """
+    name = 'recording'
+
+    def __init__(self):
+        self.writes = []
+        self.saved = []
+        self.failures = 0
+
+    def save_many(self, file_path, objs):
+        if self.failures:
+            self.failures -= 1
+            raise OSError(f"Simulated write failure for {file_path}")
+        objs = list(objs)
+        self.writes.append((file_path, [obj.id for obj in objs]))
+        self.saved.append((file_path, [obj.to_dict() for obj in objs]))
+
+    def load(self, file_path):
+        return {}
+
+register_backend(RecordingBackend.name, RecordingBackend)
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Runs each test in a fresh temporary working directory, so the data files
+    it writes never touch the repository's. Subclasses call super().setUp();
+    the directory is left and removed after their tearDown.
+    """
+
+    def setUp(self):
+        self._orig_cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+        self.addCleanup(self._remove_tmpdir)
+
+    def _remove_tmpdir(self):
+        os.chdir(self._orig_cwd)
+        shutil.rmtree(self.tmpdir)
+
+
+def web_client():
+    """
+    A Flask test client for web_server's app, imported with synchronous
+    saves (no write-behind thread) so the tests see each write as it happens.
+    """
+    previous = os.environ.get('HOSPITAL_WRITE_BEHIND')
+    os.environ['HOSPITAL_WRITE_BEHIND'] = '0'
+    try:
+        import web_server
+    finally:
+        if previous is None:
+            del os.environ['HOSPITAL_WRITE_BEHIND']
+        else:
+            os.environ['HOSPITAL_WRITE_BEHIND'] = previous
+    stop_write_behind()
+    return web_server.app.test_client()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import json
+import random
+import tempfile
+from symptom_matcher import SymptomMatcher, get_matcher
+from patient import Patient
+from benchmarks.symptom_matcher_bench import legacy_should_admit, legacy_specializations, LEGACY_CRITICAL, FILLER
+
+class TestSymptomMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = get_matcher()
+
+    def test_matches_original_rules(self):
+        rng = random.Random(3)
+        vocabulary = LEGACY_CRITICAL + FILLER + ["", " ", "pain", "a", "BLEEDING", "Severe Burns ", "xyz"]
+        for _ in range(2000):
+            symptoms = []
+            for _ in range(rng.randint(0, 4)):
+                word = rng.choice(vocabulary)
+                if rng.random() < 0.3:
+                    word = f"{rng.choice(FILLER)} and {word}"
+                symptoms.append(word)
+            self.assertEqual(self.matcher.should_admit(symptoms), legacy_should_admit(symptoms), symptoms)
+            self.assertEqual(self.matcher.match(symptoms).specialization, legacy_specializations(symptoms), symptoms)
+
+    def test_should_admit(self):
+        self.assertTrue(Patient.should_admit(["Chest Pain"], "stable"))
+        self.assertTrue(Patient.should_admit(["pain"], "stable"))
+        self.assertTrue(Patient.should_admit(["cough"], "Critical"))
+        self.assertFalse(Patient.should_admit(["cough", "fever"], "stable"))
+
+    def test_ranked_specializations(self):
+        match = self.matcher.match(["severe abdominal pain", "stroke"])
+        self.assertTrue(match.admit)
+        self.assertEqual(match.specializations, ["General Medicine", "General Surgery", "Neurology"])
+        self.assertIsNone(self.matcher.match(["cough"]).specialization)
+
+    def test_rules_from_config_file(self):
+        rules = {"rules": [
+            {"symptom": "rash", "specialization": "Dermatology", "admit": False},
+            {"symptom": "Seizure", "specialization": "Neurology", "admit": True},
+        ]}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(rules, f)
+        try:
+            matcher = SymptomMatcher.from_file(f.name)
+        finally:
+            os.remove(f.name)
+        match = matcher.match(["itchy rash", "seizure at night"])
+        self.assertEqual(match.specializations, ["Dermatology", "Neurology"])
+        self.assertTrue(match.admit)
+        self.assertFalse(matcher.should_admit(["rash"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from data_storage import configure_storage, patients, doctors
+from repository import get_repository
+from versions import collection_version, etag, EPOCH
+from patient import Patient
+from doctor import Doctor
+
+
+class TestVersions(unittest.TestCase):
+    def setUp(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+        repo = get_repository()
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        repo.add_doctor(self.doctor)
+        self.patient = Patient("Ann", 40, "Female", ["chest pain"])
+        repo.add_patient(self.patient)
+
+    def tearDown(self):
+        patients.clear()
+        doctors.clear()
+
+    def assertBumps(self, record, kind, change):
+        before, collection = record.version, collection_version(kind)
+        change()
+        self.assertGreater(record.version, before)
+        self.assertEqual(collection_version(kind), record.version)
+        self.assertGreater(collection_version(kind), collection)
+
+    def test_mutations_bump_record_and_collection(self):
+        self.assertBumps(self.patient, 'patient', self.patient.admit)
+        self.assertBumps(self.patient, 'patient', lambda: self.patient.add_history("ECG", cost=0))
+        self.assertBumps(self.patient, 'patient', lambda: self.doctor.assign_patient(self.patient))
+        self.assertBumps(self.doctor, 'doctor', lambda: self.doctor.log_condition(self.patient.id, "Stable"))
+        self.assertBumps(self.doctor, 'doctor', lambda: self.doctor.discharge_patient(self.patient, 100))
+        self.assertBumps(self.doctor, 'doctor', lambda: setattr(self.doctor, 'on_leave', True))
+        self.assertEqual(self.patient.status, 'discharged')
+
+    def test_plain_attribute_assignment_bumps(self):
+        self.assertBumps(self.patient, 'patient', lambda: setattr(self.patient, 'name', "Ann B"))
+        self.assertBumps(self.doctor, 'doctor', lambda: setattr(self.doctor, 'specialization', "Neurology"))
+        self.assertEqual(self.patient.to_dict()['name'], "Ann B")
+
+    def test_reads_do_not_bump(self):
+        version, collection = self.patient.version, collection_version('patient')
+        self.patient.to_dict()
+        get_repository().get_patient(self.patient.id)
+        self.assertEqual((self.patient.version, collection_version('patient')), (version, collection))
+
+    def test_registry_changes_bump_collection(self):
+        collection = collection_version('patient')
+        other = Patient("Bob", 50, "Male", ["cough"])
+        get_repository().add_patient(other)
+        self.assertGreater(collection_version('patient'), collection)
+        collection = collection_version('patient')
+        del patients[other.id]
+        self.assertGreater(collection_version('patient'), collection)
+
+    def test_replacement_record_gets_a_new_version(self):
+        # A record re-read after eviction must not reuse the old object's ETag
+        copy = Patient.from_dict(self.patient.to_dict())
+        self.assertNotEqual(copy.version, self.patient.version)
+        self.assertEqual(etag(copy.version), f"{EPOCH}-{copy.version}")
+
+if __name__ == '__main__':
+    unittest.main()
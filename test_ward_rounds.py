@@ -0,0 +1,82 @@
+import unittest
+import io
+from data_storage import configure_storage, patients, doctors
+from repository import get_repository
+from ward_rounds import record_treatments, parse_entry, read_entries
+from patient import Patient
+from doctor import Doctor
+import test_support
+
+
+class TestWardRounds(unittest.TestCase):
+    def setUp(self):
+        patients.clear()
+        doctors.clear()
+        self.backend = configure_storage('recording')
+        repo = get_repository()
+        self.doctor = Doctor("Dr. Heart", "Cardiology")
+        repo.add_doctor(self.doctor)
+        self.ward = []
+        for name in ("Ann", "Bob", "Cat"):
+            patient = Patient(name, 40, "Female", ["chest pain"])
+            repo.add_patient(patient)
+            self.doctor.assign_patient(patient)
+            patient.admit()
+            self.ward.append(patient)
+
+    def tearDown(self):
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _entry(self, patient, cost=100, **extra):
+        return dict({'patient_id': patient.id, 'note': "Stable", 'treatment': "ECG", 'cost': cost}, **extra)
+
+    def test_round_is_applied_with_one_write_per_file(self):
+        ann, bob, cat = self.ward
+        result = record_treatments([self._entry(ann), self._entry(bob, 50), self._entry(ann, 25),
+                                    self._entry(cat, 10, discharge=True)])
+        self.assertTrue(result['applied'])
+        self.assertEqual((result['recorded'], result['discharged'], result['failed']), (4, 1, 0))
+        self.assertEqual([(path, sorted(ids)) for path, ids in self.backend.writes],
+                         [('patients.json', sorted(p.id for p in self.ward)), ('doctors.json', [self.doctor.id])])
+        self.assertEqual(ann.bill_amount, 125)
+        self.assertEqual(len(ann.history), 2)
+        self.assertEqual(len(self.doctor.notes[ann.id]), 2)
+        self.assertEqual(cat.status, 'discharged')
+        self.assertNotIn(cat.id, self.doctor.patients)
+        self.assertEqual(result['results'][3]['status'], 'discharged')
+        self.assertEqual(result['results'][1]['bill_amount'], 50.0)
+
+    def test_invalid_entry_rejects_atomic_batch(self):
+        ann, bob, cat = self.ward
+        entries = [self._entry(ann), self._entry(bob, discharge=True), self._entry(bob), {'patient_id': "PAT-none"}]
+        result = record_treatments(entries)
+        self.assertFalse(result['applied'])
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual([r['success'] for r in result['results']], [False] * 4)
+        self.assertEqual(result['results'][2]['error'], "Patient is not admitted for treatment")
+        self.assertEqual(self.backend.writes, [])
+        self.assertEqual((ann.bill_amount, bob.status), (0, 'inpatient'))
+
+        result = record_treatments(entries, atomic=False)
+        self.assertEqual([r['success'] for r in result['results']], [True, True, False, False])
+        self.assertEqual(bob.status, 'discharged')
+        self.assertEqual(len(self.backend.writes), 2)
+
+    def test_parse_and_read_entries(self):
+        self.assertEqual(parse_entry({'patient_id': " P1 ", 'note': "n", 'treatment': "t", 'discharge': "yes"}),
+                         ("P1", "n", "t", 0.0, True))
+        for bad in ({'patient_id': "P1", 'note': "n"}, {'patient_id': "P1", 'note': "n", 'treatment': "t", 'cost': -1},
+                    {'patient_id': "P1", 'note': "n", 'treatment': "t", 'cost': "x"}, ["P1"]):
+            with self.assertRaises(ValueError):
+                parse_entry(bad)
+        self.assertEqual(len(read_entries(io.StringIO('[{"a": 1}, {"b": 2}]'))), 2)
+        rows = read_entries(io.StringIO('{"a": 1}\n\nnot json\n'))
+        self.assertEqual(rows[0], {'a': 1})
+        self.assertIsInstance(rows[1], ValueError)
+        with self.assertRaises(ValueError):
+            record_treatments([{}] * 1001)
+
+if __name__ == '__main__':
+    unittest.main()
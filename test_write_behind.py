@@ -0,0 +1,87 @@
+import unittest
+import json
+import threading
+from data_storage import configure_storage, save_patient_to_json, flush_storage, patients, doctors
+from write_behind import start_write_behind, stop_write_behind
+from patient import Patient
+import test_support
+from test_support import TempDirTestCase
+
+class TestWriteBehind(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        patients.clear()
+        doctors.clear()
+
+    def tearDown(self):
+        stop_write_behind()
+        configure_storage('json')
+        patients.clear()
+        doctors.clear()
+
+    def _names(self, backend):
+        return [(path, [record['name'] for record in records]) for path, records in backend.saved]
+
+    def test_coalesces_repeated_saves(self):
+        backend = configure_storage('recording')
+        worker = start_write_behind(window=0.5)
+        patient = Patient("Ann", 40, "Female", ["cough"])
+        for i in range(50):
+            patient.name = f"Ann {i}"
+            save_patient_to_json(patient)
+        self.assertTrue(worker.flush(timeout=5))
+        self.assertEqual(self._names(backend), [('patients.json', ["Ann 49"])])
+
+    def test_concurrent_saves_are_not_lost(self):
+        configure_storage('json')
+        start_write_behind(window=0.01)
+        created = [Patient(f"P{i}", 30, "Male", ["cough"]) for i in range(8)]
+        for patient in created:
+            patients[patient.id] = patient
+
+        def treat(patient):
+            for day in range(20):
+                patient.add_history(f"Day {day}", cost=10)
+                save_patient_to_json(patient)
+
+        threads = [threading.Thread(target=treat, args=(p,)) for p in created]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        flush_storage()
+        with open('patients.json') as f:
+            saved = json.load(f)
+        self.assertEqual(sorted(saved), sorted(p.id for p in created))
+        self.assertTrue(all(len(saved[p.id]['history']) == 20 for p in created))
+
+    def test_stop_drains_pending(self):
+        backend = configure_storage('recording')
+        start_write_behind(window=10)
+        save_patient_to_json(Patient("Bob", 50, "Male", ["fever"]))
+        stop_write_behind()
+        self.assertEqual(self._names(backend), [('patients.json', ["Bob"])])
+
+    def test_failed_write_is_retried_not_reported_as_flushed(self):
+        backend = configure_storage('recording')
+        backend.failures = 1
+        worker = start_write_behind(window=10)
+        worker.retry_delay = 0.01
+        save_patient_to_json(Patient("Cat", 30, "Female", ["cough"]))
+        self.assertFalse(flush_storage())
+        self.assertIsInstance(worker.last_error, OSError)
+        self.assertEqual(backend.saved, [])
+        self.assertEqual(worker.pending, 1)
+        self.assertTrue(worker.flush(timeout=5))
+        self.assertIsNone(worker.last_error)
+        self.assertEqual(self._names(backend), [('patients.json', ["Cat"])])
+
+        # Stopping while the backend keeps failing gives up instead of retrying forever
+        backend.failures = 100
+        save_patient_to_json(Patient("Dan", 60, "Male", ["fever"]))
+        stop_write_behind()
+        self.assertFalse(worker.flush(timeout=5))
+        self.assertEqual(len(backend.saved), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,91 +1,110 @@
 # --- Doctor Leave and Reassignment ---
 def mark_doctor_on_leave(doctor):
-    doctor.on_leave = True
-    print(f"Doctor {doctor.name} is now marked as on leave.")
-    # Reassign all patients
-    reassigned = 0
-    for pid in list(doctor.patients):
-        # Find the patient object
-        patient = patients.get(pid)
-        if not patient:
-            continue
-        # Find eligible doctors with same specialization and not on leave
-        eligible_doctors = [d for d in doctors.values() if d.specialization == doctor.specialization and getattr(d, 'on_leave', False) == False and d.id != doctor.id]
-        if not eligible_doctors:
-            # Fallback: any doctor not on leave
-            eligible_doctors = [d for d in doctors.values() if getattr(d, 'on_leave', False) == False and d.id != doctor.id]
-        if not eligible_doctors:
-            print(f"No available doctor to reassign patient {patient.name}.")
-            continue
-        new_doctor = min(eligible_doctors, key=lambda d: len(d.patients))
-        new_doctor.assign_patient(patient)
-        patient.assigned_doctor = new_doctor.name
-        doctor.patients.remove(pid)
-        save_doctor_to_json(new_doctor)
-        save_patient_to_json(patient)
-        reassigned += 1
-    save_doctor_to_json(doctor)
-    print(f"Total patients reassigned: {reassigned}")
+    """Mark the doctor on leave and move their patients (see leave_reassignment); returns the summary."""
+    return reassign_on_leave(doctor)
 # --------------------- UTILITIES ---------------------
 from doctor import Doctor
 from patient import Patient
 from data_storage import save_doctor_to_json, save_patient_to_json, doctors, patients
+from repository import get_repository
+from symptom_matcher import get_matcher
+from ledger import ledger
+from leave_reassignment import reassign_on_leave
+from instrumentation import get_logger, ASSIGNMENT_SECONDS, ASSIGNMENTS
+
+log = get_logger('doctors')
 
 def register_doctor():
     name = input("Enter Doctor Name: ")
     specialization = input("Enter Specialization: ")
     doctor = Doctor(name, specialization)
-    doctors[doctor.id] = doctor
+    get_repository().add_doctor(doctor)
     save_doctor_to_json(doctor)
     print(f"Doctor registered with ID: {doctor.id}")
     return doctor
 
-def assign_doctor_to_patient(patient):
-    if not doctors:
-        print("No doctors available. Register a doctor first.")
-        return None
-
-    # Symptom to specialization mapping
-    symptom_specialization_map = {
-        'chest pain': 'Cardiology',
-        'heart attack': 'Cardiology',
-        'stroke': 'Neurology',
-        'unconscious': 'Neurology',
-        'abdominal pain': 'General Medicine',
-        'severe abdominal pain': 'General Surgery',
-        'abdominal bleeding': 'General Surgery',
-        'difficulty breathing': 'Pulmonology',
-        'severe bleeding': 'Emergency Response',
-        'severe allergic reaction': 'General Medicine',
-        'severe burns': 'Emergency Response',
-    }
+def assign_doctor_to_patient(patient, persist=True):
+    with ASSIGNMENT_SECONDS.time():
+        doctor, result = _assign_doctor(patient)
+    ASSIGNMENTS.inc(result=result)
+    if doctor is not None and persist:
+        save_doctor_to_json(doctor)
+    return doctor
+
+def _assign_doctor(patient):
+    """(doctor or None, 'specialist' | 'fallback' | 'unassigned'); persistence is left to the caller."""
+    repo = get_repository()
+    if not repo.doctor_count():
+        log.warning("No doctors available. Register a doctor first.")
+        return None, 'unassigned'
 
     # Find the most relevant specialization for the patient's symptoms
-    matched_specializations = []
-    for symptom in patient.symptoms:
-        s_clean = symptom.strip().lower()
-        for key, spec in symptom_specialization_map.items():
-            if key in s_clean or s_clean in key:
-                matched_specializations.append(spec)
-
-    # Prefer the first matched specialization
-    specialization = matched_specializations[0] if matched_specializations else None
+    # (symptom-to-specialization rules live in symptom_rules.json)
+    specialization = get_matcher().match(patient.symptoms).specialization
 
     # Find doctors with the matched specialization
     if specialization:
-        eligible_doctors = [d for d in doctors.values() if d.specialization.lower() == specialization.lower()]
-        if eligible_doctors:
-            # Assign to the doctor with the fewest patients in that specialization
-            doctor = min(eligible_doctors, key=lambda d: len(d.patients))
+        # Assign to the available doctor with the fewest patients in that specialization
+        doctor = repo.least_loaded_doctor(specialization)
+        if doctor:
             doctor.assign_patient(patient)
-            save_doctor_to_json(doctor)
-            return doctor
+            return doctor, 'specialist'
 
-    # Fallback: assign to any doctor with the fewest patients
-    doctor = min(doctors.values(), key=lambda d: len(d.patients))
+    # Fallback: assign to any available doctor with the fewest patients
+    doctor = repo.least_loaded_doctor()
+    if doctor is None:
+        log.warning("All doctors are on leave. No doctor assigned.")
+        return None, 'unassigned'
     doctor.assign_patient(patient)
-    save_doctor_to_json(doctor)
-    return doctor
+    return doctor, 'fallback'
+
+def register_new_patient(name, age, gender, symptoms, condition, persist=True):
+    """
+    Register a patient, route them to a doctor and admit or send them home
+    as outpatient. Shared by POST /api/patients and the bulk importer; with
+    persist=False the caller is responsible for saving patient and doctor.
+    Returns (patient, doctor, status_message).
+    """
+    # The patient is built and routed before it enters the registry, so a
+    # failure on the way leaves no half-registered record behind.
+    patient = Patient(name, age, gender, symptoms)
+    admit = Patient.should_admit(patient.symptoms, condition)
+
+    doctor = assign_doctor_to_patient(patient, persist=persist)
+
+    if admit:
+        patient.admit()
+        status_message = f"{patient.name} admitted as inpatient."
+    else:
+        if doctor:
+            patient.set_outpatient(f"Outpatient advice by {doctor.name}")
+            status_message = f"{patient.name} set as outpatient."
+        else:
+            status_message = f"{patient.name} registered but no doctor available."
+
+    get_repository().add_patient(patient)
+    if persist:
+        save_patient_to_json(patient)
+    return patient, doctor, status_message
+
+def apply_treatment(patient, doctor, note, treatment, cost=0, discharge=False):
+    """
+    Record one treatment by the patient's doctor (POST /api/treatment and
+    ward rounds), optionally discharging with the ledger total. The caller
+    validates and saves. Returns a message for the user.
+    """
+    treatment_note = f"{note}, Treatment: {treatment}"
+    if cost > 0:
+        treatment_note += f", Charges: ₹{cost}"
+    doctor.log_condition(patient.id, treatment_note, treatment, cost)
+    patient.add_history(treatment_note, cost)
+
+    if not discharge:
+        patient.bill_amount = patient.treatment_total_cost
+        return f"Treatment recorded for {patient.name}. Updated bill: ₹{patient.bill_amount}"
+    total_cost = ledger.patient_total(patient)
+    doctor.discharge_patient(patient, total_cost)
+    return f"Patient {patient.name} discharged with bill ₹{total_cost}"
 
 def simulate_treatment(patient, doctor):
     if patient.status != 'inpatient':
@@ -105,7 +124,7 @@ def simulate_treatment(patient, doctor):
 
         if input("Discharge patient? (y/n): ").lower() == 'y':
             # Calculate total cost from history
-            total_cost = sum(entry.get('cost', 0) for entry in patient.history)
+            total_cost = ledger.patient_total(patient)
             doctor.discharge_patient(patient, total_cost)
             print(f"Total bill amount: ₹{total_cost}")
 
@@ -0,0 +1,73 @@
+import uuid
+import zlib
+import itertools
+from events import subscribe
+
+# Distinguishes this process's versions from a previous run's or another worker's
+EPOCH = uuid.uuid4().hex[:8]
+
+_counter = itertools.count(1)
+_collections = {'patient': 0, 'doctor': 0}
+
+
+# --------------------- VERSIONS ---------------------
+def next_version(kind=None):
+    """
+    A new version number. Every record and collection version is drawn from
+    one process-wide counter, so a version is never reused, not even by a
+    record object that replaces an evicted one. With `kind` ('patient' or
+    'doctor') the collection version moves to it as well.
+    """
+    version = next(_counter)
+    if kind is not None:
+        _collections[kind] = version
+    return version
+
+
+def collection_version(kind):
+    """Version of the whole patient or doctor collection."""
+    return _collections[kind]
+
+
+def touch(kind):
+    """Mark the collection changed without a record change (other workers' writes)."""
+    next_version(kind)
+
+
+class VersionedField:
+    """
+    Plain record attribute (name, age, ...) kept in the slot '_<name>', whose
+    assignment bumps the record's version like the mutating methods do.
+    """
+
+    def __set_name__(self, owner, name):
+        self.slot = '_' + name
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        return getattr(record, self.slot)
+
+    def __set__(self, record, value):
+        setattr(record, self.slot, value)
+        record._touch()
+
+
+def etag(version, variant=None):
+    """
+    The ETag of a response built from `version`. `variant` (the normalized
+    query) tells apart responses of one version, e.g. two pages of a listing.
+    """
+    if variant is None:
+        return f"{EPOCH}-{version}"
+    return f"{EPOCH}-{version}-{zlib.crc32(variant.encode()):08x}"
+
+
+def on_event(event, record, details):
+    # Registrations, deletions and evictions change the collection
+    kind, _, action = event.partition('.')
+    if kind in _collections and action in ('added', 'removed', 'cleared'):
+        touch(kind)
+
+
+subscribe(on_event)
@@ -0,0 +1,132 @@
+import io
+import json
+import time
+from data_storage import save_many_to_json
+from repository import get_repository
+from utilities import apply_treatment
+from bulk_import import iter_rows
+
+MAX_ENTRIES = 1000
+
+
+# --------------------- WARD ROUNDS ---------------------
+def parse_entry(entry):
+    """Validate one treatment entry; returns (patient_id, note, treatment, cost, discharge)."""
+    if not isinstance(entry, dict):
+        raise ValueError("Entry must be an object")
+    patient_id = str(entry.get('patient_id') or '').strip()
+    note = str(entry.get('note') or '').strip()
+    treatment = str(entry.get('treatment') or '').strip()
+    if not patient_id or not note or not treatment:
+        raise ValueError("patient_id, note and treatment are required")
+    try:
+        cost = float(entry.get('cost', 0) or 0)
+    except (TypeError, ValueError):
+        raise ValueError("cost must be a number")
+    if cost < 0:
+        raise ValueError("cost must not be negative")
+    discharge = entry.get('discharge', False)
+    if isinstance(discharge, str):
+        discharge = discharge.strip().lower() in ('1', 'true', 'yes', 'y')
+    return patient_id, note, treatment, cost, bool(discharge)
+
+
+def record_treatments(entries, atomic=True):
+    """
+    Apply a doctor's round of treatment and discharge entries with the same
+    rules as POST /api/treatment, then persist every touched patient and
+    doctor with one batched write per file.
+
+    Every entry is validated before anything is applied, in order, so that
+    a patient discharged earlier in the batch cannot be treated again. With
+    atomic=True one invalid entry rejects the whole batch ('applied' is
+    False and nothing changes); otherwise the valid entries are applied.
+    Returns a summary with one result per entry; raises ValueError for a
+    batch larger than MAX_ENTRIES.
+    """
+    if len(entries) > MAX_ENTRIES:
+        raise ValueError(f"At most {MAX_ENTRIES} entries per batch")
+    started = time.perf_counter()
+    repo = get_repository()
+    planned = []
+    results = []
+    discharged = set()
+    for index, entry in enumerate(entries):
+        try:
+            if isinstance(entry, Exception):
+                raise entry
+            patient_id, note, treatment, cost, discharge = parse_entry(entry)
+            patient = repo.get_patient(patient_id)
+            if patient is None:
+                raise ValueError("Patient not found")
+            if patient.status != 'inpatient' or patient_id in discharged:
+                raise ValueError("Patient is not admitted for treatment")
+            doctor = repo.doctor_for_patient(patient)
+            if doctor is None:
+                raise ValueError("Assigned doctor not found")
+        except Exception as e:
+            results.append({'entry': index, 'success': False, 'error': str(e)})
+            continue
+        if discharge:
+            discharged.add(patient_id)
+        planned.append((len(results), patient, doctor, note, treatment, cost, discharge))
+        results.append({'entry': index, 'patient_id': patient_id, 'success': True})
+
+    failed = len(results) - len(planned)
+    applied = not (atomic and failed)
+    touched_patients = {}
+    touched_doctors = {}
+    if applied:
+        try:
+            for position, patient, doctor, note, treatment, cost, discharge in planned:
+                touched_patients[patient.id] = patient
+                touched_doctors[doctor.id] = doctor
+                message = apply_treatment(patient, doctor, note, treatment, cost, discharge)
+                results[position].update(message=message, status=patient.status,
+                                         bill_amount=float(patient.bill_amount))
+        finally:
+            # Whatever was applied is persisted, in one write per file
+            save_many_to_json('patients.json', touched_patients.values())
+            save_many_to_json('doctors.json', touched_doctors.values())
+    else:
+        for position, *_ in planned:
+            results[position] = dict(results[position], success=False, error="Not applied: batch rejected")
+
+    return {
+        'applied': applied,
+        'recorded': len(planned) if applied else 0,
+        'discharged': len(discharged) if applied else 0,
+        'failed': failed,
+        'patients': len(touched_patients),
+        'doctors': len(touched_doctors),
+        'elapsed_seconds': round(time.perf_counter() - started, 4),
+        'results': results,
+    }
+
+
+def read_entries(stream):
+    """Entries from a JSON array or NDJSON text stream (unparsable lines become errors)."""
+    text = stream.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [row for _, row in iter_rows(io.StringIO(text), 'ndjson')]
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from main import load_patients, load_doctors
+
+    parser = argparse.ArgumentParser(description="Record a ward round of treatments from a JSON or NDJSON file.")
+    parser.add_argument('path', help="entries file ('-' for stdin)")
+    parser.add_argument('--partial', action='store_true', help="apply the valid entries even if some are invalid")
+    args = parser.parse_args()
+
+    load_doctors()
+    load_patients()
+    if args.path == '-':
+        entries = read_entries(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'))
+    else:
+        with open(args.path, 'r', encoding='utf-8') as f:
+            entries = read_entries(f)
+    print(json.dumps(record_treatments(entries, atomic=not args.partial), indent=4))
@@ -1,18 +1,103 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import io
 import json
 import os
 import uuid
 from datetime import datetime
 from patient import Patient
 from doctor import Doctor
-from utilities import assign_doctor_to_patient
+from utilities import register_new_patient, apply_treatment
+from ward_rounds import record_treatments
+from leave_reassignment import reassign_on_leave
 from data_storage import save_patient_to_json, save_doctor_to_json, patients, doctors
 from main import load_patients, load_doctors
+from repository import get_repository
+from patient_listing import ListingQuery, HistoryQuery, parse_fields
+from bulk_import import import_patients, detect_format, FORMATS
+import export
+from write_behind import start_write_behind
+from live_updates import live_updates, parse_cursor, STREAM_HEADERS
+from versions import etag, collection_version
+from json_cache import json_cache, envelope
+from data_storage import get_writer
+from instrumentation import configure_logging, get_logger, instrument_app, registry, CONTENT_TYPE
+import profiling
+import shared_store
+from async_server import REVALIDATE_KEY, REVALIDATE_HEADER
+configure_logging()
+log = get_logger('web')
 load_patients()
 load_doctors()
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
+instrument_app(app)
+profiler = profiling.AppProfiler(app)
+if shared_store.worker_count() > 1:
+    # Several worker processes share the SQLite store: saves commit inside the write lock
+    shared_store.install(app)
+elif os.environ.get('HOSPITAL_WRITE_BEHIND', '1') != '0':
+    # Flask serves requests on several threads: saves go through one writer thread
+    start_write_behind()
+
+
+def tagged(response, tag):
+    # Clients revalidate on every use; an unchanged resource then costs a 304
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def spliced(data, **extra):
+    """A success response around pre-encoded JSON data (cached record fragments)."""
+    return Response(envelope(data, **extra), mimetype='application/json')
+
+def collect_state():
+    """Gauges sampled on every /metrics scrape."""
+    cache = json_cache.stats()
+    writer = get_writer()
+    return [
+        ('hospital_records', 'gauge', "Records in the live registries.",
+         [({'kind': 'patient'}, len(patients)), ({'kind': 'doctor'}, len(doctors))]),
+        ('hospital_json_cache_bytes', 'gauge', "Bytes held by the serialized record cache.", [({}, cache['bytes'])]),
+        ('hospital_json_cache_lookups_total', 'counter', "Serialized record cache lookups by result.",
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('hospital_json_cache_evictions_total', 'counter', "Entries evicted from the serialized record cache.",
+         [({}, cache['evictions'])]),
+        ('hospital_write_behind_pending', 'gauge', "Records queued for the write-behind worker.",
+         [({}, writer.pending if writer is not None else 0)]),
+        ('hospital_live_update_subscribers', 'gauge', "Open /api/events streams.",
+         [({}, live_updates.subscribers)]),
+    ]
+
+registry.add_collector(collect_state)
+
+def admin_error():
+    """An error response unless profiling is enabled and the request carries the admin token, else None."""
+    if profiling.admin_token() is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profiling is disabled (set HOSPITAL_ADMIN_TOKEN)'
+        }), 404
+    if not profiling.authorized(request.headers):
+        return jsonify({
+            'success': False,
+            'error': 'Admin token required'
+        }), 403
+    return None
+
+def not_modified(tag):
+    """A 304 response when the client's copy (If-None-Match) is still current, else None."""
+    if request.if_none_match.contains_weak(tag):
+        return tagged(Response(status=304), tag)
+    if request.environ.get(REVALIDATE_KEY):
+        # Tried on the async server's event loop: the full response is built on its thread pool
+        return Response(status=204, headers={REVALIDATE_HEADER: 'miss'})
+    return None
+
+# Routes cheap enough for async_server to run on its event loop: single-record
+# reads, and collections whose conditional GETs answer a 304 before any work
+INLINE_ENDPOINTS = ('get_patient', 'get_patient_history')
+CONDITIONAL_ENDPOINTS = ('get_patients', 'get_doctors')
 
 
 # FLASK ROUTES
@@ -23,14 +108,33 @@ def index():
 @app.route('/api/patients', methods=['GET'])
 def get_patients():
     try:
-        patients_data = {}
-        for patient_id, patient in patients.items():
-            patients_data[patient_id] = patient.to_dict()
-        
-        return jsonify({
-            'success': True,
-            'data': patients_data
-        })
+        repo = get_repository()
+        query = None
+        if ListingQuery.requested(request.args):
+            try:
+                query = ListingQuery.from_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        # Any patient change moves the collection version; each query has its own tag
+        tag = etag(collection_version('patient'), query.variant() if query else None)
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        if query is not None:
+            page, next_cursor = repo.list_patients(query)
+            if query.fields is None:
+                return tagged(spliced(json_cache.join_array(page), count=len(page), next_cursor=next_cursor), tag)
+            return tagged(jsonify({
+                'success': True,
+                'data': [patient.to_dict(query.fields) for patient in page],
+                'count': len(page),
+                'next_cursor': next_cursor
+            }), tag)
+
+        return tagged(spliced(json_cache.join_object(repo.all_patients())), tag)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -40,14 +144,11 @@ def get_patients():
 @app.route('/api/doctors', methods=['GET'])
 def get_doctors():
     try:
-        doctors_data = {}
-        for doctor_id, doctor in doctors.items():
-            doctors_data[doctor_id] = doctor.to_dict()
-        
-        return jsonify({
-            'success': True,
-            'data': doctors_data
-        })
+        tag = etag(collection_version('doctor'))
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        return tagged(spliced(json_cache.join_object(get_repository().all_doctors())), tag)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -57,17 +158,64 @@ def get_doctors():
 @app.route('/api/patients/<patient_id>', methods=['GET'])
 def get_patient(patient_id):
     try:
-        if patient_id not in patients:
+        patient = get_repository().get_patient(patient_id)
+        if patient is None:
             return jsonify({
                 'success': False,
                 'error': 'Patient not found'
             }), 404
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        tag = etag(patient.version, ','.join(fields) if fields is not None else None)
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
         
-        patient = patients[patient_id]
+        if fields is not None:
+            # e.g. everything but the history, which the detail view pages through separately
+            return tagged(jsonify({'success': True, 'data': patient.to_dict(fields)}), tag)
+        return tagged(spliced(json_cache.fragment(patient)), tag)
+    except Exception as e:
         return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/patients/<patient_id>/history', methods=['GET'])
+def get_patient_history(patient_id):
+    try:
+        try:
+            query = HistoryQuery.from_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        patient = get_repository().get_patient(patient_id)
+        if patient is None:
+            return jsonify({
+                'success': False,
+                'error': 'Patient not found'
+            }), 404
+        tag = etag(patient.version, query.variant())
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        
+        # Binary search over the history's date index; only the page is serialized
+        entries, next_cursor, total = query.page(patient.history)
+        return tagged(jsonify({
             'success': True,
-            'data': patient.to_dict()
-        })
+            'data': entries,
+            'count': len(entries),
+            'total': total,
+            'next_cursor': next_cursor
+        }), tag)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -88,7 +236,7 @@ def register_doctor():
             }), 400
         
         doctor = Doctor(name, specialization)
-        doctors[doctor.id] = doctor
+        get_repository().add_doctor(doctor)
         save_doctor_to_json(doctor)
         
         return jsonify({
@@ -102,6 +250,40 @@ def register_doctor():
             'error': str(e)
         }), 500
 
+@app.route('/api/doctors/<doctor_id>/leave', methods=['POST'])
+def mark_doctor_on_leave(doctor_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        dry_run = data.get('dry_run', request.args.get('dry_run', False))
+        if isinstance(dry_run, str):
+            dry_run = dry_run.strip().lower() in ('1', 'true', 'yes')
+        doctor = get_repository().get_doctor(doctor_id)
+        if doctor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Doctor not found'
+            }), 404
+        
+        # The whole move is planned first; dry runs return the plan without changing anything
+        result = reassign_on_leave(doctor, dry_run=bool(dry_run))
+        if dry_run:
+            message = f"Dry run: {len(result['moves'])} patients would be reassigned"
+        else:
+            message = f"{doctor.name} is on leave; {result['reassigned']} patients reassigned"
+        if result['unassigned']:
+            message += f" ({len(result['unassigned'])} without an available doctor)"
+        
+        return jsonify({
+            'success': True,
+            'message': message,
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/patients', methods=['POST'])
 def register_patient():
     try:
@@ -118,22 +300,7 @@ def register_patient():
                 'error': 'All fields are required'
             }), 400
         
-        patient = Patient(name, age, gender, symptoms)
-        patients[patient.id] = patient
-        
-        doctor = assign_doctor_to_patient(patient)
-        
-        if Patient.should_admit(patient.symptoms, condition):
-            patient.admit()
-            status_message = f"{patient.name} admitted as inpatient."
-        else:
-            if doctor:
-                patient.set_outpatient(f"Outpatient advice by {doctor.name}")
-                status_message = f"{patient.name} set as outpatient."
-            else:
-                status_message = f"{patient.name} registered but no doctor available."
-        
-        save_patient_to_json(patient)
+        patient, doctor, status_message = register_new_patient(name, age, gender, symptoms, condition)
         
         return jsonify({
             'success': True,
@@ -149,6 +316,74 @@ def register_patient():
             'error': str(e)
         }), 500
 
+@app.route('/api/patients/bulk', methods=['POST'])
+def bulk_register_patients():
+    try:
+        upload = request.files.get('file')
+        fmt = request.args.get('format') or detect_format(
+            upload.filename if upload else None, request.content_type)
+        if fmt not in FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Format must be one of: {', '.join(FORMATS)}"
+            }), 400
+        chunk_size = max(1, request.args.get('chunk_size', 1000, type=int))
+        raw = upload.stream if upload else request.stream
+        stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        result = import_patients(stream, fmt, chunk_size)
+        
+        return jsonify({
+            'success': True,
+            'message': f"Imported {result['imported']} patients ({result['failed']} failed)",
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/export/<kind>', methods=['GET'])
+def export_records(kind):
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if kind not in export.EXPORT_KINDS or fmt not in export.FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Export must be one of {', '.join(export.EXPORT_KINDS)} "
+                         f"as {', '.join(export.FORMATS)}"
+            }), 400
+        chunks = export.iter_export(kind, fmt, request.args.get('cursor') or None)
+        headers = {'Content-Disposition': f'attachment; filename={kind}.{fmt}', 'Vary': 'Accept-Encoding'}
+        if request.args.get('gzip') != '0' and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            chunks = export.gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(stream_with_context(chunks), mimetype=export.CONTENT_TYPES[fmt], headers=headers)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    try:
+        try:
+            cursor = parse_cursor(request.headers.get('Last-Event-ID'), request.args.get('since'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        # Patient summaries and statistics for each batch of changes, as server-sent events
+        stream = live_updates.stream(cursor, poll=app.extensions.get('shared_store'))
+        return Response(stream, mimetype='text/event-stream', headers=STREAM_HEADERS)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/treatment', methods=['POST'])
 def simulate_treatment():
     try:
@@ -160,16 +395,16 @@ def simulate_treatment():
         cost = float(data.get('cost', 0))
         discharge = data.get('discharge', False)
         
-        print(f"Treatment request: {data}")  # Debug log
+        log.debug("Treatment request: %s", data)
         
-        if patient_id not in patients:
+        repo = get_repository()
+        patient = repo.get_patient(patient_id)
+        if patient is None:
             return jsonify({
                 'success': False,
                 'error': 'Patient not found'
             }), 404
         
-        patient = patients[patient_id]
-        
         if patient.status != 'inpatient':
             return jsonify({
                 'success': False,
@@ -177,11 +412,7 @@ def simulate_treatment():
             }), 400
         
         # Find the assigned doctor
-        doctor = None
-        for d in doctors.values():
-            if d.name == patient.assigned_doctor:
-                doctor = d
-                break
+        doctor = repo.doctor_for_patient(patient)
         
         if not doctor:
             return jsonify({
@@ -190,21 +421,9 @@ def simulate_treatment():
             }), 404
         
         # Add treatment note and cost to patient history
-        treatment_note = f"{note}, Treatment: {treatment}"
-        if cost > 0:
-            treatment_note += f", Charges: ₹{cost}"
-        doctor.log_condition(patient.id, treatment_note, treatment, cost)
-        patient.add_history(treatment_note, cost)
-
-        if not discharge:
-            patient.bill_amount = patient.treatment_total_cost
-            message = f"Treatment recorded for {patient.name}. Updated bill: ₹{patient.bill_amount}"
-        else:
-            total_cost = sum(entry.get('cost', 0) for entry in patient.history)
-            doctor.discharge_patient(patient, total_cost)
-            message = f"Patient {patient.name} discharged with bill ₹{total_cost}"
+        message = apply_treatment(patient, doctor, note, treatment, cost, discharge)
 
-        print(f"Updated patient bill: ₹{patient.bill_amount}")  # Debug log
+        log.debug("Updated patient bill: ₹%s", patient.bill_amount)
 
         save_patient_to_json(patient)
         save_doctor_to_json(doctor)
@@ -215,7 +434,43 @@ def simulate_treatment():
             'data': patient.to_dict()
         })
     except Exception as e:
-        print(f"Treatment error: {e}")  # Debug log
+        log.exception("Treatment error: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/treatment/batch', methods=['POST'])
+def record_treatment_batch():
+    try:
+        data = request.get_json()
+        entries = data.get('entries') if isinstance(data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return jsonify({
+                'success': False,
+                'error': 'entries must be a non-empty list'
+            }), 400
+        try:
+            result = record_treatments(entries, atomic=data.get('atomic', True) is not False)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if not result['applied']:
+            return jsonify({
+                'success': False,
+                'error': f"{result['failed']} invalid entries; nothing was recorded",
+                'data': result
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'message': f"Recorded {result['recorded']} treatments ({result['discharged']} discharged, "
+                       f"{result['failed']} failed)",
+            'data': result
+        })
+    except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
@@ -224,23 +479,9 @@ def simulate_treatment():
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
     try:
-        total_patients = len(patients)
-        inpatients = len([p for p in patients.values() if p.status == 'inpatient'])
-        outpatients = len([p for p in patients.values() if p.status == 'outpatient'])
-        discharged = len([p for p in patients.values() if p.status == 'discharged'])
-        total_revenue = sum([p.bill_amount for p in patients.values()])
-        total_doctors = len(doctors)
-        
         return jsonify({
             'success': True,
-            'data': {
-                'total_patients': total_patients,
-                'inpatients': inpatients,
-                'outpatients': outpatients,
-                'discharged': discharged,
-                'total_revenue': total_revenue,
-                'total_doctors': total_doctors
-            }
+            'data': get_repository().statistics()
         })
     except Exception as e:
         return jsonify({
@@ -248,12 +489,139 @@ def get_statistics():
             'error': str(e)
         }), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    try:
+        return jsonify({
+            'success': True,
+            'data': json_cache.stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text format; each worker process reports its own counters
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/reports/revenue', methods=['GET'])
+def get_revenue_report():
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_repository().revenue_report()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/profile', methods=['POST'])
+def start_profile():
+    denied = admin_error()
+    if denied:
+        return denied
+    try:
+        data = request.get_json(silent=True) or {}
+        routes = data.get('routes')
+        if isinstance(routes, str):
+            routes = [routes]
+        try:
+            session = profiler.start(
+                mode=data.get('mode', 'cprofile'),
+                seconds=float(data.get('seconds', profiling.DEFAULT_SECONDS)),
+                routes=routes,
+                interval=float(data.get('interval_ms', profiling.DEFAULT_INTERVAL * 1000)) / 1000,
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except RuntimeError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'data': profiler.session.info()
+            }), 409
+        return jsonify({
+            'success': True,
+            'message': f"Profiling for {session.seconds:g}s",
+            'data': session.info()
+        }), 202
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/profile', methods=['GET', 'DELETE'])
+def get_profile():
+    denied = admin_error()
+    if denied:
+        return denied
+    try:
+        session = profiler.stop() if request.method == 'DELETE' else profiler.session
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No profile has been captured'
+            }), 404
+        return jsonify({
+            'success': True,
+            'data': session.info()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/admin/profile/download', methods=['GET'])
+def download_profile():
+    denied = admin_error()
+    if denied:
+        return denied
+    try:
+        session = profiler.session
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'No profile has been captured'
+            }), 404
+        fmt = request.args.get('format')
+        route = request.args.get('route')
+        try:
+            body = session.render(fmt, route)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        binary = (fmt or profiling.FORMATS[session.mode]) == 'pstats'
+        mimetype = 'application/octet-stream' if binary else 'text/plain'
+        headers = {'Content-Disposition': f'attachment; filename={session.filename(fmt, route)}'}
+        return Response(body, mimetype=mimetype, headers=headers)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 if __name__ == '__main__':
     # Create templates and static directories
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static/css', exist_ok=True)
     os.makedirs('static/js', exist_ok=True)
     
+    port = int(os.environ.get('HOSPITAL_PORT', 5000))
     print("Starting Patient Tracking System Web Server...")
-    print("Access the application at: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    print(f"Access the application at: http://localhost:{port}")
+    if shared_store.worker_count() > 1:
+        shared_store.serve(app, '0.0.0.0', port)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
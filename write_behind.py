@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import threading
+import data_storage
+from json_cache import json_cache
+from instrumentation import get_logger
+
+log = get_logger('storage')
+
+
+# --------------------- WRITE-BEHIND PERSISTENCE ---------------------
+class RecordSnapshot:
+    """
+    A record as it was when saved, kept as its immutable JSON fragment; the
+    writer thread never touches live objects.
+    """
+
+    __slots__ = ('id', 'fragment')
+
+    def __init__(self, record_id, fragment):
+        self.id = record_id
+        self.fragment = fragment
+
+    def to_dict(self):
+        return json.loads(self.fragment)
+
+
+class PersistenceWorker:
+    """
+    Single writer thread for save_to_json/save_many_to_json.
+
+    Callers snapshot the record (its cached JSON fragment) and return immediately. Saves of
+    the same record within `window` seconds are coalesced so only the latest
+    snapshot is written, and each file gets one save_many per batch, so
+    concurrent requests can no longer interleave their rename/rewrite steps.
+    flush() is a barrier: it returns once everything submitted before the
+    call is on disk. A batch that fails to write stays queued and is retried
+    every `retry_delay` seconds; until a retry succeeds `last_error` is set
+    and flush() returns False.
+    """
+
+    def __init__(self, window=0.05, max_pending=1000, retry_delay=1.0):
+        self.window = window
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self.batches_written = 0
+        self.records_written = 0
+        self.failed_batches = 0
+        self.last_error = None
+        self._pending = {}
+        self._pending_count = 0
+        self._submitted = 0
+        self._written = 0
+        self._urgent = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='persistence-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path, objs):
+        snapshots = [RecordSnapshot(obj.id, json_cache.fragment(obj)) for obj in objs]
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("Persistence worker is stopped")
+            pending = self._pending.setdefault(file_path, {})
+            for snapshot in snapshots:
+                if snapshot.id not in pending:
+                    self._pending_count += 1
+                pending[snapshot.id] = snapshot
+            self._submitted += 1
+            if self._pending_count >= self.max_pending:
+                self._urgent = True
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        """Distinct records queued and not yet taken by the writer thread."""
+        return self._pending_count
+
+    def flush(self, timeout=None):
+        """
+        Block until every save submitted so far has been written. Returns
+        False on timeout, or as soon as a write fails (see last_error).
+        """
+        with self._cond:
+            target = self._submitted
+            failures = self.failed_batches
+            self._urgent = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._written >= target or self.failed_batches > failures
+                                or not self._thread.is_alive(), timeout)
+            return self._written >= target
+
+    def stop(self, timeout=None):
+        """Write what is pending and end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            # Coalescing window: let repeated saves of the same records collapse
+            deadline = time.monotonic() + self.window
+            while not (self._urgent or self._stopping):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._urgent = False
+            return batch, self._submitted
+
+    def _run(self):
+        while True:
+            batch, submitted = self._take_batch()
+            if not batch and self._stopping:
+                break
+            backend = data_storage.get_storage_backend()
+            failed = {}
+            error = None
+            for file_path, snapshots in batch.items():
+                try:
+                    data_storage.write_to_backend(backend, file_path, list(snapshots.values()))
+                    self.batches_written += 1
+                    self.records_written += len(snapshots)
+                except Exception as e:
+                    failed[file_path] = snapshots
+                    error = e
+                    log.error("Failed to save %s (%d records kept for retry): %s", file_path, len(snapshots), e)
+            with self._cond:
+                if not failed:
+                    self._written = submitted
+                    self.last_error = None
+                    self._cond.notify_all()
+                    continue
+                self.last_error = error
+                self.failed_batches += 1
+                self._requeue(failed)
+                self._cond.notify_all()
+                if self._stopping:
+                    log.error("Persistence worker stopped with %d unsaved records", self._pending_count)
+                    break
+                self._cond.wait_for(lambda: self._stopping, self.retry_delay)
+
+    def _requeue(self, failed):
+        # Snapshots submitted since the batch was taken are newer and win
+        for file_path, snapshots in failed.items():
+            pending = self._pending.setdefault(file_path, {})
+            for record_id, snapshot in snapshots.items():
+                if record_id not in pending:
+                    pending[record_id] = snapshot
+                    self._pending_count += 1
+
+
+def start_write_behind(window=None):
+    """Route save_to_json/save_many_to_json through a PersistenceWorker (idempotent)."""
+    worker = data_storage.get_writer()
+    if worker is None:
+        if window is None:
+            window = float(os.environ.get('HOSPITAL_WRITE_WINDOW', '0.05'))
+        worker = PersistenceWorker(window)
+        data_storage.set_writer(worker)
+    return worker
+
+
+def stop_write_behind():
+    """Drain the worker and return to synchronous saves."""
+    worker = data_storage.get_writer()
+    if worker is not None:
+        data_storage.set_writer(None)
+        worker.stop()